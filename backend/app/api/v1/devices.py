@@ -0,0 +1,76 @@
+"""
+Device registry and fleet overview API
+One ThingSpeak channel per site; /fleet summarizes all of them in one call
+"""
+
+from fastapi import APIRouter, HTTPException, status
+from pydantic import BaseModel
+from typing import List
+import uuid
+import logging
+
+from app.database.db import DeviceDB
+from app.services.fleet import get_fleet_monitor, registered_devices
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+class DeviceCreate(BaseModel):
+    """Request model for registering a device"""
+    name: str
+    channel_id: str
+    # Only needed for private channels
+    read_key: str = ""
+    location: str = ""
+
+
+class Device(BaseModel):
+    """Response model for a device (the read key is never returned)"""
+    id: str
+    name: str
+    channel_id: str
+    location: str = ""
+    added_at: str
+    is_active: int = 1
+
+
+@router.get("/devices", response_model=List[Device])
+async def get_devices():
+    """Get all registered devices"""
+    return DeviceDB.get_all(active_only=True)
+
+
+@router.post("/devices", response_model=Device, status_code=status.HTTP_201_CREATED)
+async def add_device(device: DeviceCreate):
+    """Register a device"""
+    device_id = str(uuid.uuid4())
+    if not DeviceDB.add(device_id, device.name, device.channel_id.strip(), device.read_key, device.location):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Channel {device.channel_id} is already registered"
+        )
+    logger.info(f"Registered device {device.name} (channel {device.channel_id})")
+    return DeviceDB.get(device_id)
+
+
+@router.delete("/devices/{device_id}")
+async def delete_device(device_id: str):
+    """Remove a device from the registry"""
+    if not DeviceDB.delete(device_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Device {device_id} not found")
+    return {"success": True, "message": "Device removed"}
+
+
+@router.get("/fleet")
+async def get_fleet():
+    """
+    Latest reading, status and staleness for every registered device
+
+    Devices are fetched concurrently (FLEET_CONCURRENCY at a time) and
+    recent results are reused, so the call takes about as long as the
+    slowest single fetch. Failed fetches fall back to the last good reading
+    and are marked stale with an `error`.
+    """
+    return await get_fleet_monitor().overview(registered_devices())
@@ -1,13 +1,34 @@
-from fastapi import APIRouter, HTTPException
-from app.services.thingspeak import fetch_evara_data
-from app.schemas.sensor import DashboardData
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from app.services.ingestion import get_reading_buffer, get_ingestor, get_poll_cache
+from app.services.poller import ensure_readings, get_poller
+from app.services.thingspeak import get_thingspeak_client
+from app.services.status import classify_readings, live_thresholds, reading_status, state_summary_for_range
+from app.services.stream import StreamFullError, get_broadcaster
+from app.schemas.sensor import DashboardData, BackfillRequest
+from app.services.backfill import BackfillJob, start_backfill, get_current_backfill
+from app.services.downsample import SERIES_METRICS, get_series_cache, load_series
+from app.services.rollups import RESOLUTIONS_BY_NAME, query_rollups
+from app.services.export import ReadingExporter
+from app.services.columnar import COLUMNAR_MEDIA_TYPE, dumps, encode_columns, wants_columnar
+from app.services.dashboard_cache import etag_matches, get_dashboard_cache
+from app.services.fleet import get_fleet_monitor
+from app.services.alert_rules import get_rule_registry
+from app.services.anomaly import get_anomaly_detector
+from app.services.alert_monitor import get_alert_monitor
+from app.services.alert_digest import get_alert_digest
+from app.database.readings import ROLLUP_METRICS
 from app.core.config import settings
+from app.core.compression import get_compression_stats
 from .recipients import router as recipients_router
 from .settings import router as settings_router
+from .devices import router as devices_router
+from .rules import router as rules_router
 from app.services.email_service import EmailAlertService
 from app.database.db import RecipientDB, AlertLogDB
-import json
-import os
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,66 +38,290 @@ router = APIRouter()
 # Include sub-routers
 router.include_router(recipients_router, prefix="", tags=["recipients"])
 router.include_router(settings_router, prefix="", tags=["settings"])
-
-SETTINGS_FILE = "backend/data/settings.json"
-
-def load_settings_file():
-    """Load current settings"""
-    try:
-        if os.path.exists(SETTINGS_FILE):
-            with open(SETTINGS_FILE, 'r') as f:
-                return json.load(f)
-    except Exception:
-        pass
-    return {"tdsThreshold": 150, "tempThreshold": 35}
+router.include_router(devices_router, prefix="", tags=["devices"])
+router.include_router(rules_router, prefix="", tags=["alert-rules"])
 
 @router.get("/dashboard", response_model=DashboardData)
-async def get_dashboard_metrics():
+async def get_dashboard_metrics(
+    request: Request,
+    since_entry_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    format: Optional[str] = Query(None, pattern="^(rows|columnar)$")
+):
     """
     Get dashboard metrics with ThingSpeak data and analysis
     
-    1. Fetches raw data from ThingSpeak
+    1. Reads the ingested reading buffer (kept fresh by the background poller)
     2. Runs analysis (Alert Logic)
     3. Returns clean JSON for React
+
+    With `since_entry_id` (or a `since` timestamp) `history` only holds
+    the oldest readings newer than the cursor, up to the dashboard history
+    size; `cursor` is the last entry_id returned and is the value to send
+    on the next call (`has_more` says another page is already waiting).
+    If the buffer no longer reaches back to the cursor, the response is a
+    full snapshot with `reset` set and the client should replace its
+    history.
+
+    `?format=columnar` (or an Accept header naming the columnar media type)
+    returns `history` as parallel arrays with delta-coded timestamps and
+    entry ids, serialized without per-row model validation.
+
+    Full responses are rendered once per ingest and carry a strong ETag;
+    `If-None-Match` gets a 304. Their `snapshot_age_seconds` is as of
+    rendering and the `Age` header says how long ago that was.
     """
-    raw_data = await fetch_evara_data(results=60)
+    result = await ensure_readings()
+    buffer = get_reading_buffer()
+    latest = buffer.latest()
 
-    if isinstance(raw_data, dict) and raw_data.get("error"):
+    # Serve the last good snapshot while ThingSpeak is failing; 502 only if we have none
+    if result.get("error") and latest is None:
         raise HTTPException(status_code=502, detail="Upstream Data Error")
 
-    latest = raw_data.get("latest")
+    columnar = wants_columnar(format, request.headers.get("accept"))
+    delta = since_entry_id is not None or since is not None
+    if settings.DASHBOARD_RENDER_CACHE and not delta:
+        cache = get_dashboard_cache()
+        freshness = get_ingestor().freshness()
+        rendered = cache.get(
+            (buffer.version, freshness["stale"], live_thresholds()),
+            "columnar" if columnar else "rows",
+            lambda: _render_dashboard(latest, buffer.snapshot(settings.DASHBOARD_HISTORY_SIZE), columnar)
+        )
+        headers = {
+            "ETag": rendered.etag,
+            "Cache-Control": "no-cache",
+            "Age": str(rendered.age_seconds()),
+            "Vary": "Accept"
+        }
+        if etag_matches(request.headers.get("if-none-match"), rendered.etag):
+            cache.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(rendered.body, media_type=rendered.media_type, headers=headers)
 
-    status = "NORMAL"
-    if latest:
-        try:
-            if latest.get('tds', 0) > settings.TDS_ALERT_THRESHOLD:
-                status = "CRITICAL"
-            elif latest.get('tds', 0) > (settings.TDS_ALERT_THRESHOLD * 0.8):
-                status = "WARNING"
-        except Exception:
-            status = "WARNING"
+    limit = settings.DASHBOARD_HISTORY_SIZE
+    reset = delta and not (buffer.covers(since_entry_id) if since_entry_id is not None else buffer.covers_since(since))
+    if reset:
+        # Rows past the cursor were evicted: make the client start over
+        delta = False
+        history = buffer.snapshot(limit)
+    elif since_entry_id is not None:
+        history = buffer.after(since_entry_id, limit=limit + 1)
+    elif since is not None:
+        history = buffer.created_after(since, limit=limit + 1)
+    else:
+        history = buffer.snapshot(limit)
+    has_more = len(history) > limit
+    history = history[:limit]
+
+    payload = _dashboard_payload(latest, history, delta, reset=reset, has_more=has_more)
+    if columnar:
+        payload["format"] = "columnar"
+        payload["history"] = encode_columns(history)
+        return Response(dumps(payload), media_type=COLUMNAR_MEDIA_TYPE, headers={"Vary": "Accept"})
+    return payload
 
+def _dashboard_payload(latest, history, delta: bool, reset: bool = False, has_more: bool = False) -> dict:
+    thresholds = live_thresholds()
+    classified = classify_readings(history, thresholds)
     return {
         "latest": latest,
-        "history": raw_data.get("history", []),
-        "system_status": status,
-        "last_updated": latest.get("created_at") if latest else None
+        "history": history,
+        "history_status": classified["labels"],
+        "status_summary": classified["summary"],
+        "delta": delta,
+        "reset": reset,
+        "has_more": has_more,
+        "cursor": history[-1]["entry_id"] if history else get_reading_buffer().last_entry_id,
+        "system_status": reading_status(latest, thresholds),
+        "last_updated": latest.get("created_at") if latest else None,
+        **get_ingestor().freshness()
     }
 
+def _render_dashboard(latest, history, columnar: bool):
+    """(body, media_type) for a full dashboard response, validated like response_model would"""
+    payload = _dashboard_payload(latest, history, delta=False)
+    if columnar:
+        payload["format"] = "columnar"
+        payload["history"] = encode_columns(history)
+        return dumps(payload), COLUMNAR_MEDIA_TYPE
+    return DashboardData.model_validate(payload).model_dump_json().encode(), "application/json"
+
+@router.get("/stream")
+async def stream_readings(request: Request, last_event_id: Optional[int] = None):
+    """
+    Server-Sent Events feed of new readings and status changes
+
+    A fresh connection gets a `snapshot` event (dashboard history), then
+    `readings` events with only new entries and `status` events when the
+    system status or staleness changes. Reconnects resume from the
+    Last-Event-ID header (or ?last_event_id=) while the buffer covers the gap.
+    """
+    header = request.headers.get("last-event-id")
+    if header is not None:
+        try:
+            last_event_id = int(header)
+        except ValueError:
+            last_event_id = None
+
+    await ensure_readings()
+    broadcaster = get_broadcaster()
+    try:
+        subscriber = broadcaster.subscribe(last_event_id)
+    except StreamFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return StreamingResponse(
+        broadcaster.events(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _parse_metrics(metrics: str, allowed) -> list:
+    requested = [m.strip() for m in metrics.split(",") if m.strip()]
+    unknown = sorted(set(requested) - set(allowed))
+    if unknown or not requested:
+        raise HTTPException(status_code=400, detail=f"Unknown metrics: {unknown}; choose from {list(allowed)}")
+    return requested
+
+def _time_range(start: Optional[datetime], end: Optional[datetime], default_span: timedelta):
+    """Query range as epoch seconds; defaults to the `default_span` before now, naive times are UTC"""
+    end = end or datetime.now(timezone.utc)
+    start = start or end - default_span
+    end_ts = int((end if end.tzinfo else end.replace(tzinfo=timezone.utc)).timestamp())
+    start_ts = int((start if start.tzinfo else start.replace(tzinfo=timezone.utc)).timestamp())
+    if end_ts <= start_ts:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    return start_ts, end_ts
+
+@router.get("/series")
+async def get_chart_series(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    points: int = Query(1000, ge=3, le=10000),
+    metrics: str = ",".join(SERIES_METRICS),
+    channel_id: Optional[str] = None
+):
+    """
+    Downsampled chart series from the local reading store
+
+    Each metric is reduced independently with LTTB to about `points` points
+    over [start, end) (default: the last 24 hours). Timestamps without a
+    zone are UTC.
+    """
+    requested = _parse_metrics(metrics, SERIES_METRICS)
+    start_ts, end_ts = _time_range(start, end, timedelta(days=1))
+    channel = channel_id or settings.THINGSPEAK_CHANNEL_ID
+    return await asyncio.to_thread(load_series, channel, start_ts, end_ts, points, requested)
+
+@router.get("/rollups")
+async def get_rollups(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    resolution: str = "auto",
+    target_buckets: int = Query(300, ge=1, le=5000),
+    metrics: str = ",".join(ROLLUP_METRICS),
+    channel_id: Optional[str] = None
+):
+    """
+    Per-bucket count/min/max/avg/std from the rollup tables
+
+    `resolution` is one of 1m, 15m, 1h, 1d, or `auto` for the coarsest one
+    that still yields `target_buckets` buckets over [start, end) (default:
+    the last 7 days).
+    """
+    requested = _parse_metrics(metrics, ROLLUP_METRICS)
+    if resolution != "auto" and resolution not in RESOLUTIONS_BY_NAME:
+        raise HTTPException(status_code=400, detail=f"resolution must be auto or one of {list(RESOLUTIONS_BY_NAME)}")
+    start_ts, end_ts = _time_range(start, end, timedelta(days=7))
+    channel = channel_id or settings.THINGSPEAK_CHANNEL_ID
+    return await asyncio.to_thread(
+        query_rollups, channel, start_ts, end_ts,
+        RESOLUTIONS_BY_NAME.get(resolution), target_buckets, requested
+    )
+
+@router.get("/status/summary")
+async def get_status_summary(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    window: str = "1h",
+    channel_id: Optional[str] = None
+):
+    """
+    NORMAL / WARNING / CRITICAL reading counts and time-in-state over
+    [start, end) (default: the last 24 hours), in total and per `window`
+    (1m, 15m, 1h or 1d), using the live TDS and temperature thresholds
+    """
+    if window not in RESOLUTIONS_BY_NAME:
+        raise HTTPException(status_code=400, detail=f"window must be one of {list(RESOLUTIONS_BY_NAME)}")
+    start_ts, end_ts = _time_range(start, end, timedelta(days=1))
+    channel = channel_id or settings.THINGSPEAK_CHANNEL_ID
+    return await asyncio.to_thread(
+        state_summary_for_range, channel, start_ts, end_ts, RESOLUTIONS_BY_NAME[window]
+    )
+
+@router.get("/export")
+async def export_readings(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    format: str = Query("csv", pattern="^(csv|parquet)$"),
+    gzip: bool = False,
+    threshold: Optional[float] = None,
+    channel_id: Optional[str] = None
+):
+    """
+    Download stored readings for [start, end) (default: the last 30 days)
+
+    Streamed page by page as CSV (optionally gzipped) or Parquet, with a
+    Status column (ALERT when tds > threshold, default TDS_ALERT_THRESHOLD).
+    """
+    start_ts, end_ts = _time_range(start, end, timedelta(days=30))
+    try:
+        exporter = ReadingExporter(
+            channel_id or settings.THINGSPEAK_CHANNEL_ID, start_ts, end_ts,
+            fmt=format, gzip=gzip, threshold=threshold
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return StreamingResponse(
+        exporter.stream(),
+        media_type=exporter.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{exporter.filename}"'}
+    )
+
 @router.post("/check-alerts")
 async def check_and_send_alerts():
     """
     Professional alert checker with database-backed recipients
     Called periodically from frontend
+
+    Emails on the alert monitor's decision (the alert rules, with
+    hysteresis and minimum durations), not on a raw comparison of the
+    latest reading.
     """
     try:
-        # Fetch latest sensor data
-        data = await fetch_evara_data(results=1)
-        if not data or not data.get("latest"):
+        # Registered before the poll so it sees this request's readings
+        # (without the lifespan nothing else creates it)
+        monitor = get_alert_monitor() if settings.ALERT_MONITOR_ENABLED else None
+        # Latest sensor data from the local reading buffer
+        result = await ensure_readings()
+        latest = get_reading_buffer().latest()
+        if not latest:
             return {"message": "No data available", "status": "no_data"}
+        if result.get("error") or get_ingestor().freshness()["stale"]:
+            # Don't alert on a stale snapshot; it was already evaluated when fresh
+            return {
+                "message": "ThingSpeak unavailable, serving last good reading",
+                "status": "stale",
+                **get_ingestor().freshness()
+            }
+        if monitor is None:
+            return {"message": "Alert monitor disabled", "status": "disabled"}
         
-        latest = data["latest"]
-        settings_data = load_settings_file()
+        # Readings another request polled before the monitor existed
+        firing = monitor.catch_up()
+        # Telegram alerts for this poll finish before the response
+        await monitor.drain()
         
         # Get recipients from database
         recipients = RecipientDB.get_all(active_only=True)
@@ -84,24 +329,19 @@ async def check_and_send_alerts():
         if not recipients:
             return {"message": "No active recipients configured", "status": "no_recipients"}
         
-        tds = latest.get("tds", 0)
-        temp = latest.get("temp", 0)
-        tds_threshold = settings_data.get("tdsThreshold", 150)
-        temp_threshold = settings_data.get("tempThreshold", 35)
-        
         alerts_sent = []
         
-        # Check TDS threshold
-        if tds > tds_threshold:
-            success = await EmailAlertService.send_tds_alert(recipients, tds, tds_threshold)
-            if success:
-                alerts_sent.append(f"TDS alert sent ({tds:.1f} > {tds_threshold})")
-        
-        # Check Temperature threshold
-        if temp > temp_threshold:
-            success = await EmailAlertService.send_temp_alert(recipients, temp, temp_threshold)
-            if success:
-                alerts_sent.append(f"Temperature alert sent ({temp:.1f} > {temp_threshold})")
+        for hit in firing:
+            if hit["alert_type"] == "high_tds":
+                metric, send = "tds", EmailAlertService.send_tds_alert
+            elif hit["alert_type"] == "high_temp":
+                metric, send = "temp", EmailAlertService.send_temp_alert
+            else:
+                continue
+            # A rate rule has no plain threshold value of its own
+            value = hit["value"] if hit["value"] is not None else latest.get(metric)
+            if await send(recipients, value, hit["threshold"]):
+                alerts_sent.append(f"{hit['rule']} alert sent ({value:.1f} > {hit['threshold']})")
         
         if alerts_sent:
             logger.info(f"Alerts sent: {alerts_sent}")
@@ -109,8 +349,9 @@ async def check_and_send_alerts():
         else:
             return {
                 "message": "No alerts needed", 
-                "tds": tds, 
-                "temp": temp,
+                "tds": latest.get("tds"), 
+                "temp": latest.get("temp"),
+                "firing": [hit["alert_type"] for hit in firing],
                 "status": "normal"
             }
     
@@ -118,6 +359,55 @@ async def check_and_send_alerts():
         logger.error(f"Error in check_alerts: {e}")
         return {"error": str(e), "status": "error"}
 
+@router.post("/backfill", status_code=202)
+async def trigger_backfill(request: BackfillRequest):
+    """Start a background backfill of ThingSpeak history into the local store"""
+    try:
+        job = start_backfill(BackfillJob(request.start, request.end, channel_id=request.channel_id))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return job.status()
+
+@router.get("/backfill")
+async def get_backfill_status():
+    """Progress of the most recent backfill"""
+    job = get_current_backfill()
+    if job is None:
+        return {"state": "idle"}
+    return job.status()
+
+@router.get("/metrics")
+async def get_metrics():
+    """In-process performance counters"""
+    return {
+        "poll_cache": get_poll_cache().stats(),
+        "ingestion": get_ingestor().stats(),
+        "poller": get_poller().stats(),
+        "circuit_breaker": get_thingspeak_client().breaker.stats(),
+        "thingspeak_client": get_thingspeak_client().stats(),
+        "stream": get_broadcaster().stats(),
+        "series_cache": get_series_cache().stats(),
+        "compression": get_compression_stats().stats(),
+        "dashboard_cache": get_dashboard_cache().stats(),
+        "fleet": get_fleet_monitor().stats(),
+        "alert_rules": get_rule_registry().stats(),
+        "anomaly": get_anomaly_detector().stats() if settings.ANOMALY_ENABLED else {"enabled": False},
+        "alert_monitor": get_alert_monitor().stats() if settings.ALERT_MONITOR_ENABLED else {"enabled": False},
+        "alert_digest": get_alert_digest().stats()
+    }
+
+@router.get("/anomalies")
+async def get_anomalies(limit: int = Query(50, ge=1, le=settings.ANOMALY_RECENT_SIZE)):
+    """Most recent anomalies from the streaming detector, newest first"""
+    detector = get_anomaly_detector()
+    if detector is None:
+        return {"anomalies": [], "count": 0, "status": "disabled"}
+    recent = list(detector.recent)[-limit:]
+    recent.reverse()
+    return {"anomalies": recent, "count": len(recent), "detector": detector.stats()}
+
 @router.get("/alert-history")
 async def get_alert_history(limit: int = 10):
     """Get recent alert history from database"""
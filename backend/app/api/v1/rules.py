@@ -0,0 +1,138 @@
+"""
+Alert rules API
+Declarative rules (see app/services/alert_rules.py); changes take effect on
+the next evaluation without a deploy
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import logging
+
+from app.models.database import DBAlertRule, get_db
+from app.services.alert_rules import ReadingBatch, RuleDefinitionError, compile_rule, get_rule_registry
+from app.services.alert_state import get_alert_state
+from app.services.ingestion import get_ingestor
+from app.services.poller import ensure_readings
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+class AlertRuleIn(BaseModel):
+    """Request model for creating or replacing a rule"""
+    name: str
+    alert_type: str
+    severity: str = "warning"
+    condition: Dict[str, Any]
+    min_duration_seconds: float = 0.0
+    # Limit the rule to one device's channel; None applies it to all
+    channel_id: Optional[str] = None
+    is_active: bool = True
+
+
+class AlertRule(AlertRuleIn):
+    """Response model for a rule"""
+    id: int
+    updated_at: Optional[datetime] = None
+
+
+def _to_model(row: DBAlertRule) -> AlertRule:
+    return AlertRule(**{field: getattr(row, field) for field in AlertRule.model_fields})
+
+
+def _validated(db: Session, rule: AlertRuleIn) -> None:
+    """Compile against the current config so a broken rule is rejected on write"""
+    try:
+        compile_rule(rule, get_alert_state().config(db))
+    except RuleDefinitionError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid condition: {e}")
+
+
+def _get_row(db: Session, rule_id: int) -> DBAlertRule:
+    get_rule_registry().ensure_table(db)
+    row = db.get(DBAlertRule, rule_id)
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Alert rule {rule_id} not found")
+    return row
+
+
+def _check_name(db: Session, name: str, rule_id: Optional[int] = None) -> None:
+    existing = db.query(DBAlertRule).filter(DBAlertRule.name == name).first()
+    if existing and existing.id != rule_id:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Alert rule '{name}' already exists")
+
+
+@router.get("/alert-rules", response_model=List[AlertRule])
+async def get_alert_rules(db: Session = Depends(get_db)):
+    """Get all alert rules"""
+    get_rule_registry().ensure_table(db)
+    return [_to_model(row) for row in db.query(DBAlertRule).order_by(DBAlertRule.id)]
+
+
+@router.post("/alert-rules", response_model=AlertRule, status_code=status.HTTP_201_CREATED)
+async def add_alert_rule(rule: AlertRuleIn, db: Session = Depends(get_db)):
+    """Add an alert rule"""
+    get_rule_registry().ensure_table(db)
+    _validated(db, rule)
+    _check_name(db, rule.name)
+    row = DBAlertRule(**rule.model_dump())
+    db.add(row)
+    db.commit()
+    db.refresh(row)
+    get_rule_registry().invalidate()
+    logger.info(f"Added alert rule '{row.name}'")
+    return _to_model(row)
+
+
+@router.put("/alert-rules/{rule_id}", response_model=AlertRule)
+async def update_alert_rule(rule_id: int, rule: AlertRuleIn, db: Session = Depends(get_db)):
+    """Replace an alert rule"""
+    row = _get_row(db, rule_id)
+    _validated(db, rule)
+    _check_name(db, rule.name, rule_id)
+    for field, value in rule.model_dump().items():
+        setattr(row, field, value)
+    db.commit()
+    db.refresh(row)
+    get_rule_registry().invalidate()
+    return _to_model(row)
+
+
+@router.delete("/alert-rules/{rule_id}")
+async def delete_alert_rule(rule_id: int, db: Session = Depends(get_db)):
+    """Delete an alert rule"""
+    db.delete(_get_row(db, rule_id))
+    db.commit()
+    get_rule_registry().invalidate()
+    return {"success": True, "message": "Alert rule deleted"}
+
+
+@router.get("/alert-rules/evaluate")
+async def evaluate_alert_rules(limit: int = 240, db: Session = Depends(get_db)):
+    """
+    Rules firing at the newest buffered reading, evaluated over the last
+    `limit` readings (dry run: nothing is sent)
+    """
+    await ensure_readings()
+    ingestor = get_ingestor()
+    readings = ingestor.buffer.snapshot(limit=max(1, limit))
+    rule_set = get_rule_registry().rule_set(db, get_alert_state().config(db))
+    evaluation = rule_set.evaluate(ReadingBatch({str(ingestor.channel_id): readings}))
+    return {
+        "rules": len(rule_set),
+        "readings": len(readings),
+        "firing": [
+            {
+                "name": hit["rule"].name,
+                "alert_type": hit["rule"].alert_type,
+                "severity": hit["rule"].severity,
+                "channel_id": hit["channel_id"],
+                "created_at": readings[hit["index"]]["created_at"],
+            }
+            for hit in evaluation.active()
+        ],
+    }
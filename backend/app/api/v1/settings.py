@@ -7,13 +7,10 @@ from pydantic import BaseModel
 from datetime import datetime
 import json
 import os
-from pathlib import Path
+from app.core.config import SETTINGS_FILE
 
 router = APIRouter()
 
-# Settings file path
-SETTINGS_FILE = Path(__file__).parent.parent.parent.parent / "data" / "settings.json"
-
 # Ensure directory exists
 SETTINGS_FILE.parent.mkdir(parents=True, exist_ok=True)
 
@@ -0,0 +1,247 @@
+"""
+Response compression
+gzip / Brotli negotiated from Accept-Encoding with a per-route policy.
+Buffered responses are compressed in one go; streamed responses chunk by
+chunk, flushing after each so clients get every chunk as it is produced.
+"""
+import asyncio
+import time
+import zlib
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+class CompressionPolicy(NamedTuple):
+    minimum_size: int
+    gzip_level: int
+    brotli_quality: int
+
+
+DEFAULT_POLICY = CompressionPolicy(
+    settings.COMPRESSION_MIN_SIZE, settings.COMPRESSION_GZIP_LEVEL, settings.COMPRESSION_BROTLI_QUALITY
+)
+
+# Longest matching path prefix wins; None means never compress
+ROUTE_POLICIES: Tuple[Tuple[str, Optional[CompressionPolicy]], ...] = (
+    ("/health", None),
+    # SSE events are encoded once for every subscriber; per-connection
+    # compression would undo that
+    ("/api/v1/stream", None),
+    # Multi-megabyte CSV: cheaper levels, always worth compressing
+    ("/api/v1/export", CompressionPolicy(0, 4, 3)),
+)
+
+# Already compressed, or must reach the client unbuffered
+SKIP_CONTENT_TYPES = (
+    "text/event-stream",
+    "application/gzip",
+    "application/zip",
+    "application/vnd.apache.parquet",
+    "image/",
+)
+
+# Chunks at least this large are compressed in a worker thread
+THREAD_MIN_SIZE = 128 * 1024
+
+
+def brotli_available() -> bool:
+    return brotli is not None
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Best supported coding by q-value ('br' wins ties); None for identity"""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        params = params.replace(" ", "")
+        q = 1.0
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip()] = q
+    default = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding in ("br", "gzip") if brotli else ("gzip",):
+        q = weights.get(coding, default)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class _Encoder:
+    """One response's compressor"""
+
+    def __init__(self, coding: str, policy: CompressionPolicy):
+        self.coding = coding
+        if coding == "br":
+            self._compressor = brotli.Compressor(quality=policy.brotli_quality)
+        else:
+            # wbits=31: gzip container rather than raw zlib
+            self._compressor = zlib.compressobj(policy.gzip_level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        """Compress a streamed chunk and flush it to a byte boundary"""
+        if self.coding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.coding == "br":
+            return self._compressor.process(data) + self._compressor.finish()
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class CompressionStats:
+    """Counters shared by every CompressionMiddleware instance"""
+
+    def __init__(self):
+        self.responses = 0
+        self.compressed = 0
+        self.by_coding: Dict[str, int] = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.compress_seconds = 0.0
+
+    def record(self, bytes_in: int, bytes_out: int, seconds: float) -> None:
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+        self.compress_seconds += seconds
+
+    def stats(self) -> Dict:
+        return {
+            'responses': self.responses,
+            'compressed': self.compressed,
+            'by_coding': dict(self.by_coding),
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'ratio': round(self.bytes_in / self.bytes_out, 2) if self.bytes_out else 0.0,
+            'compress_ms': round(self.compress_seconds * 1000, 1),
+            'brotli_available': brotli_available(),
+        }
+
+
+_stats = CompressionStats()
+
+
+def get_compression_stats() -> CompressionStats:
+    return _stats
+
+
+class _CompressingResponder:
+    """Wraps `send` for one response"""
+
+    def __init__(self, app, policy: CompressionPolicy, coding: Optional[str], stats: CompressionStats):
+        self.app = app
+        self.policy = policy
+        self.coding = coding
+        self.stats = stats
+        self.send = None
+        self.start_message: Optional[dict] = None
+        self.encoder: Optional[_Encoder] = None
+        self.passthrough = False
+
+    async def __call__(self, scope, receive, send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def _encode(self, compress, data: bytes) -> bytes:
+        started = time.perf_counter()
+        if len(data) >= THREAD_MIN_SIZE:
+            out = await asyncio.to_thread(compress, data)
+        else:
+            out = compress(data)
+        self.stats.record(len(data), len(out), time.perf_counter() - started)
+        return out
+
+    async def send_compressed(self, message: dict) -> None:
+        kind = message["type"]
+        if kind == "http.response.start":
+            self.stats.responses += 1
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = (
+                message["status"] in (204, 206, 304)
+                or "content-encoding" in headers
+                or headers.get("content-type", "").lower().startswith(SKIP_CONTENT_TYPES)
+            )
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if self.passthrough or kind != "http.response.body":
+            if not self.passthrough and self.encoder is None:
+                # e.g. http.response.pathsend: send the held start untouched
+                self.passthrough = True
+                await self.send(self.start_message)
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.encoder is None:
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            if self.coding is None or (not more_body and len(body) < self.policy.minimum_size):
+                self.passthrough = True
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+            self.encoder = _Encoder(self.coding, self.policy)
+            self.stats.compressed += 1
+            self.stats.by_coding[self.coding] = self.stats.by_coding.get(self.coding, 0) + 1
+            headers["Content-Encoding"] = self.coding
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                # A different representation; still matches If-None-Match (weak comparison)
+                headers["ETag"] = "W/" + etag
+            if more_body:
+                if "content-length" in headers:
+                    del headers["content-length"]
+            else:
+                body = await self._encode(self.encoder.finish, body)
+                headers["Content-Length"] = str(len(body))
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            await self.send(self.start_message)
+
+        compress = self.encoder.chunk if more_body else self.encoder.finish
+        body = await self._encode(compress, body)
+        await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+
+class CompressionMiddleware:
+    """ASGI middleware applying ROUTE_POLICIES (DEFAULT_POLICY elsewhere)"""
+
+    def __init__(self, app, routes=ROUTE_POLICIES, default: CompressionPolicy = DEFAULT_POLICY):
+        self.app = app
+        # Longest prefix first
+        self.routes = sorted(routes, key=lambda route: len(route[0]), reverse=True)
+        self.default = default
+
+    def policy_for(self, path: str) -> Optional[CompressionPolicy]:
+        for prefix, policy in self.routes:
+            if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+                return policy
+        return self.default
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        policy = self.policy_for(scope["path"])
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+        coding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        await _CompressingResponder(self.app, policy, coding, _stats)(scope, receive, send)
@@ -1,3 +1,5 @@
+from pathlib import Path
+
 from pydantic_settings import BaseSettings
 
 
@@ -10,10 +12,92 @@ class Settings(BaseSettings):
     # ThingSpeak Read API Key (public channels - safe to share)
     THINGSPEAK_READ_KEY: str = "EHEK3A1XD48TY98B"
 
+    # ThingSpeak HTTP client (shared keep-alive pool)
+    THINGSPEAK_BASE_URL: str = "https://api.thingspeak.com"
+    THINGSPEAK_HTTP2: bool = True
+    THINGSPEAK_MAX_CONNECTIONS: int = 20
+    THINGSPEAK_MAX_KEEPALIVE: int = 10
+    THINGSPEAK_KEEPALIVE_EXPIRY: float = 30.0
+    THINGSPEAK_TIMEOUT_SECONDS: float = 10.0
+    THINGSPEAK_CONNECT_TIMEOUT_SECONDS: float = 5.0
+
+    # Hedged requests: after THINGSPEAK_HEDGE_MIN_SAMPLES attempts the hedge
+    # deadline tracks this percentile of recent attempt latency
+    THINGSPEAK_HEDGE_ENABLED: bool = False
+    THINGSPEAK_HEDGE_PERCENTILE: float = 95.0
+    THINGSPEAK_HEDGE_DELAY_MS: float = 500.0
+    THINGSPEAK_HEDGE_MIN_DELAY_MS: float = 50.0
+    THINGSPEAK_HEDGE_MIN_SAMPLES: int = 20
+
+    # Circuit breaker around ThingSpeak calls
+    CIRCUIT_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_RECOVERY_SECONDS: float = 30.0
+    CIRCUIT_HALF_OPEN_MAX_CALLS: int = 1
+
+    # Dashboard snapshot cache (ThingSpeak channel updates every ~15 s)
+    SNAPSHOT_CACHE_TTL_SECONDS: float = 15.0
+
+    # Incremental ingestion ring buffer (5760 readings = 24 h at 15 s)
+    INGEST_BUFFER_SIZE: int = 5760
+    DASHBOARD_HISTORY_SIZE: int = 60
+    # Older pages fetched when a poll comes back capped at 8000 entries (more
+    # arrived since the last poll); any gap beyond them goes to a backfill job
+    INGEST_GAP_MAX_PAGES: int = 4
+    # Serve full (non-delta) dashboard responses from bytes rendered once per
+    # ingest, with an ETag for conditional requests
+    DASHBOARD_RENDER_CACHE: bool = True
+
+    # Background ingestion poller (started by the app lifespan)
+    POLLER_ENABLED: bool = True
+    POLLER_INTERVAL_SECONDS: float = 15.0
+    POLLER_JITTER_SECONDS: float = 2.0
+
+    # Server-Sent Events stream (/api/v1/stream)
+    STREAM_HEARTBEAT_SECONDS: float = 15.0
+    STREAM_RETRY_MS: int = 3000
+    STREAM_QUEUE_SIZE: int = 100
+    STREAM_MAX_SUBSCRIBERS: int = 1000
+
+    # Chart series: complete days of decoded readings kept in memory
+    # (about 180 KB per day at 15 s)
+    SERIES_CACHE_DAYS: int = 90
+
+    # Streaming export: rows read and encoded per chunk
+    EXPORT_CHUNK_ROWS: int = 10000
+
+    # Response compression (br when the optional 'brotli' package is
+    # installed, else gzip); per-route overrides live in app/core/compression.py
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # Fleet endpoint: concurrent latest-reading fetches across registered
+    # devices; results are reused for FLEET_CACHE_TTL_SECONDS and a reading
+    # older than FLEET_STALE_AFTER_SECONDS marks its device stale
+    FLEET_CONCURRENCY: int = 50
+    FLEET_FETCH_TIMEOUT_SECONDS: float = 5.0
+    FLEET_CACHE_TTL_SECONDS: float = 15.0
+    FLEET_STALE_AFTER_SECONDS: float = 120.0
+
+    # Historical backfill (one window must stay under ThingSpeak's 8000 entries;
+    # a day at 15 s is 5760)
+    BACKFILL_CONCURRENCY: int = 4
+    BACKFILL_WINDOW_SECONDS: int = 86400
+    BACKFILL_MAX_RETRIES: int = 3
+    BACKFILL_RETRY_BACKOFF_SECONDS: float = 1.0
+
     # Alert Thresholds
     TDS_ALERT_THRESHOLD: float = 150.0
     TEMP_ALERT_THRESHOLD: float = 35.0
 
+    # Status classification: WARNING above these fractions of the (live)
+    # thresholds; a reading's state counts as lasting until the next
+    # reading, at most STATUS_MAX_GAP_SECONDS
+    STATUS_TDS_WARNING_RATIO: float = 0.8
+    STATUS_TEMP_WARNING_RATIO: float = 0.9
+    STATUS_MAX_GAP_SECONDS: int = 300
+
     # Telegram Bot Configuration
     TELEGRAM_BOT_TOKEN: str = ""
     TELEGRAM_ALERT_CHAT_ID: str = ""  # Chat ID where alerts are sent
@@ -21,6 +105,39 @@ class Settings(BaseSettings):
 
     # Alert System Settings
     ALERT_COOLDOWN_MINUTES: int = 15
+    # AlertEngine's cached config is checked against the database this often
+    ALERT_STATE_REVALIDATE_SECONDS: float = 30.0
+    # Windowed evaluation: a breach must last ALERT_MIN_DURATION_SECONDS before
+    # it fires, and only clears once back past the exit threshold (TDS exits
+    # at the config's warning_threshold, the others by these margins)
+    ALERT_MIN_DURATION_SECONDS: float = 60.0
+    ALERT_LOW_VOLTAGE: float = 3.0
+    ALERT_TEMP_HYSTERESIS: float = 1.0
+    ALERT_VOLTAGE_HYSTERESIS: float = 0.1
+    # Evaluate those rules over every poll's new readings (state carried
+    # between polls; see app/services/alert_monitor.py) and send the alerts
+    ALERT_MONITOR_ENABLED: bool = True
+    ALERT_MONITOR_ALERTS_ENABLED: bool = True
+    # Non-critical alerts are held this long and sent as one digest message
+    # per recipient; critical alerts always go out immediately. Pending
+    # alerts are in memory, so this only applies while the background poller
+    # runs (not under Mangum with lifespan="off")
+    ALERT_DIGEST_ENABLED: bool = False
+    ALERT_DIGEST_WINDOW_SECONDS: float = 120.0
+    # Streaming anomaly detection on the ingested channel (comma-separated
+    # metrics); see app/services/anomaly.py for what each setting controls
+    ANOMALY_ENABLED: bool = True
+    # Send an 'anomaly' alert (own cooldown) through AlertEngine.trigger_alert
+    ANOMALY_ALERTS_ENABLED: bool = False
+    ANOMALY_METRICS: str = "tds,temp"
+    ANOMALY_WARMUP_READINGS: int = 60
+    ANOMALY_EWMA_ALPHA: float = 0.05
+    ANOMALY_Z_THRESHOLD: float = 5.0
+    ANOMALY_MAD_WINDOW: int = 61
+    ANOMALY_MAD_THRESHOLD: float = 6.0
+    ANOMALY_CUSUM_K: float = 0.5
+    ANOMALY_CUSUM_H: float = 15.0
+    ANOMALY_RECENT_SIZE: int = 200
 
     # CORS Settings
     ALLOWED_ORIGINS: str = "http://localhost:5173,https://your-app.vercel.app"
@@ -31,3 +148,6 @@ class Settings(BaseSettings):
 
 settings = Settings()
 
+# Calibration settings (thresholds) saved from the dashboard, shared across devices
+SETTINGS_FILE = Path(__file__).parent.parent.parent / "data" / "settings.json"
+
@@ -13,7 +13,7 @@ import json
 
 # Get absolute path relative to this file (works locally and on Vercel)
 _DB_DIR = Path(__file__).parent.parent.parent / "data"
-DB_PATH = str(_DB_DIR / "evara_alerts.db")
+DB_PATH = os.getenv("ALERTS_DB_PATH", str(_DB_DIR / "evara_alerts.db"))
 
 def init_database():
     """Initialize database with schema (idempotent)"""
@@ -52,6 +52,19 @@ def init_database():
             CREATE INDEX IF NOT EXISTS idx_alert_logs_type_sent 
             ON alert_logs(alert_type, sent_at DESC)
         """)
+
+        # Device registry (one ThingSpeak channel per site)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS devices (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                channel_id TEXT UNIQUE NOT NULL,
+                read_key TEXT NOT NULL DEFAULT '',
+                location TEXT NOT NULL DEFAULT '',
+                added_at TEXT NOT NULL,
+                is_active INTEGER DEFAULT 1
+            )
+        """)
         
         conn.commit()
 
@@ -117,6 +130,53 @@ class RecipientDB:
             )
             return cursor.fetchone() is not None
 
+class DeviceDB:
+    """Registry of monitored sites"""
+
+    @staticmethod
+    def add(device_id: str, name: str, channel_id: str, read_key: str = "", location: str = "") -> bool:
+        """Register a device; False if its channel is already registered"""
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """INSERT INTO devices (id, name, channel_id, read_key, location, added_at)
+                       VALUES (?, ?, ?, ?, ?, ?)""",
+                    (device_id, name, channel_id, read_key, location, datetime.utcnow().isoformat())
+                )
+                conn.commit()
+                return True
+        except sqlite3.IntegrityError:
+            return False
+
+    @staticmethod
+    def get_all(active_only: bool = True) -> List[Dict]:
+        """Get all devices, oldest first"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            query = "SELECT * FROM devices"
+            if active_only:
+                query += " WHERE is_active = 1"
+            cursor.execute(query + " ORDER BY added_at")
+            return [dict(row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def get(device_id: str) -> Optional[Dict]:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM devices WHERE id = ?", (device_id,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+    @staticmethod
+    def delete(device_id: str) -> bool:
+        """Remove a device (hard delete, so its channel can be registered again)"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM devices WHERE id = ?", (device_id,))
+            conn.commit()
+            return cursor.rowcount > 0
+
 class AlertLogDB:
     """Professional alert logging with database"""
     
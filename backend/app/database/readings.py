@@ -0,0 +1,433 @@
+"""
+Local time-series store for sensor readings
+SQLite table keyed by (channel, entry_id) with an epoch-seconds index,
+batched inserts, range queries and rollup tables kept current on insert
+"""
+
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from itertools import repeat
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Kept apart from evara_alerts.db so months of readings don't bloat it.
+# Vercel only allows writes under /tmp.
+_DB_DIR = Path("/tmp") if os.environ.get("VERCEL") else Path(__file__).parent.parent.parent / "data"
+READINGS_DB_PATH = os.getenv("READINGS_DB_PATH", str(_DB_DIR / "evara_readings.db"))
+
+# Rollup bucket sizes in seconds, finest first; each level is built from the one before
+ROLLUP_RESOLUTIONS = (60, 900, 3600, 86400)
+ROLLUP_METRICS = ("voltage", "tds", "temp")
+ROLLUP_STATS = ("count", "sum", "min", "max", "sumsq")
+# Touched minutes closer than this are refreshed with one statement
+_ROLLUP_MERGE_GAP = 900
+
+_ROLLUP_COLUMNS = ", ".join(
+    ["channel", "resolution", "bucket_ts", "n"] + [f"{m}_{s}" for m in ROLLUP_METRICS for s in ROLLUP_STATS]
+)
+_RAW_AGGREGATES = ", ".join(
+    f"COUNT({m}), SUM({m}), MIN({m}), MAX({m}), SUM({m} * {m})" for m in ROLLUP_METRICS
+)
+_CHILD_AGGREGATES = ", ".join(
+    f"SUM({m}_count), SUM({m}_sum), MIN({m}_min), MAX({m}_max), SUM({m}_sumsq)" for m in ROLLUP_METRICS
+)
+
+
+def to_epoch(created_at: str) -> int:
+    """ThingSpeak 'created_at' (ISO-8601, UTC) -> integer epoch seconds"""
+    return int(datetime.fromisoformat(created_at.replace("Z", "+00:00")).timestamp())
+
+
+def from_epoch(ts: int) -> str:
+    """Integer epoch seconds -> ThingSpeak-style 'created_at'"""
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts))
+
+
+def init_readings_db():
+    """Initialize readings schema (idempotent)"""
+    Path(READINGS_DB_PATH).parent.mkdir(parents=True, exist_ok=True)
+
+    with get_readings_connection() as conn:
+        # WAL lets the dashboard read while the poller writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        had_rollups = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'rollups'"
+        ).fetchone() is not None
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS readings (
+                channel TEXT NOT NULL,
+                entry_id INTEGER NOT NULL,
+                ts INTEGER NOT NULL,
+                voltage REAL,
+                tds REAL,
+                temp REAL,
+                PRIMARY KEY (channel, entry_id)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_readings_channel_ts
+            ON readings(channel, ts)
+        """)
+
+        # Backfill checkpoints: one row per completed [start_ts, end_ts) window
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+                channel TEXT NOT NULL,
+                start_ts INTEGER NOT NULL,
+                end_ts INTEGER NOT NULL,
+                rows INTEGER NOT NULL,
+                completed_at INTEGER NOT NULL,
+                PRIMARY KEY (channel, start_ts, end_ts)
+            )
+        """)
+
+        # Rollups: per bucket count/sum/min/max/sum of squares for each metric
+        # (n counts readings; <metric>_count counts non-NULL values)
+        metric_columns = ",\n".join(
+            f"                {m}_count INTEGER NOT NULL, {m}_sum REAL, {m}_min REAL, {m}_max REAL, {m}_sumsq REAL"
+            for m in ROLLUP_METRICS
+        )
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS rollups (
+                channel TEXT NOT NULL,
+                resolution INTEGER NOT NULL,
+                bucket_ts INTEGER NOT NULL,
+                n INTEGER NOT NULL,
+{metric_columns},
+                PRIMARY KEY (channel, resolution, bucket_ts)
+            ) WITHOUT ROWID
+        """)
+        conn.commit()
+
+    if not had_rollups:
+        # Stores created before rollups existed: build them once from raw readings
+        RollupDB.rebuild()
+
+
+@contextmanager
+def get_readings_connection():
+    """Readings database connection context manager"""
+    conn = sqlite3.connect(READINGS_DB_PATH, check_same_thread=False)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def _row_to_reading(row, missing: Optional[float] = 0.0) -> Dict:
+    # Column order: entry_id, ts, voltage, tds, temp. Metrics that could not be
+    # decoded are stored as NULL; dict consumers get the legacy 0.0 instead
+    # unless they ask for `missing`=None.
+    return {
+        "created_at": from_epoch(row[1]),
+        "entry_id": row[0],
+        "voltage": row[2] if row[2] is not None else missing,
+        "tds": row[3] if row[3] is not None else missing,
+        "temp": row[4] if row[4] is not None else missing,
+    }
+
+
+class ReadingDB:
+    """Reading persistence and range queries"""
+
+    @staticmethod
+    def insert_many(channel: str, readings: Iterable[Dict]) -> int:
+        """
+        Insert readings in one transaction; existing (channel, entry_id) rows are kept
+
+        Returns:
+            int: Number of rows actually inserted
+        """
+        rows = [
+            (channel, r["entry_id"], to_epoch(r["created_at"]), r["voltage"], r["tds"], r["temp"])
+            for r in readings
+            if r.get("entry_id") is not None and r.get("created_at")
+        ]
+        if not rows:
+            return 0
+        with get_readings_connection() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                """INSERT OR IGNORE INTO readings
+                   (channel, entry_id, ts, voltage, tds, temp)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                rows
+            )
+            inserted = conn.total_changes - before
+            if inserted:
+                RollupDB.refresh(conn, channel, {row[2] - row[2] % 60 for row in rows})
+            conn.commit()
+            return inserted
+
+    @staticmethod
+    def insert_columns(channel: str, columns) -> int:
+        """
+        Insert a decoded FeedColumns batch; masked metric values are stored as NULL
+
+        Returns:
+            int: Number of rows actually inserted
+        """
+        if not len(columns):
+            return 0
+        metrics = [
+            [None if m else v for v, m in zip(col.data.tolist(), np.ma.getmaskarray(col).tolist())]
+            for col in (columns.voltage, columns.tds, columns.temp)
+        ]
+        rows = zip(
+            repeat(channel), columns.entry_id.tolist(), columns.ts.tolist(), *metrics
+        )
+        with get_readings_connection() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                """INSERT OR IGNORE INTO readings
+                   (channel, entry_id, ts, voltage, tds, temp)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                rows
+            )
+            inserted = conn.total_changes - before
+            if inserted:
+                RollupDB.refresh(conn, channel, np.unique(columns.ts - columns.ts % 60).tolist())
+            conn.commit()
+            return inserted
+
+    @staticmethod
+    def range_rows(channel: str, start_ts: int, end_ts: int, limit: Optional[int] = None) -> List[tuple]:
+        """
+        Raw (entry_id, ts, voltage, tds, temp) tuples with start_ts <= ts < end_ts
+
+        Oldest first. Skips per-row dict/timestamp formatting, for analytics
+        code that works on columns.
+        """
+        query = """SELECT entry_id, ts, voltage, tds, temp FROM readings
+                   WHERE channel = ? AND ts >= ? AND ts < ?
+                   ORDER BY ts"""
+        params = [channel, start_ts, end_ts]
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with get_readings_connection() as conn:
+            return conn.execute(query, params).fetchall()
+
+    @staticmethod
+    def range_page(
+        channel: str,
+        start_ts: int,
+        end_ts: int,
+        limit: int,
+        after: Optional[Tuple[int, int]] = None,
+    ) -> List[tuple]:
+        """
+        One page of range_rows(), ordered by (ts, entry_id)
+
+        Pass the (ts, entry_id) of the previous page's last row as `after`
+        (keyset pagination), so long exports never hold a read transaction
+        or more than one page in memory.
+        """
+        query = """SELECT entry_id, ts, voltage, tds, temp FROM readings
+                   WHERE channel = ? AND ts >= ? AND ts < ?"""
+        params = [channel, start_ts, end_ts]
+        if after is not None:
+            # Seek the index from the cursor's ts; a row-value comparison alone
+            # would still scan from start_ts on every page
+            params[1] = max(start_ts, after[0])
+            query += " AND (ts > ? OR entry_id > ?)"
+            params.extend(after)
+        query += " ORDER BY ts, entry_id LIMIT ?"
+        params.append(limit)
+        with get_readings_connection() as conn:
+            return conn.execute(query, params).fetchall()
+
+    @staticmethod
+    def range(channel: str, start_ts: int, end_ts: int, limit: Optional[int] = None) -> List[Dict]:
+        """Readings with start_ts <= ts < end_ts, oldest first"""
+        return [_row_to_reading(row) for row in ReadingDB.range_rows(channel, start_ts, end_ts, limit)]
+
+    @staticmethod
+    def latest(channel: str, limit: int = 1, missing: Optional[float] = 0.0) -> List[Dict]:
+        """Newest `limit` readings, oldest first (NULL metrics as `missing`)"""
+        with get_readings_connection() as conn:
+            rows = conn.execute(
+                """SELECT entry_id, ts, voltage, tds, temp FROM readings
+                   WHERE channel = ? ORDER BY entry_id DESC LIMIT ?""",
+                (channel, limit)
+            ).fetchall()
+        return [_row_to_reading(row, missing) for row in reversed(rows)]
+
+    @staticmethod
+    def after_entry_id(channel: str, entry_id: int, limit: Optional[int] = None) -> List[Dict]:
+        """Readings with entry_id greater than the cursor, oldest first"""
+        query = """SELECT entry_id, ts, voltage, tds, temp FROM readings
+                   WHERE channel = ? AND entry_id > ?
+                   ORDER BY entry_id"""
+        params = [channel, entry_id]
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with get_readings_connection() as conn:
+            return [_row_to_reading(row) for row in conn.execute(query, params)]
+
+    @staticmethod
+    def max_entry_id(channel: str) -> Optional[int]:
+        with get_readings_connection() as conn:
+            row = conn.execute(
+                "SELECT MAX(entry_id) FROM readings WHERE channel = ?", (channel,)
+            ).fetchone()
+            return row[0]
+
+    @staticmethod
+    def max_ts(channel: str) -> Optional[int]:
+        """Newest stored reading time (epoch seconds)"""
+        with get_readings_connection() as conn:
+            row = conn.execute(
+                "SELECT ts FROM readings WHERE channel = ? ORDER BY ts DESC LIMIT 1", (channel,)
+            ).fetchone()
+            return row[0] if row else None
+
+    @staticmethod
+    def ts_bounds(channel: str) -> Tuple[Optional[int], Optional[int]]:
+        """(oldest, newest) stored reading time (epoch seconds); (None, None) if empty"""
+        with get_readings_connection() as conn:
+            # Two index lookups; MIN and MAX in one SELECT would scan the channel
+            return conn.execute(
+                """SELECT (SELECT ts FROM readings WHERE channel = ? ORDER BY ts LIMIT 1),
+                          (SELECT ts FROM readings WHERE channel = ? ORDER BY ts DESC LIMIT 1)""",
+                (channel, channel)
+            ).fetchone()
+
+    @staticmethod
+    def count(channel: str) -> int:
+        with get_readings_connection() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM readings WHERE channel = ?", (channel,)
+            ).fetchone()[0]
+
+
+class RollupDB:
+    """
+    Rollup buckets maintained alongside readings
+
+    Inserts refresh only the buckets they touch: 1 min buckets are
+    recomputed from raw readings, and each coarser level from the level
+    below. Rebuilding a bucket rather than adding deltas makes late and
+    duplicate entry_ids harmless, since a duplicate is never inserted and a
+    late reading just marks its (old) buckets as touched.
+    """
+
+    @staticmethod
+    def refresh(conn, channel: str, minutes: Iterable[int]) -> None:
+        """Recompute every level for the given minute bucket starts (inside the caller's transaction)"""
+        minutes = sorted(minutes)
+        if not minutes:
+            return
+        runs = []
+        lo = prev = minutes[0]
+        for minute in minutes[1:]:
+            if minute - prev > _ROLLUP_MERGE_GAP:
+                runs.append((lo, prev + 60))
+                lo = minute
+            prev = minute
+        runs.append((lo, prev + 60))
+
+        for lo, hi in runs:
+            RollupDB._refresh_span(conn, channel, lo, hi)
+
+    @staticmethod
+    def _refresh_span(conn, channel: str, lo: int, hi: int) -> None:
+        """Recompute buckets covering [lo, hi) at every resolution"""
+        base = ROLLUP_RESOLUTIONS[0]
+        conn.execute(
+            f"""INSERT OR REPLACE INTO rollups ({_ROLLUP_COLUMNS})
+                SELECT ?, {base}, ts - ts % {base}, COUNT(*), {_RAW_AGGREGATES}
+                FROM readings WHERE channel = ? AND ts >= ? AND ts < ?
+                GROUP BY ts - ts % {base}""",
+            (channel, channel, lo, hi)
+        )
+        for child, resolution in zip(ROLLUP_RESOLUTIONS, ROLLUP_RESOLUTIONS[1:]):
+            lo = lo - lo % resolution
+            hi = -(-hi // resolution) * resolution
+            conn.execute(
+                f"""INSERT OR REPLACE INTO rollups ({_ROLLUP_COLUMNS})
+                    SELECT ?, {resolution}, bucket_ts - bucket_ts % {resolution}, SUM(n), {_CHILD_AGGREGATES}
+                    FROM rollups
+                    WHERE channel = ? AND resolution = ? AND bucket_ts >= ? AND bucket_ts < ?
+                    GROUP BY bucket_ts - bucket_ts % {resolution}""",
+                (channel, channel, child, lo, hi)
+            )
+
+    @staticmethod
+    def rebuild(channel: Optional[str] = None) -> None:
+        """Recompute all rollups from raw readings (one channel, or every channel)"""
+        with get_readings_connection() as conn:
+            query = "SELECT channel, MIN(ts), MAX(ts) FROM readings"
+            params = []
+            if channel is not None:
+                query += " WHERE channel = ?"
+                params.append(channel)
+            spans = conn.execute(query + " GROUP BY channel", params).fetchall()
+            for span_channel, min_ts, max_ts in spans:
+                conn.execute("DELETE FROM rollups WHERE channel = ?", (span_channel,))
+                RollupDB._refresh_span(conn, span_channel, min_ts - min_ts % 60, max_ts - max_ts % 60 + 60)
+            conn.commit()
+
+    @staticmethod
+    def range_rows(channel: str, resolution: int, start_ts: int, end_ts: int) -> List[tuple]:
+        """
+        Buckets with start_ts <= bucket_ts < end_ts, oldest first
+
+        Each tuple is (bucket_ts, n, then count/sum/min/max/sumsq for each of
+        ROLLUP_METRICS).
+        """
+        columns = _ROLLUP_COLUMNS.split(", ", 2)[2]
+        with get_readings_connection() as conn:
+            return conn.execute(
+                f"""SELECT {columns} FROM rollups
+                    WHERE channel = ? AND resolution = ? AND bucket_ts >= ? AND bucket_ts < ?
+                    ORDER BY bucket_ts""",
+                (channel, resolution, start_ts, end_ts)
+            ).fetchall()
+
+    @staticmethod
+    def bucket_counts(channel: str, resolution: int, start_ts: int, end_ts: int) -> Dict[int, int]:
+        """{bucket_ts: readings} for buckets with start_ts <= bucket_ts < end_ts (empty buckets omitted)"""
+        with get_readings_connection() as conn:
+            return dict(conn.execute(
+                """SELECT bucket_ts, n FROM rollups
+                   WHERE channel = ? AND resolution = ? AND bucket_ts >= ? AND bucket_ts < ?""",
+                (channel, resolution, start_ts, end_ts)
+            ).fetchall())
+
+
+class BackfillCheckpointDB:
+    """Completed backfill windows, so an interrupted backfill can resume"""
+
+    @staticmethod
+    def completed(channel: str, start_ts: int, end_ts: int) -> set:
+        """(start_ts, end_ts) pairs already completed inside the given range"""
+        with get_readings_connection() as conn:
+            rows = conn.execute(
+                """SELECT start_ts, end_ts FROM backfill_checkpoints
+                   WHERE channel = ? AND start_ts >= ? AND end_ts <= ?""",
+                (channel, start_ts, end_ts)
+            ).fetchall()
+        return {(row[0], row[1]) for row in rows}
+
+    @staticmethod
+    def mark_done(channel: str, start_ts: int, end_ts: int, rows: int) -> None:
+        with get_readings_connection() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO backfill_checkpoints
+                   (channel, start_ts, end_ts, rows, completed_at)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (channel, start_ts, end_ts, rows, int(time.time()))
+            )
+            conn.commit()
+
+
+# Initialize database on module import
+init_readings_db()
@@ -59,6 +59,21 @@ class DBAlertConfig(Base):
     last_alert_time = Column(DateTime)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class DBAlertRule(Base):
+    """Declarative alert rule (condition format in app/services/alert_rules.py)"""
+    __tablename__ = "alert_rules"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), unique=True, nullable=False)
+    alert_type = Column(String(50), nullable=False)
+    severity = Column(String(20), default="warning")  # 'critical', 'warning', 'info'
+    condition = Column(JSON, nullable=False)
+    min_duration_seconds = Column(Float, default=0.0)
+    channel_id = Column(String(50))  # None = every device
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 # Database initialization
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./alerts.db")
 engine = create_engine(
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
 # Base Schema (Shared properties)
@@ -22,3 +22,24 @@ class DashboardData(BaseModel):
     history: List[ReadingBase]
     system_status: str
     last_updated: datetime
+    # True when ThingSpeak is unreachable and this is the last good snapshot
+    stale: bool = False
+    snapshot_age_seconds: Optional[float] = None
+    # Delta responses (since_entry_id / since) only carry readings past the cursor
+    delta: bool = False
+    # Pass back as since_entry_id on the next call (last entry_id returned)
+    cursor: Optional[int] = None
+    # More readings past the cursor than one response holds; ask again
+    has_more: bool = False
+    # The cursor fell out of the buffer: this is a full snapshot, replace history
+    reset: bool = False
+    # NORMAL / WARNING / CRITICAL per history row, and counts / seconds per state
+    history_status: List[str] = []
+    status_summary: Optional[Dict] = None
+
+
+# Request body for a historical backfill
+class BackfillRequest(BaseModel):
+    start: datetime
+    end: Optional[datetime] = None
+    channel_id: Optional[str] = None
@@ -0,0 +1,218 @@
+"""
+Alert digest
+Holds non-critical alerts for ALERT_DIGEST_WINDOW_SECONDS and sends one
+merged message per destination, so an alert storm costs one Telegram call
+per recipient instead of one per breach
+
+Pending alerts live in memory and go out from a timer task, so the digest
+is only used while the background poller runs (the lifespan owns the
+loop and flushes on shutdown); without it alerts are sent directly.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.models.database import DBAlertHistory, SessionLocal
+from app.services.alert_state import get_alert_state
+from app.services.poller import get_poller
+from app.services.telegram_service import TelegramService, get_telegram_service
+
+logger = logging.getLogger(__name__)
+
+# Reading each alert type is about, for its worst value when none is given
+ALERT_METRICS = {'high_tds': 'tds', 'high_temp': 'temp', 'low_voltage': 'voltage'}
+
+
+def _alert_value(alert_type: str, value: Optional[float], tds, temp, voltage) -> Optional[float]:
+    if value is None and alert_type in ALERT_METRICS:
+        return {'tds': tds, 'temp': temp, 'voltage': voltage}[ALERT_METRICS[alert_type]]
+    return value
+
+
+class DigestEntry:
+    """One alert type's share of a pending digest"""
+    __slots__ = (
+        "alert_type", "count", "worst", "threshold", "first_at", "last_at", "tds", "temp", "voltage", "history_ids",
+    )
+
+    def __init__(self, alert_type: str, threshold: float, when: datetime):
+        self.alert_type = alert_type
+        self.count = 0
+        self.worst: Optional[float] = None
+        self.threshold = threshold
+        self.first_at = when
+        self.last_at = when
+        self.tds = self.temp = self.voltage = None
+        # Alert history rows this entry delivers
+        self.history_ids: List[int] = []
+
+    def add(self, value: Optional[float], threshold: float, tds, temp, voltage, when: datetime) -> None:
+        self.count += 1
+        # Worst = furthest past the threshold, whichever side it breaches on
+        if value is not None and (self.worst is None or abs(value - threshold) > abs(self.worst - self.threshold)):
+            self.worst, self.threshold = value, threshold
+        self.last_at = when
+        self.tds, self.temp, self.voltage = tds, temp, voltage
+
+    def as_dict(self) -> Dict:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+class AlertDigest:
+    """
+    Pending alerts per destination (Telegram chat id)
+
+    The first alert queued for a destination opens its window; when the
+    window closes everything queued for it goes out as one message.
+    Alerts repeated while their type is in cooldown can be folded into an
+    open digest (note_repeat) so its counts and worst values stay honest.
+    `on_sent` is called with the entries of each digest that went out.
+    """
+
+    def __init__(
+        self,
+        window_seconds: Optional[float] = None,
+        telegram: Optional[TelegramService] = None,
+        on_sent: Optional[Callable[[List[Dict]], None]] = None,
+    ):
+        self.window_seconds = settings.ALERT_DIGEST_WINDOW_SECONDS if window_seconds is None else window_seconds
+        self._telegram = telegram
+        self.on_sent = on_sent
+        # chat_id -> alert_type -> entry
+        self._pending: Dict[str, Dict[str, DigestEntry]] = {}
+        self._timers: Dict[str, asyncio.Task] = {}
+        self.alerts_queued = 0
+        self.repeats_folded = 0
+        self.digests_sent = 0
+        self.digests_failed = 0
+
+    @property
+    def telegram(self) -> TelegramService:
+        return self._telegram or get_telegram_service()
+
+    def add(
+        self,
+        chat_ids: List[str],
+        alert_type: str,
+        threshold: float,
+        tds: float,
+        temp: float,
+        voltage: float,
+        value: Optional[float] = None,
+        history_id: Optional[int] = None,
+    ) -> None:
+        """Queue an alert for each destination, opening their windows as needed"""
+        value = _alert_value(alert_type, value, tds, temp, voltage)
+        now = datetime.utcnow()
+        for chat_id in chat_ids:
+            pending = self._pending.setdefault(chat_id, {})
+            entry = pending.get(alert_type)
+            if entry is None:
+                entry = pending[alert_type] = DigestEntry(alert_type, threshold, now)
+            entry.add(value, threshold, tds, temp, voltage, now)
+            if history_id is not None:
+                entry.history_ids.append(history_id)
+            if chat_id not in self._timers:
+                self._timers[chat_id] = asyncio.create_task(self._flush_later(chat_id))
+        self.alerts_queued += 1
+
+    def is_queued(self, alert_type: str) -> bool:
+        """True while a digest carrying `alert_type` is waiting to go out"""
+        return any(alert_type in pending for pending in self._pending.values())
+
+    def note_repeat(
+        self, alert_type: str, threshold: float, tds: float, temp: float, voltage: float, value: Optional[float] = None
+    ) -> bool:
+        """Fold an alert that won't be sent into open digests that already carry its type"""
+        value = _alert_value(alert_type, value, tds, temp, voltage)
+        now = datetime.utcnow()
+        folded = False
+        for pending in self._pending.values():
+            entry = pending.get(alert_type)
+            if entry is not None:
+                entry.add(value, threshold, tds, temp, voltage, now)
+                folded = True
+        if folded:
+            self.repeats_folded += 1
+        return folded
+
+    async def _flush_later(self, chat_id: str) -> None:
+        await asyncio.sleep(self.window_seconds)
+        self._timers.pop(chat_id, None)
+        try:
+            await self._send(chat_id)
+        except Exception:
+            self.digests_failed += 1
+            logger.exception("Sending alert digest failed")
+
+    async def _send(self, chat_id: str) -> bool:
+        pending = self._pending.pop(chat_id, None)
+        if not pending:
+            return False
+        message = self.telegram.format_digest_message([entry.as_dict() for entry in pending.values()])
+        sent = await self.telegram.send_alert(chat_id, message)
+        if sent:
+            self.digests_sent += 1
+            logger.info(f"Alert digest sent: {sum(e.count for e in pending.values())} alerts in one message")
+            if self.on_sent is not None:
+                self.on_sent([entry.as_dict() for entry in pending.values()])
+        else:
+            self.digests_failed += 1
+        return sent
+
+    async def flush(self) -> int:
+        """Send every pending digest now (e.g. on shutdown); returns how many went out"""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        results = [await self._send(chat_id) for chat_id in list(self._pending)]
+        return sum(results)
+
+    def stats(self) -> Dict:
+        return {
+            'window_seconds': self.window_seconds,
+            'pending_destinations': len(self._pending),
+            'alerts_queued': self.alerts_queued,
+            'repeats_folded': self.repeats_folded,
+            'digests_sent': self.digests_sent,
+            'digests_failed': self.digests_failed,
+        }
+
+
+def record_delivery(entries: List[Dict]) -> None:
+    """
+    on_sent hook: start each delivered alert type's cooldown and count the
+    recipient on its history rows (a queued alert starts no cooldown)
+    """
+    db = SessionLocal()
+    try:
+        state = get_alert_state()
+        state.config(db)
+        for entry in entries:
+            state.record_alert(db, entry['alert_type'])
+            if not entry['history_ids']:
+                continue
+            for row in db.query(DBAlertHistory).filter(DBAlertHistory.id.in_(entry['history_ids'])):
+                row.recipient_count = (row.recipient_count or 0) + 1
+                row.delivery_status = {**(row.delivery_status or {}), 'success': row.recipient_count}
+        db.commit()
+    finally:
+        db.close()
+
+
+def digest_available() -> bool:
+    """The digest needs a loop that outlives requests: ALERT_DIGEST_ENABLED and a running poller"""
+    return settings.ALERT_DIGEST_ENABLED and get_poller().running
+
+
+# Singleton instance
+_alert_digest: Optional[AlertDigest] = None
+
+
+def get_alert_digest() -> AlertDigest:
+    global _alert_digest
+    if _alert_digest is None:
+        _alert_digest = AlertDigest(on_sent=record_delivery)
+    return _alert_digest
@@ -2,90 +2,72 @@
 Alert Engine - Core monitoring and alerting logic
 Handles threshold monitoring, cooldown, and alert triggering
 """
-import os
-from datetime import datetime, timedelta
-from typing import Optional, Dict
+from datetime import datetime
+from typing import Optional, Dict, List
 from sqlalchemy.orm import Session
-from app.models.database import DBAlertHistory, DBAlertConfig, DBAlertRecipient
+from app.models.database import DBAlertHistory, DBAlertRecipient, SessionLocal
+from app.services.alert_state import AlertConfigSnapshot, AlertStateCache, get_alert_state
+from app.services.alert_digest import digest_available, get_alert_digest
+from app.services.alert_rules import ReadingBatch, RuleEvaluation, get_rule_registry
+from app.services.alert_window import RuleState, WindowEvaluation, evaluate_window, readings_columns, rules_from_config
+from app.core.config import settings
+from app.database.readings import from_epoch
 from app.services.telegram_service import get_telegram_service
 import asyncio
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 class AlertEngine:
     """Core alert monitoring and triggering engine"""
     
-    def __init__(self, db_session: Session):
+    def __init__(self, db_session: Session, state: Optional[AlertStateCache] = None):
         self.db = db_session
         self.telegram = get_telegram_service()
+        # Shared, cached config and cooldowns (no query once warm)
+        self.state = state or get_alert_state()
         self.config = self._load_config()
     
-    def _load_config(self) -> DBAlertConfig:
-        """Load alert configuration from database"""
-        config = self.db.query(DBAlertConfig).first()
-        if not config:
-            # Create default config
-            config = DBAlertConfig(
-                tds_threshold=float(os.getenv("TDS_ALERT_THRESHOLD", 150.0)),
-                temp_threshold=float(os.getenv("TEMP_ALERT_THRESHOLD", 35.0)),
-                cooldown_minutes=int(os.getenv("ALERT_COOLDOWN_MINUTES", 15))
-            )
-            self.db.add(config)
-            self.db.commit()
-            self.db.refresh(config)
-        return config
+    def _load_config(self) -> AlertConfigSnapshot:
+        """Alert configuration from the process-wide state cache"""
+        return self.state.config(self.db)
+    
+    def breaches(self, tds: float, temp: float, voltage: float) -> List[Dict]:
+        """
+        Active alert rules whose condition holds for one reading of the
+        configured channel (no minimum duration, no carried state)
+        """
+        channel_id = str(settings.THINGSPEAK_CHANNEL_ID)
+        reading = {'created_at': from_epoch(int(time.time())), 'tds': tds, 'temp': temp, 'voltage': voltage}
+        rule_set = get_rule_registry().rule_set(self.db, self.config)
+        batch = ReadingBatch({channel_id: [reading]})
+        hits = []
+        for rule in rule_set.rules:
+            if rule.channel_id not in (None, channel_id) or not rule.predicate(batch)[0]:
+                continue
+            hits.append({
+                'type': rule.alert_type,
+                'severity': rule.severity,
+                'threshold': rule.threshold,
+                'current_value': reading.get(rule.metric),
+                'parameter': rule.name
+            })
+        return hits
     
     def check_thresholds(self, tds: float, temp: float, voltage: float) -> Optional[Dict]:
         """
-        Check if sensor values exceed thresholds
+        Check if sensor values exceed thresholds (the alert rules, in order)
         
         Returns:
-            dict with alert info if threshold exceeded, None otherwise
-        """
-        alert_info = None
-        
-        # Check TDS threshold
-        if tds > self.config.tds_threshold:
-            alert_info = {
-                'type': 'high_tds',
-                'severity': 'critical',
-                'threshold': self.config.tds_threshold,
-                'current_value': tds,
-                'parameter': 'TDS'
-            }
-        
-        # Check temperature threshold
-        elif temp > self.config.temp_threshold:
-            alert_info = {
-                'type': 'high_temp',
-                'severity': 'warning',
-                'threshold': self.config.temp_threshold,
-                'current_value': temp,
-                'parameter': 'Temperature'
-            }
-        
-        # Check low voltage
-        elif voltage < 3.0:
-            alert_info = {
-                'type': 'low_voltage',
-                'severity': 'warning',
-                'threshold': 3.0,
-                'current_value': voltage,
-                'parameter': 'Voltage'
-            }
-        
-        return alert_info
+            dict with alert info for the first rule breached, None otherwise
+        """
+        hits = self.breaches(tds, temp, voltage)
+        return hits[0] if hits else None
     
-    def should_send_alert(self) -> bool:
-        """Check if enough time has passed since last alert (cooldown)"""
-        if not self.config.last_alert_time:
-            return True
-        
-        time_since_last = datetime.utcnow() - self.config.last_alert_time
-        cooldown_delta = timedelta(minutes=self.config.cooldown_minutes)
-        
-        return time_since_last >= cooldown_delta
+    def should_send_alert(self, alert_type: Optional[str] = None) -> bool:
+        """Check if `alert_type` (the last alert of any type if None) is out of cooldown"""
+        return not self.state.cooldown_remaining(alert_type)
     
     async def trigger_alert(
         self, 
@@ -94,23 +76,45 @@ class AlertEngine:
         tds: float, 
         temp: float, 
         voltage: float,
-        threshold: float
+        threshold: float,
+        value: Optional[float] = None
     ) -> Dict:
         """
         Trigger an alert and send to all active recipients
         
+        Non-critical alerts are queued for the next alert digest (one
+        message per recipient per ALERT_DIGEST_WINDOW_SECONDS) instead of
+        being sent on their own, when the digest is available; `value` is
+        the breaching reading, used for the digest's worst value. A queued
+        type starts its cooldown once the digest is sent, and repeats
+        until then are folded into it.
+        
         Returns:
             dict: Alert execution results
         """
-        # Check cooldown
-        if not self.should_send_alert():
-            time_left = self._get_cooldown_remaining()
+        digest = get_alert_digest() if severity != 'critical' and digest_available() else None
+        
+        if digest is not None and digest.is_queued(alert_type):
+            digest.note_repeat(alert_type, threshold, tds, temp, voltage, value)
+            return {
+                'sent': False,
+                'reason': 'queued',
+                'recipients': 0,
+                'digested': True
+            }
+        
+        # Check cooldown (per alert type, from memory)
+        if not self.should_send_alert(alert_type):
+            time_left = self._get_cooldown_remaining(alert_type)
             logger.info(f"Alert suppressed due to cooldown. {time_left} minutes remaining.")
+            # Still counted if a digest carrying this type is waiting to go out
+            folded = digest is not None and digest.note_repeat(alert_type, threshold, tds, temp, voltage, value)
             return {
                 'sent': False,
                 'reason': 'cooldown',
                 'time_remaining_minutes': time_left,
-                'recipients': 0
+                'recipients': 0,
+                'digested': folded
             }
         
         # Get active recipients
@@ -136,9 +140,13 @@ class AlertEngine:
             threshold=threshold
         )
         
-        # Send to all recipients
         chat_ids = [r.telegram_chat_id for r in recipients if r.telegram_chat_id]
-        delivery_results = await self.telegram.send_bulk_alert(chat_ids, message)
+        if digest is not None:
+            # Queued once the history row has an id
+            delivery_results = {'success': 0, 'failed': 0, 'total': len(chat_ids), 'queued': len(chat_ids)}
+        else:
+            # Send to all recipients
+            delivery_results = await self.telegram.send_bulk_alert(chat_ids, message)
         
         # Log alert in database
         alert_log = DBAlertHistory(
@@ -151,14 +159,34 @@ class AlertEngine:
             threshold=threshold,
             recipients_notified=[r.name for r in recipients],
             channels_used=['telegram'],
-            delivery_status={'success': delivery_results['success'], 'failed': delivery_results['failed']},
+            delivery_status={
+                'success': delivery_results['success'],
+                'failed': delivery_results['failed'],
+                'queued_for_digest': delivery_results.get('queued', 0)
+            },
             recipient_count=delivery_results['success']
         )
         self.db.add(alert_log)
         
-        # Update last alert time
-        self.config.last_alert_time = datetime.utcnow()
+        if digest is None:
+            # Start this type's cooldown; written through with the history row
+            self.state.record_alert(self.db, alert_type)
         self.db.commit()
+        self.config = self.state.config(self.db)
+        
+        if digest is not None:
+            # Its cooldown starts when the digest goes out (record_delivery)
+            digest.add(chat_ids, alert_type, threshold, tds, temp, voltage, value, history_id=alert_log.id)
+            logger.info(f"Alert queued for digest: {alert_type} | {len(chat_ids)} recipients")
+            return {
+                'sent': False,
+                'queued': True,
+                'alert_type': alert_type,
+                'severity': severity,
+                'recipients': len(chat_ids),
+                'digest_window_seconds': digest.window_seconds,
+                'timestamp': datetime.utcnow().isoformat()
+            }
         
         logger.info(f"Alert triggered: {alert_type} | Sent to {delivery_results['success']}/{delivery_results['total']} recipients")
         
@@ -172,16 +200,9 @@ class AlertEngine:
             'timestamp': datetime.utcnow().isoformat()
         }
     
-    def _get_cooldown_remaining(self) -> float:
+    def _get_cooldown_remaining(self, alert_type: Optional[str] = None) -> float:
         """Get remaining cooldown time in minutes"""
-        if not self.config.last_alert_time:
-            return 0.0
-        
-        time_since_last = datetime.utcnow() - self.config.last_alert_time
-        cooldown_delta = timedelta(minutes=self.config.cooldown_minutes)
-        remaining = cooldown_delta - time_since_last
-        
-        return max(0.0, remaining.total_seconds() / 60)
+        return self.state.cooldown_remaining(alert_type).total_seconds() / 60
     
     async def process_sensor_data(self, tds: float, temp: float, voltage: float) -> Optional[Dict]:
         """
@@ -200,12 +221,107 @@ class AlertEngine:
                 tds=tds,
                 temp=temp,
                 voltage=voltage,
-                threshold=alert_info['threshold']
+                threshold=alert_info['threshold'] if alert_info['threshold'] is not None else 0.0,
+                value=alert_info['current_value']
             )
             return result
         
         return None
     
+    def evaluate_window(
+        self, readings: List[Dict], initial: Optional[Dict[str, RuleState]] = None
+    ) -> WindowEvaluation:
+        """
+        Breach state of every rule over `readings` (oldest first) in one pass
+
+        Unlike check_thresholds, all rules are evaluated, a breach clears only
+        past its exit threshold, and it fires only once sustained for
+        ALERT_MIN_DURATION_SECONDS.
+        """
+        ts, metrics = readings_columns(readings)
+        return evaluate_window(ts, metrics, rules_from_config(self.config), initial)
+    
+    async def process_window(self, readings: List[Dict], initial: Optional[Dict[str, RuleState]] = None) -> List[Dict]:
+        """
+        Windowed counterpart of process_sensor_data: trigger an alert for each
+        rule firing at the newest reading (cooldowns still apply per type)
+        """
+        if not readings:
+            return []
+        return await self.alert_window(self.evaluate_window(readings, initial), readings[-1])
+    
+    async def alert_window(self, evaluation: WindowEvaluation, latest: Dict) -> List[Dict]:
+        """Trigger an alert for each rule of `evaluation` firing at `latest`, its newest reading"""
+        results = []
+        for rule in evaluation.active():
+            logger.info(f"Sustained breach: {rule.parameter} = {latest.get(rule.metric)} (threshold: {rule.enter})")
+            results.append(await self.trigger_alert(
+                alert_type=rule.alert_type,
+                severity=rule.severity,
+                tds=latest.get('tds'),
+                temp=latest.get('temp'),
+                voltage=latest.get('voltage'),
+                threshold=rule.enter,
+                value=latest.get(rule.metric)
+            ))
+        return results
+    
+    def evaluate_rules(self, readings_by_channel: Dict[str, List[Dict]], initial: Optional[Dict] = None) -> RuleEvaluation:
+        """
+        Evaluate every active alert rule over a batch of readings
+        ({channel_id: readings oldest first}) in one pass
+        """
+        rule_set = get_rule_registry().rule_set(self.db, self.config)
+        return rule_set.evaluate(ReadingBatch(readings_by_channel), initial)
+    
+    async def process_batch(self, readings_by_channel: Dict[str, List[Dict]], initial: Optional[Dict] = None) -> List[Dict]:
+        """
+        Rule-based counterpart of process_window: trigger an alert for each
+        rule firing at a device's newest reading (cooldowns apply per type)
+        """
+        return await self.alert_rules(self.evaluate_rules(readings_by_channel, initial))
+    
+    async def alert_rules(self, evaluation: RuleEvaluation) -> List[Dict]:
+        """Trigger an alert for each rule of `evaluation` firing at a device's newest reading"""
+        results = []
+        for hit in evaluation.active():
+            rule = hit['rule']
+            latest = evaluation.reading(hit['index'])
+            logger.info(f"Alert rule '{rule.name}' firing on channel {hit['channel_id']}")
+            results.append(await self.trigger_alert(
+                alert_type=rule.alert_type,
+                severity=rule.severity,
+                tds=latest.get('tds'),
+                temp=latest.get('temp'),
+                voltage=latest.get('voltage'),
+                threshold=rule.threshold if rule.threshold is not None else 0.0,
+                value=hit['value']
+            ))
+        return results
+    
+    async def process_anomalies(self, anomalies: List[Dict]) -> Optional[Dict]:
+        """
+        Alert once for a batch of anomaly detector output, reporting the
+        newest anomaly ('anomaly' has its own cooldown)
+        """
+        if not anomalies:
+            return None
+        latest = anomalies[-1]
+        logger.info(
+            f"Anomaly: {latest['metric']} = {latest['value']} "
+            f"(expected ~{latest['expected']}; {', '.join(latest['methods'])})"
+        )
+        reading = latest['reading']
+        return await self.trigger_alert(
+            alert_type='anomaly',
+            severity='warning',
+            tds=reading.get('tds'),
+            temp=reading.get('temp'),
+            voltage=reading.get('voltage'),
+            threshold=latest['expected'],
+            value=latest['value']
+        )
+    
     def get_alert_status(self) -> Dict:
         """Get current alert system status"""
         return {
@@ -217,3 +333,21 @@ class AlertEngine:
             'cooldown_remaining': self._get_cooldown_remaining(),
             'can_send_alert': self.should_send_alert()
         }
+
+
+async def send_anomaly_alert(anomalies: List[Dict]) -> Optional[Dict]:
+    """AlertEngine.process_anomalies with a session of its own (for background tasks)"""
+    db = SessionLocal()
+    try:
+        return await AlertEngine(db).process_anomalies(anomalies)
+    finally:
+        db.close()
+
+
+async def send_rule_alerts(evaluation: RuleEvaluation) -> List[Dict]:
+    """AlertEngine.alert_rules with a session of its own (for background tasks)"""
+    db = SessionLocal()
+    try:
+        return await AlertEngine(db).alert_rules(evaluation)
+    finally:
+        db.close()
@@ -0,0 +1,133 @@
+"""
+Live alert monitoring
+Evaluates the alert rules (see app/services/alert_rules.py) over each
+poll's new readings, carrying every rule's breach state from one poll to
+the next, and alerts on breaches sustained at the newest reading
+"""
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.database.readings import from_epoch
+from app.models.database import SessionLocal
+from app.services.alert_rules import RuleEvaluation
+from app.services.alert_window import RuleState
+from app.services.ingestion import IncrementalIngestor, get_ingestor
+
+logger = logging.getLogger(__name__)
+
+
+class AlertMonitor:
+    """
+    Rule evaluation that follows the ingestor
+
+    Each evaluation covers the buffered readings it hasn't seen yet, so
+    hysteresis and the minimum duration hold across polls (and a monitor
+    created after a restart starts from the hydrated buffer). `firing`
+    is the decision at the newest reading; other alert paths read it
+    instead of comparing raw values.
+    """
+
+    def __init__(self, ingestor: Optional[IncrementalIngestor] = None):
+        self.ingestor = ingestor or get_ingestor()
+        # (rule name, channel) -> state, as RuleSet.evaluate takes it
+        self.state: Dict[Tuple[str, str], RuleState] = {}
+        self.firing: List[Dict] = []
+        self.last_entry_id: Optional[int] = None
+        self.evaluations = 0
+        self.readings = 0
+        self.alerts_dispatched = 0
+        self._alert_tasks: set = set()
+        if ingestor is not None:
+            ingestor.add_listener(self.on_poll)
+
+    def unseen(self) -> List[Dict]:
+        """Buffered readings newer than the last one evaluated, oldest first"""
+        buffer = self.ingestor.buffer
+        if self.last_entry_id is None:
+            return buffer.snapshot()
+        return buffer.after(self.last_entry_id)
+
+    def evaluate(self, readings: List[Dict]) -> Optional[RuleEvaluation]:
+        """Fold readings (oldest first) into the carried state; updates `firing`"""
+        if not readings:
+            return None
+        # Imported here: the alert engine pulls in the database models
+        from app.services.alert_engine import AlertEngine
+        db = SessionLocal()
+        try:
+            evaluation = AlertEngine(db).evaluate_rules({str(self.ingestor.channel_id): readings}, self.state)
+        finally:
+            db.close()
+        self.state = evaluation.final_state
+        self.last_entry_id = readings[-1]["entry_id"]
+        self.evaluations += 1
+        self.readings += len(readings)
+        self.firing = [
+            {
+                "alert_type": hit["rule"].alert_type,
+                "rule": hit["rule"].name,
+                "severity": hit["rule"].severity,
+                "threshold": hit["rule"].threshold,
+                "value": hit["value"],
+                "since": from_epoch(self.state[(hit["rule"].name, hit["channel_id"])].breach_since),
+            }
+            for hit in evaluation.active()
+        ]
+        return evaluation
+
+    def catch_up(self) -> List[Dict]:
+        """Evaluate unseen readings and alert on the rules firing; returns `firing`"""
+        readings = self.unseen()
+        evaluation = self.evaluate(readings)
+        if evaluation is not None and self.firing and settings.ALERT_MONITOR_ALERTS_ENABLED:
+            self._dispatch(evaluation)
+        return self.firing
+
+    def on_poll(self, result: Dict) -> None:
+        """Ingestor listener: evaluate each poll's new readings"""
+        if result.get("readings"):
+            self.catch_up()
+
+    def _dispatch(self, evaluation: RuleEvaluation) -> None:
+        """Trigger the alerts in the background (listeners must not block the poll)"""
+        from app.services.alert_engine import send_rule_alerts
+        try:
+            task = asyncio.get_running_loop().create_task(send_rule_alerts(evaluation))
+        except RuntimeError:
+            return
+        self.alerts_dispatched += 1
+        self._alert_tasks.add(task)
+        task.add_done_callback(self._dispatch_done)
+
+    def _dispatch_done(self, task: asyncio.Task) -> None:
+        self._alert_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Alert dispatch failed: {task.exception()!r}")
+
+    async def drain(self) -> None:
+        """Wait for dispatched alerts (request handlers that can't outlive them)"""
+        if self._alert_tasks:
+            await asyncio.gather(*list(self._alert_tasks), return_exceptions=True)
+
+    def stats(self) -> Dict:
+        return {
+            'evaluations': self.evaluations,
+            'readings': self.readings,
+            'last_entry_id': self.last_entry_id,
+            'firing': [hit['alert_type'] for hit in self.firing],
+            'alerts_dispatched': self.alerts_dispatched,
+        }
+
+
+# Singleton instance
+_alert_monitor: Optional[AlertMonitor] = None
+
+
+def get_alert_monitor() -> AlertMonitor:
+    """Get or create the shared monitor (registers with the ingestor)"""
+    global _alert_monitor
+    if _alert_monitor is None:
+        _alert_monitor = AlertMonitor(get_ingestor())
+    return _alert_monitor
@@ -0,0 +1,455 @@
+"""
+Declarative alert rules
+Rules stored in the alert_rules table, compiled once into NumPy predicates
+and evaluated together over a batch of readings from any number of devices
+
+Condition format (JSON):
+    {"metric": "tds", "op": ">", "value": 150}
+        threshold; `value` may name a numeric alert config field instead,
+        e.g. "tds_threshold", to follow config changes
+    {"metric": "tds", "rate": 60, "op": ">", "value": 20}
+        rate of change: per `rate` seconds, between consecutive readings
+    {"all": [...]}, {"any": [...]}, {"not": {...}}
+        combined conditions; a comparison with a missing value is neither
+        true nor false, so its negation doesn't hold either
+    {"enter": {...}, "exit": {...}}
+        hysteresis (top level only): in breach from when `enter` holds
+        until `exit` does. A plain condition's breach ends once it is
+        false; missing values never start or end one.
+
+A rule's min_duration_seconds is how long its breach must last before it
+fires; channel_id limits it to one device.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, inspect
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.database import DBAlertRule
+from app.services.alert_window import (
+    WINDOW_METRICS, RuleState, hysteresis, readings_columns, rules_from_config, sustained,
+)
+
+logger = logging.getLogger(__name__)
+
+OPERATORS = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+
+# Names a threshold `value` may refer to: alert config fields, and the
+# enter/exit thresholds rules_from_config derives from them
+CONFIG_VALUES = (
+    "tds_threshold", "temp_threshold", "warning_threshold",
+    "tds_exit_threshold", "temp_exit_threshold", "low_voltage", "voltage_exit_threshold",
+)
+
+
+def config_values(config) -> Dict[str, float]:
+    """CONFIG_VALUES resolved against an alert config row/snapshot"""
+    window = {rule.alert_type: rule for rule in rules_from_config(config)}
+    return {
+        "tds_threshold": config.tds_threshold,
+        "temp_threshold": config.temp_threshold,
+        "warning_threshold": config.warning_threshold,
+        "tds_exit_threshold": window["high_tds"].exit,
+        "temp_exit_threshold": window["high_temp"].exit,
+        "low_voltage": window["low_voltage"].enter,
+        "voltage_exit_threshold": window["low_voltage"].exit,
+    }
+
+
+# Seeded while the alert_rules table is empty; the same rules (and
+# hysteresis) as rules_from_config, so every alert path follows them
+DEFAULT_RULES = [
+    {
+        "name": "High TDS", "alert_type": "high_tds", "severity": "critical",
+        "condition": {
+            "enter": {"metric": "tds", "op": ">", "value": "tds_threshold"},
+            "exit": {"metric": "tds", "op": "<=", "value": "tds_exit_threshold"},
+        },
+    },
+    {
+        "name": "High temperature", "alert_type": "high_temp", "severity": "warning",
+        "condition": {
+            "enter": {"metric": "temp", "op": ">", "value": "temp_threshold"},
+            "exit": {"metric": "temp", "op": "<=", "value": "temp_exit_threshold"},
+        },
+    },
+    {
+        "name": "Low voltage", "alert_type": "low_voltage", "severity": "warning",
+        "condition": {
+            "enter": {"metric": "voltage", "op": "<", "value": "low_voltage"},
+            "exit": {"metric": "voltage", "op": ">=", "value": "voltage_exit_threshold"},
+        },
+    },
+]
+
+
+class RuleDefinitionError(ValueError):
+    """A rule's condition can't be compiled"""
+
+
+class ReadingBatch:
+    """
+    Readings from one or more devices as flat columns, grouped by device
+    and oldest first within each; computed columns are memoized so rules
+    sharing a sub-condition compute it once
+    """
+
+    def __init__(self, readings_by_channel: Dict[str, List[Dict]]):
+        groups = [(str(channel), readings) for channel, readings in readings_by_channel.items() if readings]
+        self.channels = [channel for channel, _ in groups]
+        self._index = {channel: i for i, channel in enumerate(self.channels)}
+        lengths = [len(readings) for _, readings in groups]
+        # One decode for the whole batch rather than one per device
+        self.ts, self.metrics = readings_columns([reading for _, readings in groups for reading in readings])
+        self.device = np.repeat(np.arange(len(lengths)), lengths)
+        self.segment_start = np.zeros(len(self.ts), dtype=bool)
+        self.segment_end = np.zeros(len(self.ts), dtype=bool)
+        ends = np.cumsum(np.array(lengths, dtype=np.int64))
+        self.segment_start[ends - np.array(lengths, dtype=np.int64)] = True
+        self.segment_end[ends - 1] = True
+        self._memo: Dict[Tuple, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def memo(self, key: Tuple, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    def rate(self, metric: str, per_seconds: float) -> np.ndarray:
+        """Change per `per_seconds` since the device's previous reading (NaN for its first)"""
+        def compute():
+            values = self.metrics[metric]
+            dv = np.diff(values, prepend=np.nan)
+            dt = np.diff(self.ts, prepend=0).astype(np.float64)
+            dt[self.segment_start | (dt <= 0)] = np.nan
+            return dv / dt * per_seconds
+        return self.memo(("rate", metric, per_seconds), compute)
+
+    def channel_mask(self, channel_id: str) -> np.ndarray:
+        if channel_id not in self._index:
+            return np.zeros(len(self.ts), dtype=bool)
+        return self.device == self._index[channel_id]
+
+    def segment_of(self, channel_id: str) -> Optional[int]:
+        return self._index.get(channel_id)
+
+
+Predicate = Callable[[ReadingBatch], np.ndarray]
+
+
+def _resolve_value(value: Any, config) -> float:
+    if isinstance(value, str):
+        if value not in CONFIG_VALUES:
+            raise RuleDefinitionError(f"Unknown config value '{value}' (expected one of {', '.join(CONFIG_VALUES)})")
+        value = config_values(config)[value]
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise RuleDefinitionError(f"Threshold value must be a number, got {value!r}")
+    return float(value)
+
+
+class Condition(NamedTuple):
+    """
+    A compiled condition: `holds` where it is true, `fails` where it is
+    known to be false. A comparison with a missing operand (NaN value, a
+    device's first rate) is neither, so negating it never makes it true.
+    """
+    holds: Predicate
+    fails: Predicate
+    # Metric and value of the first plain threshold (reported with the alert)
+    metric: Optional[str]
+    threshold: Optional[float]
+
+
+def _compile(node: Any, config) -> Condition:
+    if not isinstance(node, dict):
+        raise RuleDefinitionError(f"Condition must be an object, got {node!r}")
+    for combinator, reduce, dual in (
+        ("all", np.logical_and.reduce, np.logical_or.reduce),
+        ("any", np.logical_or.reduce, np.logical_and.reduce),
+    ):
+        if combinator in node:
+            if set(node) != {combinator} or not isinstance(node[combinator], list) or not node[combinator]:
+                raise RuleDefinitionError(f"'{combinator}' takes a non-empty list of conditions and nothing else")
+            children = [_compile(child, config) for child in node[combinator]]
+            first = next((child for child in children if child.threshold is not None), None)
+            return Condition(
+                lambda batch: reduce([child.holds(batch) for child in children]),
+                lambda batch: dual([child.fails(batch) for child in children]),
+                first.metric if first else None,
+                first.threshold if first else None,
+            )
+    if "not" in node:
+        if set(node) != {"not"}:
+            raise RuleDefinitionError("'not' takes a single condition and nothing else")
+        inner = _compile(node["not"], config)
+        return Condition(inner.fails, inner.holds, inner.metric, inner.threshold)
+
+    unknown = set(node) - {"metric", "op", "value", "rate"}
+    if unknown or not {"metric", "op", "value"} <= set(node):
+        raise RuleDefinitionError(f"Threshold needs metric, op and value (and optionally rate); got {sorted(node)}")
+    metric, op = node["metric"], node["op"]
+    if metric not in WINDOW_METRICS:
+        raise RuleDefinitionError(f"Unknown metric '{metric}' (expected one of {', '.join(WINDOW_METRICS)})")
+    if op not in OPERATORS:
+        raise RuleDefinitionError(f"Unknown operator '{op}' (expected one of {' '.join(OPERATORS)})")
+    value = _resolve_value(node["value"], config)
+    compare = OPERATORS[op]
+    if "rate" in node:
+        per_seconds = _resolve_value(node["rate"], config)
+        if per_seconds <= 0:
+            raise RuleDefinitionError("rate must be a positive number of seconds")
+        source = ("rate", metric, per_seconds)
+        operand = lambda batch: batch.rate(metric, per_seconds)
+        metric_reported, threshold = None, None
+    else:
+        source = ("value", metric)
+        operand = lambda batch: batch.metrics[metric]
+        metric_reported, threshold = metric, value
+    key = source + (op, value)
+
+    def valid(batch: ReadingBatch) -> np.ndarray:
+        return batch.memo(("valid",) + source, lambda: ~np.isnan(operand(batch)))
+
+    def holds(batch: ReadingBatch) -> np.ndarray:
+        # NaN != value is true, so every comparison is masked
+        with np.errstate(invalid="ignore"):
+            return batch.memo(key, lambda: compare(operand(batch), value) & valid(batch))
+
+    def fails(batch: ReadingBatch) -> np.ndarray:
+        return batch.memo(("fails",) + key, lambda: ~holds(batch) & valid(batch))
+    return Condition(holds, fails, metric_reported, threshold)
+
+
+def compile_condition(node: Any, config) -> Tuple[Predicate, Optional[float]]:
+    """(predicate, first threshold value) for a condition; raises RuleDefinitionError"""
+    condition = _compile(node, config)
+    return condition.holds, condition.threshold
+
+
+class CompiledRule(NamedTuple):
+    id: Optional[int]
+    name: str
+    alert_type: str
+    severity: str
+    channel_id: Optional[str]
+    min_duration_seconds: float
+    # Metric and value of the condition's first threshold (reported with the alert)
+    metric: Optional[str]
+    threshold: Optional[float]
+    # Where a breach starts, and where it ends
+    predicate: Predicate
+    exit: Predicate
+
+
+def compile_rule(row, config) -> CompiledRule:
+    """Compile a DBAlertRule (or anything with its fields) against an alert config"""
+    node = row.condition
+    if isinstance(node, dict) and ("enter" in node or "exit" in node):
+        if set(node) != {"enter", "exit"}:
+            raise RuleDefinitionError("A hysteresis condition takes 'enter' and 'exit' conditions and nothing else")
+        condition = _compile(node["enter"], config)
+        exit_ = _compile(node["exit"], config).holds
+    else:
+        condition = _compile(node, config)
+        exit_ = condition.fails
+    return CompiledRule(
+        id=getattr(row, "id", None),
+        name=row.name,
+        alert_type=row.alert_type,
+        severity=row.severity or "warning",
+        channel_id=str(row.channel_id) if row.channel_id else None,
+        min_duration_seconds=float(row.min_duration_seconds or 0.0),
+        metric=condition.metric,
+        threshold=condition.threshold,
+        predicate=condition.holds,
+        exit=exit_,
+    )
+
+
+class RuleEvaluation(NamedTuple):
+    rules: List[CompiledRule]
+    batch: ReadingBatch
+    # (rules, n) booleans: in breach (with hysteresis), and has been for min duration
+    breach: np.ndarray
+    firing: np.ndarray
+    # (rule name, channel) -> state, to pass as `initial` for the next batch
+    final_state: Dict[Tuple[str, str], RuleState]
+
+    def reading(self, index: int) -> Dict[str, Optional[float]]:
+        """Metric values of one batch position (None where missing)"""
+        values = {metric: float(column[index]) for metric, column in self.batch.metrics.items()}
+        return {metric: None if value != value else value for metric, value in values.items()}
+
+    def active(self) -> List[Dict]:
+        """
+        Rules firing at each device's newest reading, with that reading's
+        index and the rule metric's value there (None if missing)
+        """
+        out = []
+        ends = np.flatnonzero(self.batch.segment_end)
+        for i, j in zip(*np.nonzero(self.firing[:, ends])):
+            rule, index = self.rules[i], int(ends[j])
+            value = self.batch.metrics[rule.metric][index] if rule.metric else np.nan
+            out.append({
+                "rule": rule,
+                "channel_id": self.batch.channels[j],
+                "index": index,
+                "value": None if np.isnan(value) else float(value),
+            })
+        return out
+
+
+class RuleSet:
+    """Compiled rules evaluated together over a ReadingBatch"""
+
+    def __init__(self, rules: List[CompiledRule]):
+        self.rules = rules
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def evaluate(
+        self, batch: ReadingBatch, initial: Optional[Dict[Tuple[str, str], RuleState]] = None
+    ) -> RuleEvaluation:
+        m, n = len(self.rules), len(batch)
+        enters = np.zeros((m, n), dtype=bool)
+        exits = np.zeros((m, n), dtype=bool)
+        for i, rule in enumerate(self.rules):
+            enters[i] = rule.predicate(batch)
+            exits[i] = rule.exit(batch)
+
+        # Each device's readings continue from its carried state
+        starts = np.flatnonzero(batch.segment_start)
+        carried = np.zeros((m, len(starts)), dtype=bool)
+        carried_since = np.zeros((m, len(starts)), dtype=np.int64)
+        if initial:
+            rows = {rule.name: i for i, rule in enumerate(self.rules)}
+            for (name, channel), state in initial.items():
+                segment = batch.segment_of(channel)
+                if state.in_breach and name in rows and segment is not None:
+                    carried[rows[name], segment] = True
+                    carried_since[rows[name], segment] = state.breach_since or batch.ts[starts[segment]]
+        breach = hysteresis(enters, exits, carried, batch.segment_start)
+        for i, rule in enumerate(self.rules):
+            if rule.channel_id is not None:
+                breach[i] &= batch.channel_mask(rule.channel_id)
+
+        previous = np.zeros_like(breach)
+        previous[:, 1:] = breach[:, :-1]
+        previous[:, starts] = carried
+        hold = np.array([rule.min_duration_seconds for rule in self.rules])
+        firing, runs = sustained(batch.ts, breach, previous, batch.segment_start, carried_since, hold)
+
+        open_runs = batch.segment_end[runs.end]
+        final_state = {
+            (self.rules[i].name, batch.channels[batch.device[end]]): RuleState(True, since)
+            for i, end, since in zip(
+                runs.rows[open_runs].tolist(), runs.end[open_runs].tolist(), runs.since[open_runs].tolist()
+            )
+        }
+        # Devices with no readings in this batch keep their state
+        for (name, channel), state in (initial or {}).items():
+            if state.in_breach and batch.segment_of(channel) is None:
+                final_state.setdefault((name, channel), state)
+        return RuleEvaluation(self.rules, batch, breach, firing, final_state)
+
+
+class RuleRegistry:
+    """
+    Compiled active rules, shared process-wide
+
+    Recompiled only when the alert_rules table changes (row count or newest
+    updated_at, checked at most every ALERT_STATE_REVALIDATE_SECONDS) or the
+    alert config version changes; invalidate() forces it after a write.
+    """
+
+    def __init__(self, revalidate_seconds: Optional[float] = None):
+        self.revalidate_seconds = (
+            settings.ALERT_STATE_REVALIDATE_SECONDS if revalidate_seconds is None else revalidate_seconds
+        )
+        self._rule_set: Optional[RuleSet] = None
+        self._version: Optional[Tuple] = None
+        self._checked_monotonic = 0.0
+        self._table_ready = False
+        self._lock = threading.Lock()
+        self.compiles = 0
+        self.skipped = 0
+
+    def ensure_table(self, db: Session) -> None:
+        """
+        Create alert_rules if the database predates it, and seed DEFAULT_RULES
+        while it has no rows (init_db() creates it empty); deactivate rules
+        rather than deleting them all
+        """
+        if self._table_ready:
+            return
+        bind = db.get_bind()
+        if not inspect(bind).has_table(DBAlertRule.__tablename__):
+            DBAlertRule.__table__.create(bind=bind, checkfirst=True)
+        if not db.query(DBAlertRule.id).first():
+            for rule in DEFAULT_RULES:
+                db.add(DBAlertRule(min_duration_seconds=settings.ALERT_MIN_DURATION_SECONDS, **rule))
+            db.commit()
+        self._table_ready = True
+
+    def _table_version(self, db: Session) -> Tuple:
+        return tuple(db.query(func.count(DBAlertRule.id), func.max(DBAlertRule.updated_at)).one())
+
+    def _compile(self, db: Session, config) -> RuleSet:
+        rules = []
+        for row in db.query(DBAlertRule).filter(DBAlertRule.is_active == True).order_by(DBAlertRule.id):
+            try:
+                rules.append(compile_rule(row, config))
+            except RuleDefinitionError as e:
+                # Rows are validated on write; one edited by hand shouldn't disable the rest
+                self.skipped += 1
+                logger.error(f"Skipping alert rule '{row.name}': {e}")
+        self.compiles += 1
+        return RuleSet(rules)
+
+    def rule_set(self, db: Session, config) -> RuleSet:
+        """Active rules compiled against `config`; no database I/O between revalidations"""
+        with self._lock:
+            self.ensure_table(db)
+            if self._rule_set is not None and time.monotonic() - self._checked_monotonic < self.revalidate_seconds:
+                if self._version[0] == config.version:
+                    return self._rule_set
+            version = (config.version, self._table_version(db))
+            if self._rule_set is None or version != self._version:
+                self._rule_set = self._compile(db, config)
+                self._version = version
+            self._checked_monotonic = time.monotonic()
+            return self._rule_set
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._rule_set = None
+
+    def stats(self) -> Dict:
+        return {
+            'rules': len(self._rule_set) if self._rule_set is not None else None,
+            'compiles': self.compiles,
+            'skipped_invalid': self.skipped,
+        }
+
+
+# Singleton instance
+_rule_registry = RuleRegistry()
+
+
+def get_rule_registry() -> RuleRegistry:
+    return _rule_registry
@@ -0,0 +1,161 @@
+"""
+Alert state cache
+Process-wide copy of the alert configuration and per-alert-type cooldown
+deadlines, so evaluating a reading within limits touches no database
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, NamedTuple, Optional
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.database import DBAlertConfig, DBAlertHistory
+
+
+class AlertConfigSnapshot(NamedTuple):
+    """Immutable copy of the DBAlertConfig row; `version` is its updated_at"""
+    id: int
+    tds_threshold: float
+    temp_threshold: float
+    warning_threshold: Optional[float]
+    cooldown_minutes: int
+    telegram_enabled: bool
+    email_enabled: bool
+    sms_enabled: bool
+    offline_threshold_minutes: int
+    last_alert_time: Optional[datetime]
+    version: Optional[datetime]
+
+    @classmethod
+    def from_row(cls, row: DBAlertConfig) -> "AlertConfigSnapshot":
+        return cls(**{field: getattr(row, "updated_at" if field == "version" else field) for field in cls._fields})
+
+
+class AlertStateCache:
+    """
+    Alert config and cooldowns shared by every AlertEngine in the process
+
+    Changes made through update_config() and record_alert() are written
+    through to the database. Changes made elsewhere (another process, a
+    manual edit) are picked up by comparing the row's updated_at at most
+    every ALERT_STATE_REVALIDATE_SECONDS; invalidate() forces a reload.
+    """
+
+    def __init__(self, revalidate_seconds: Optional[float] = None):
+        self.revalidate_seconds = (
+            settings.ALERT_STATE_REVALIDATE_SECONDS if revalidate_seconds is None else revalidate_seconds
+        )
+        self._config: Optional[AlertConfigSnapshot] = None
+        self._checked_monotonic = 0.0
+        # alert_type -> when it was last sent (UTC, naive like the models)
+        self._last_sent: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.revalidations = 0
+        self.reloads_on_change = 0
+
+    def _load(self, db: Session) -> AlertConfigSnapshot:
+        row = db.query(DBAlertConfig).first()
+        if not row:
+            row = DBAlertConfig(
+                tds_threshold=float(os.getenv("TDS_ALERT_THRESHOLD", 150.0)),
+                temp_threshold=float(os.getenv("TEMP_ALERT_THRESHOLD", 35.0)),
+                cooldown_minutes=int(os.getenv("ALERT_COOLDOWN_MINUTES", 15))
+            )
+            db.add(row)
+            db.commit()
+            db.refresh(row)
+        # Cooldowns survive restarts through the alert history (alerts that
+        # reached someone; one still queued for a digest didn't)
+        last_sent = dict(
+            db.query(DBAlertHistory.alert_type, func.max(DBAlertHistory.created_at))
+            .filter(DBAlertHistory.recipient_count > 0)
+            .group_by(DBAlertHistory.alert_type)
+            .all()
+        )
+        self.loads += 1
+        self._config = AlertConfigSnapshot.from_row(row)
+        self._last_sent = {alert_type: sent for alert_type, sent in last_sent.items() if sent}
+        self._checked_monotonic = time.monotonic()
+        return self._config
+
+    def config(self, db: Session) -> AlertConfigSnapshot:
+        """Current config; no database I/O unless it is unloaded or due for revalidation"""
+        with self._lock:
+            if self._config is None:
+                return self._load(db)
+            if time.monotonic() - self._checked_monotonic >= self.revalidate_seconds:
+                self.revalidations += 1
+                version = db.query(DBAlertConfig.updated_at).filter(DBAlertConfig.id == self._config.id).scalar()
+                if version != self._config.version:
+                    self.reloads_on_change += 1
+                    return self._load(db)
+                self._checked_monotonic = time.monotonic()
+            return self._config
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._config = None
+
+    def update_config(self, db: Session, **changes) -> AlertConfigSnapshot:
+        """Write config changes through to the database and reload"""
+        with self._lock:
+            row = db.query(DBAlertConfig).first() if self._config is None else db.get(DBAlertConfig, self._config.id)
+            for field, value in changes.items():
+                if field not in AlertConfigSnapshot._fields or field in ("id", "version"):
+                    raise ValueError(f"Unknown alert config field: {field}")
+                setattr(row, field, value)
+            db.commit()
+            return self._load(db)
+
+    def last_sent(self, alert_type: Optional[str] = None) -> Optional[datetime]:
+        """When `alert_type` (any type if None) was last sent"""
+        if alert_type is not None:
+            return self._last_sent.get(alert_type)
+        return max(self._last_sent.values(), default=None)
+
+    def cooldown_remaining(self, alert_type: Optional[str] = None, now: Optional[datetime] = None) -> timedelta:
+        last = self.last_sent(alert_type)
+        if last is None or self._config is None:
+            return timedelta(0)
+        now = now or datetime.utcnow()
+        return max(timedelta(0), last + timedelta(minutes=self._config.cooldown_minutes) - now)
+
+    def record_alert(self, db: Session, alert_type: str, when: Optional[datetime] = None) -> None:
+        """
+        Start `alert_type`'s cooldown and stage last_alert_time on the config
+        row; the caller commits along with its history row
+        """
+        when = when or datetime.utcnow()
+        with self._lock:
+            self._last_sent[alert_type] = when
+            if self._config is not None:
+                # updated_at is set to itself so the write doesn't read as a config change
+                db.execute(
+                    update(DBAlertConfig)
+                    .where(DBAlertConfig.id == self._config.id)
+                    .values(last_alert_time=when, updated_at=DBAlertConfig.updated_at)
+                )
+                self._config = self._config._replace(last_alert_time=when)
+
+    def stats(self) -> Dict:
+        return {
+            'loaded': self._config is not None,
+            'version': self._config.version.isoformat() if self._config and self._config.version else None,
+            'alert_types_tracked': len(self._last_sent),
+            'loads': self.loads,
+            'revalidations': self.revalidations,
+            'reloads_on_change': self.reloads_on_change,
+        }
+
+
+# Singleton instance
+_alert_state = AlertStateCache()
+
+
+def get_alert_state() -> AlertStateCache:
+    return _alert_state
@@ -0,0 +1,243 @@
+"""
+Windowed threshold evaluation
+Breach state for every alert rule over an array of readings in one NumPy
+pass, with separate enter/exit thresholds (hysteresis) and a minimum
+sustained duration before a breach fires (debounce)
+"""
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import settings
+from app.database.readings import from_epoch
+from app.services.feed_decoder import decode_timestamps
+
+WINDOW_METRICS = ("tds", "temp", "voltage")
+
+
+class ThresholdRule(NamedTuple):
+    """
+    One alert rule
+
+    direction "above": breach starts when value > enter and ends when
+    value <= exit (exit <= enter). "below" mirrors that: starts when
+    value < enter, ends when value >= exit (exit >= enter).
+    """
+    alert_type: str
+    parameter: str
+    metric: str
+    direction: str
+    enter: float
+    exit: float
+    severity: str
+    min_duration_seconds: float = 0.0
+
+
+class RuleState(NamedTuple):
+    """Carried between windows: whether the rule is in breach, and since when"""
+    in_breach: bool = False
+    breach_since: Optional[int] = None
+
+
+class BreachRuns(NamedTuple):
+    """Maximal runs of breach positions, one entry per run"""
+    rows: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    # Epoch seconds the breach began (before `start` if carried in)
+    since: np.ndarray
+
+
+def rules_from_config(config) -> List[ThresholdRule]:
+    """
+    The AlertEngine rules for an alert config row/snapshot
+
+    TDS exits at warning_threshold when it is set below tds_threshold;
+    temperature and voltage use the ALERT_*_HYSTERESIS margins.
+    """
+    tds_exit = config.warning_threshold
+    if tds_exit is None or tds_exit > config.tds_threshold:
+        tds_exit = config.tds_threshold
+    hold = settings.ALERT_MIN_DURATION_SECONDS
+    return [
+        ThresholdRule("high_tds", "TDS", "tds", "above", config.tds_threshold, tds_exit, "critical", hold),
+        ThresholdRule(
+            "high_temp", "Temperature", "temp", "above",
+            config.temp_threshold, config.temp_threshold - settings.ALERT_TEMP_HYSTERESIS, "warning", hold
+        ),
+        ThresholdRule(
+            "low_voltage", "Voltage", "voltage", "below",
+            settings.ALERT_LOW_VOLTAGE, settings.ALERT_LOW_VOLTAGE + settings.ALERT_VOLTAGE_HYSTERESIS, "warning", hold
+        ),
+    ]
+
+
+def readings_columns(readings: List[Dict]):
+    """Reading dicts (oldest first) -> (ts, {metric: float array}); missing values are NaN"""
+    if not readings:
+        return np.zeros(0, dtype=np.int64), {metric: np.zeros(0) for metric in WINDOW_METRICS}
+    ts = decode_timestamps([r["created_at"] for r in readings])
+    return ts, {metric: np.array([r.get(metric) for r in readings], dtype=np.float64) for metric in WINDOW_METRICS}
+
+
+class WindowEvaluation(NamedTuple):
+    rules: List[ThresholdRule]
+    ts: np.ndarray
+    # (rules, n) booleans: hysteresis state, and state held for min duration
+    breach: np.ndarray
+    firing: np.ndarray
+    runs: BreachRuns
+    # Per rule, to pass as `initial` for the next window
+    final_state: Dict[str, RuleState]
+
+    def active(self) -> List[ThresholdRule]:
+        """Rules firing at the newest reading"""
+        if not len(self.ts):
+            return []
+        return [rule for rule, firing in zip(self.rules, self.firing[:, -1]) if firing]
+
+    def summary(self) -> List[Dict]:
+        """Per rule: current state plus the times it started firing and cleared"""
+        out = []
+        previous = np.zeros((len(self.rules), 1), dtype=bool)
+        fired = np.diff(self.firing.astype(np.int8), axis=1, prepend=previous.astype(np.int8))
+        for i, rule in enumerate(self.rules):
+            starts = np.flatnonzero(fired[i] > 0)
+            ends = np.flatnonzero(fired[i] < 0)
+            out.append({
+                "alert_type": rule.alert_type,
+                "severity": rule.severity,
+                "enter": rule.enter,
+                "exit": rule.exit,
+                "min_duration_seconds": rule.min_duration_seconds,
+                "in_breach": bool(self.breach[i, -1]) if len(self.ts) else False,
+                "firing": bool(self.firing[i, -1]) if len(self.ts) else False,
+                "breach_readings": int(self.breach[i].sum()),
+                "fired_at": [from_epoch(t) for t in self.ts[starts].tolist()],
+                "cleared_at": [from_epoch(t) for t in self.ts[ends].tolist()],
+            })
+        return out
+
+
+def hysteresis(enters: np.ndarray, exits: np.ndarray, carried: np.ndarray, segment_start: np.ndarray) -> np.ndarray:
+    """
+    (rules, n) breach state from enter/exit events
+
+    Each position takes the state of the latest enter (in breach) or exit
+    (clear) event at or before it in its segment; before a segment's first
+    event, the state carried into it (carried is (rules, segments)).
+    """
+    n = enters.shape[1]
+    breach = enters.copy()
+    # Only rules with a position that is neither (a missing value, or between
+    # the thresholds) depend on earlier positions
+    rows = np.flatnonzero(~(enters | exits).all(axis=1))
+    if not len(rows):
+        return breach
+    event = np.where(enters[rows], 1, np.where(exits[rows], -1, 0))
+    last_event = np.maximum.accumulate(np.where(event != 0, np.arange(n), -1), axis=1)
+    segment = np.cumsum(segment_start) - 1
+    seen = last_event >= np.flatnonzero(segment_start)[segment]
+    breach[rows] = np.where(
+        seen, np.take_along_axis(event, np.maximum(last_event, 0), axis=1) > 0, carried[rows][:, segment]
+    )
+    return breach
+
+
+def sustained(
+    ts: np.ndarray,
+    breach: np.ndarray,
+    previous: np.ndarray,
+    segment_start: np.ndarray,
+    carried_since: np.ndarray,
+    hold: np.ndarray,
+):
+    """
+    (firing, runs) for a (rules, n) breach matrix
+
+    Positions are split into segments (a window, or each device's readings
+    in a batch) with ascending ts inside each. `previous` is the breach
+    state before each position: the prior column within a segment, the
+    carried state at a segment start. A breach continuing from the carried
+    state is dated from carried_since[rule, segment]; `hold` is seconds per
+    rule. Work beyond a few boolean passes is per run, not per position.
+    """
+    m, n = breach.shape
+    segment = np.cumsum(segment_start) - 1
+    started = breach & ~previous
+    run_start = np.flatnonzero(started | (breach & segment_start))
+    following = np.zeros_like(breach)
+    following[:, :-1] = breach[:, 1:] & ~segment_start[1:]
+    run_end = np.flatnonzero(breach & ~following)
+    rows, start = np.divmod(run_start, n)
+    end = run_end - rows * n
+    since = np.where(started[rows, start], ts[start], carried_since[rows, segment[start]])
+
+    # First position in each run at least `hold` after it began, found with
+    # one search over a key that increases across segments as well as within
+    hold_seconds = np.ceil(np.asarray(hold, dtype=np.float64).ravel()).astype(np.int64)
+    base = int(ts.min()) if n else 0
+    span = (int(ts.max()) - base if n else 0) + int(hold_seconds.max(initial=0)) + 1
+    key = segment * span + (ts - base)
+    due = np.searchsorted(key, segment[start] * span + (since - base) + hold_seconds[rows])
+    first = np.maximum(due, start)
+    fires = first <= end
+
+    # Mark [first, end] of each firing run, then a running sum fills them in
+    delta = np.zeros(m * n + 1, dtype=np.int8)
+    offset = rows[fires] * n
+    np.add.at(delta, offset + first[fires], 1)
+    np.add.at(delta, run_end[fires] + 1, -1)
+    # Runs don't overlap, so the sum is only ever 0 or 1
+    firing = np.cumsum(delta[:-1], dtype=np.int8).view(bool).reshape(m, n)
+    return firing, BreachRuns(rows, start, end, since)
+
+
+def evaluate_window(
+    ts: np.ndarray,
+    metrics: Dict[str, np.ndarray],
+    rules: Sequence[ThresholdRule],
+    initial: Optional[Dict[str, RuleState]] = None,
+) -> WindowEvaluation:
+    """
+    Evaluate `rules` over readings at epoch seconds `ts` (ascending)
+
+    `metrics` maps metric name -> float array parallel to ts; NaN (missing)
+    neither starts nor ends a breach. `initial` carries state from the
+    previous window (default: no rule in breach).
+    """
+    rules = list(rules)
+    initial = initial or {}
+    ts = np.asarray(ts, dtype=np.int64)
+    m, n = len(rules), len(ts)
+    values = np.vstack([np.asarray(metrics[rule.metric], dtype=np.float64) for rule in rules]) if m else np.zeros((0, n))
+    enter = np.array([rule.enter for rule in rules])[:, None]
+    exit_ = np.array([rule.exit for rule in rules])[:, None]
+    below = np.array([rule.direction == "below" for rule in rules])[:, None]
+
+    with np.errstate(invalid="ignore"):
+        enters = np.where(below, values < enter, values > enter)
+        exits = np.where(below, values >= exit_, values <= exit_)
+
+    # Hysteresis: the window is one segment, entered in the carried state
+    carried = np.array([initial.get(rule.alert_type, RuleState()).in_breach for rule in rules], dtype=bool)[:, None]
+    segment_start = np.zeros(n, dtype=bool)
+    segment_start[:1] = True
+    breach = hysteresis(enters, exits, carried, segment_start)
+
+    # Debounce: a breach fires once it has lasted min_duration_seconds
+    previous = np.concatenate([carried, breach[:, :-1]], axis=1)
+    carried_since = np.array([
+        initial.get(rule.alert_type, RuleState()).breach_since or (ts[0] if n else 0) for rule in rules
+    ], dtype=np.int64)[:, None]
+    hold = np.array([rule.min_duration_seconds for rule in rules])
+    firing, runs = sustained(ts, breach, previous, segment_start, carried_since, hold)
+
+    if not n:
+        final_state = {rule.alert_type: initial.get(rule.alert_type, RuleState()) for rule in rules}
+    else:
+        final_state = {rule.alert_type: RuleState() for rule in rules}
+        tail = runs.end == n - 1
+        for i, since in zip(runs.rows[tail].tolist(), runs.since[tail].tolist()):
+            final_state[rules[i].alert_type] = RuleState(True, since)
+    return WindowEvaluation(rules, ts, breach, firing, runs, final_state)
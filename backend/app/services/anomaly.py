@@ -0,0 +1,310 @@
+"""
+Streaming anomaly detection
+Per-device, per-metric online detectors with O(1) state updates per
+reading: EWMA z-score, rolling median/MAD, and CUSUM for slow drift that
+never crosses a fixed threshold
+"""
+import asyncio
+import logging
+import math
+import sqlite3
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.database.readings import ReadingDB
+from app.services.ingestion import IncrementalIngestor, get_ingestor
+
+logger = logging.getLogger(__name__)
+
+# Detector flags (bitmask per reading and metric)
+EWMA = 1
+MAD = 2
+CUSUM_UP = 4
+CUSUM_DOWN = 8
+METHOD_NAMES = ((EWMA, "ewma"), (MAD, "mad"), (CUSUM_UP, "cusum_up"), (CUSUM_DOWN, "cusum_down"))
+
+# Smallest standard deviation assumed per metric, so a perfectly steady
+# sensor doesn't turn the first tiny wobble into a huge z-score
+MIN_STD = {"tds": 1.0, "temp": 0.1, "voltage": 0.01}
+
+# Largest single-reading step (in standard deviations) a CUSUM sum can take
+CUSUM_CLIP = 3.0
+
+# MAD of normally distributed data is 0.6745 standard deviations
+MAD_SCALE = 0.6745
+
+
+def method_names(flags: int) -> List[str]:
+    return [name for flag, name in METHOD_NAMES if flags & flag]
+
+
+class MetricState:
+    """Online statistics for one metric of one device"""
+    __slots__ = (
+        "count", "mean", "var", "ref_mean", "ref_std", "cusum_up", "cusum_down",
+        "window", "ordered", "mad", "mad_age",
+    )
+
+    def __init__(self):
+        self.count = 0
+        # EWMA mean/variance: the short-term baseline
+        self.mean = 0.0
+        self.var = 0.0
+        # CUSUM reference, fixed at warm-up and after each change point
+        self.ref_mean = 0.0
+        self.ref_std = 0.0
+        self.cusum_up = 0.0
+        self.cusum_down = 0.0
+        # Rolling window in arrival order and sorted, for median/MAD
+        self.window: deque = deque()
+        self.ordered: List[float] = []
+        self.mad = 0.0
+        self.mad_age = 0
+
+
+class DeviceState:
+    __slots__ = ("metrics", "readings", "anomalies", "last_entry_id")
+
+    def __init__(self, metric_names):
+        self.metrics = tuple(MetricState() for _ in metric_names)
+        self.readings = 0
+        self.anomalies = 0
+        self.last_entry_id: Optional[int] = None
+
+
+class AnomalyDetector:
+    """
+    Streaming detectors for each device's readings
+
+    Per reading and metric:
+    - EWMA: |x - mean| above ANOMALY_Z_THRESHOLD EWMA standard deviations
+      (the update is winsorized so one spike doesn't inflate the variance)
+    - MAD: robust z-score against the median of the last ANOMALY_MAD_WINDOW
+      readings above ANOMALY_MAD_THRESHOLD
+    - CUSUM: cumulative deviation from a reference level beyond
+      ANOMALY_CUSUM_H standard deviations (slack ANOMALY_CUSUM_K per
+      reading); the reference re-baselines after each change point
+
+    Nothing is flagged during the first ANOMALY_WARMUP_READINGS of a device.
+    Given an ingestor, it follows that channel's polls as well.
+    """
+
+    def __init__(self, ingestor: Optional[IncrementalIngestor] = None, metrics: Optional[List[str]] = None):
+        self.metric_names = tuple(metrics or [m.strip() for m in settings.ANOMALY_METRICS.split(",") if m.strip()])
+        self.min_std = tuple(MIN_STD.get(metric, 0.0) for metric in self.metric_names)
+        self.alpha = settings.ANOMALY_EWMA_ALPHA
+        self.z_threshold = settings.ANOMALY_Z_THRESHOLD
+        self.mad_window = settings.ANOMALY_MAD_WINDOW
+        self.mad_threshold = settings.ANOMALY_MAD_THRESHOLD
+        self.cusum_k = settings.ANOMALY_CUSUM_K
+        self.cusum_h = settings.ANOMALY_CUSUM_H
+        self.warmup = settings.ANOMALY_WARMUP_READINGS
+        # The MAD is recomputed this often, and whenever it would flag
+        self.mad_refresh = 8
+        self._devices: Dict[str, DeviceState] = {}
+        self.recent: deque = deque(maxlen=settings.ANOMALY_RECENT_SIZE)
+        self.readings = 0
+        self.anomalies = 0
+        self.alerts_dispatched = 0
+        self._alert_tasks: set = set()
+        self.ingestor = ingestor
+        if ingestor is not None:
+            ingestor.add_listener(self.on_poll)
+
+    def _update_metric(self, state: MetricState, x: float, min_std: float) -> int:
+        """Fold one value into `state`; returns the flags it raised"""
+        flags = 0
+        n = state.count
+        state.count = n + 1
+        if n == 0:
+            state.mean = x
+            state.window.append(x)
+            state.ordered.append(x)
+            return 0
+
+        mean = state.mean
+        std = math.sqrt(state.var)
+        if std < min_std:
+            std = min_std
+        z = (x - mean) / std
+        warm = n >= self.warmup
+        if warm:
+            if z > self.z_threshold or z < -self.z_threshold:
+                flags |= EWMA
+            if n == self.warmup:
+                state.ref_mean, state.ref_std = mean, std
+            # Clipped, so a lone spike can't make a change point on its own
+            r = (x - state.ref_mean) / state.ref_std
+            if r > CUSUM_CLIP:
+                r = CUSUM_CLIP
+            elif r < -CUSUM_CLIP:
+                r = -CUSUM_CLIP
+            up = state.cusum_up + r - self.cusum_k
+            down = state.cusum_down - r - self.cusum_k
+            if up > self.cusum_h:
+                flags |= CUSUM_UP
+            if down > self.cusum_h:
+                flags |= CUSUM_DOWN
+            if flags & (CUSUM_UP | CUSUM_DOWN):
+                # Change point: the recent median becomes the reference
+                state.ref_mean, state.ref_std = state.ordered[len(state.ordered) // 2], std
+                up = down = 0.0
+            state.cusum_up = up if up > 0.0 else 0.0
+            state.cusum_down = down if down > 0.0 else 0.0
+
+        # Winsorized EWMA update
+        limit = self.z_threshold * std
+        diff = x - mean
+        if diff > limit:
+            diff = limit
+        elif diff < -limit:
+            diff = -limit
+        incr = self.alpha * diff
+        state.mean = mean + incr
+        state.var = (1.0 - self.alpha) * (state.var + diff * incr)
+
+        window, ordered = state.window, state.ordered
+        window.append(x)
+        insort(ordered, x)
+        if len(window) > self.mad_window:
+            del ordered[bisect_left(ordered, window.popleft())]
+        if warm:
+            median = ordered[len(ordered) // 2]
+            deviation = abs(x - median)
+            floor = min_std * MAD_SCALE
+            mad = state.mad if state.mad > floor else floor
+            state.mad_age += 1
+            if state.mad_age >= self.mad_refresh or MAD_SCALE * deviation > self.mad_threshold * mad:
+                deviations = sorted([abs(v - median) for v in ordered])
+                state.mad = deviations[len(deviations) // 2]
+                state.mad_age = 0
+                mad = state.mad if state.mad > floor else floor
+            if MAD_SCALE * deviation > self.mad_threshold * mad:
+                flags |= MAD
+        return flags
+
+    def update(self, channel_id: str, reading: Dict, record: bool = True) -> List[Dict]:
+        """
+        Fold one reading into its device's state; returns any anomalies it raised
+
+        With `record` off (warm-up) the reading only trains the state: nothing
+        is returned, counted or kept in `recent`.
+        """
+        device = self._devices.get(channel_id)
+        if device is None:
+            device = self._devices[channel_id] = DeviceState(self.metric_names)
+        entry_id = reading.get("entry_id")
+        if entry_id is not None:
+            if device.last_entry_id is not None and entry_id <= device.last_entry_id:
+                return []
+            device.last_entry_id = entry_id
+        if record:
+            device.readings += 1
+            self.readings += 1
+
+        found = []
+        for metric, state, min_std in zip(self.metric_names, device.metrics, self.min_std):
+            x = reading.get(metric)
+            if x is None or x != x:
+                continue
+            expected = state.mean
+            flags = self._update_metric(state, x, min_std)
+            if flags and record:
+                found.append({
+                    "channel_id": channel_id,
+                    "entry_id": entry_id,
+                    "created_at": reading.get("created_at"),
+                    "metric": metric,
+                    "value": x,
+                    "expected": round(expected, 3),
+                    "methods": method_names(flags),
+                    "reading": {key: reading.get(key) for key in ("tds", "temp", "voltage")},
+                })
+        if found:
+            device.anomalies += len(found)
+            self.anomalies += len(found)
+            self.recent.extend(found)
+        return found
+
+    def process(self, channel_id: str, readings: List[Dict]) -> List[Dict]:
+        """Fold readings (oldest first) in; returns the anomalies raised"""
+        channel_id = str(channel_id)
+        found = []
+        for reading in readings:
+            hits = self.update(channel_id, reading)
+            if hits:
+                found.extend(hits)
+        return found
+
+    def warm_up(self, channel_id: str, readings: List[Dict]) -> None:
+        """Train on readings (oldest first) that were seen before, without flagging any"""
+        channel_id = str(channel_id)
+        for reading in readings:
+            self.update(channel_id, reading, record=False)
+
+    def _stored_history(self, before_entry_id: int) -> List[Dict]:
+        """The stored readings older than a poll, gaps as None, up to the buffer's size"""
+        try:
+            stored = ReadingDB.latest(self.ingestor.channel_id, limit=self.ingestor.buffer.maxlen, missing=None)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not load anomaly warm-up history: {e}")
+            return []
+        return [r for r in stored if r["entry_id"] < before_entry_id]
+
+    def on_poll(self, result: Dict) -> None:
+        """Ingestor listener: fold in each poll's new readings and alert on anomalies"""
+        # Missing fields as None, so a gap is skipped rather than read as a drop to 0
+        readings = result.get("observed") or result.get("readings")
+        if not readings:
+            return
+        channel_id = str(self.ingestor.channel_id)
+        if channel_id not in self._devices:
+            # Warm up on the history the buffer was hydrated from after a
+            # restart. Read from the store rather than the buffer, which
+            # holds gaps as 0.0.
+            self.warm_up(channel_id, self._stored_history(readings[0]["entry_id"]))
+        found = self.process(channel_id, readings)
+        if found:
+            logger.info(f"{len(found)} anomalies in {len(readings)} new readings")
+            if settings.ANOMALY_ALERTS_ENABLED:
+                self._dispatch(found)
+
+    def _dispatch(self, found: List[Dict]) -> None:
+        """Send an 'anomaly' alert in the background (listeners must not block the poll)"""
+        # Imported here: the alert engine pulls in the database models
+        from app.services.alert_engine import send_anomaly_alert
+        try:
+            task = asyncio.get_running_loop().create_task(send_anomaly_alert(found))
+        except RuntimeError:
+            return
+        self.alerts_dispatched += 1
+        self._alert_tasks.add(task)
+        task.add_done_callback(self._dispatch_done)
+
+    def _dispatch_done(self, task: asyncio.Task) -> None:
+        self._alert_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Anomaly alert failed: {task.exception()!r}")
+
+    def stats(self) -> Dict:
+        return {
+            'metrics': list(self.metric_names),
+            'devices': len(self._devices),
+            'readings': self.readings,
+            'anomalies': self.anomalies,
+            'alerts_dispatched': self.alerts_dispatched,
+        }
+
+
+# Singleton instance
+_anomaly_detector: Optional[AnomalyDetector] = None
+
+
+def get_anomaly_detector() -> Optional[AnomalyDetector]:
+    """Get or create the shared detector (registers with the ingestor); None if ANOMALY_ENABLED is off"""
+    global _anomaly_detector
+    if _anomaly_detector is None and settings.ANOMALY_ENABLED:
+        _anomaly_detector = AnomalyDetector(get_ingestor())
+    return _anomaly_detector
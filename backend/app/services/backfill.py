@@ -0,0 +1,238 @@
+"""
+Historical backfill from ThingSpeak
+Splits a date range into ThingSpeak-sized windows, fetches them concurrently
+under a bounded semaphore with retry, and bulk-writes them into the local
+reading store. Completed windows are checkpointed so a restart resumes.
+"""
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from app.core.config import settings
+from app.database.readings import BackfillCheckpointDB, ReadingDB
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.ingestion import THINGSPEAK_MAX_RESULTS
+from app.services.downsample import get_series_cache
+from app.services.feed_decoder import decode_feeds
+from app.services.thingspeak import ThingSpeakClient, get_thingspeak_client
+
+logger = logging.getLogger(__name__)
+
+
+class BackfillError(Exception):
+    """A window could not be fetched after all retries"""
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _thingspeak_time(ts: int) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class BackfillJob:
+    """One backfill run over [start, end) for a channel"""
+
+    def __init__(
+        self,
+        start: datetime,
+        end: Optional[datetime] = None,
+        channel_id: Optional[str] = None,
+        api_key: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        window_seconds: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        client: Optional[ThingSpeakClient] = None,
+    ):
+        self.start_ts = int(_as_utc(start).timestamp())
+        self.end_ts = int(_as_utc(end or datetime.now(timezone.utc)).timestamp())
+        if self.end_ts <= self.start_ts:
+            raise ValueError("Backfill end must be after start")
+        self.channel_id = channel_id or settings.THINGSPEAK_CHANNEL_ID
+        self.api_key = api_key
+        self.concurrency = concurrency or settings.BACKFILL_CONCURRENCY
+        self.window_seconds = window_seconds or settings.BACKFILL_WINDOW_SECONDS
+        self.max_retries = settings.BACKFILL_MAX_RETRIES if max_retries is None else max_retries
+        self._client = client
+        self._sem = asyncio.Semaphore(self.concurrency)
+        # Its own breaker: a backfill running into 429s/5xx must not open the
+        # shared client's, which live polling and /dashboard depend on
+        self.breaker = CircuitBreaker(
+            f"backfill:{self.channel_id}",
+            failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+            recovery_seconds=settings.CIRCUIT_RECOVERY_SECONDS,
+            half_open_max_calls=settings.CIRCUIT_HALF_OPEN_MAX_CALLS,
+        )
+
+        self.state = "pending"
+        self.windows_total = 0
+        self.windows_skipped = 0
+        self.windows_done = 0
+        self.windows_failed = 0
+        self.splits = 0
+        self.retries = 0
+        self.rows_fetched = 0
+        self.rows_inserted = 0
+        self.errors: List[str] = []
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+
+    @property
+    def client(self) -> ThingSpeakClient:
+        return self._client or get_thingspeak_client()
+
+    def windows(self) -> List[Tuple[int, int]]:
+        """
+        Half-open [start_ts, end_ts) windows aligned to a fixed grid
+
+        Aligning to multiples of window_seconds keeps window boundaries stable
+        across runs, so checkpoints from an interrupted run match on resume.
+        """
+        step = self.window_seconds
+        windows = []
+        cursor = self.start_ts
+        while cursor < self.end_ts:
+            boundary = (cursor // step + 1) * step
+            windows.append((cursor, min(boundary, self.end_ts)))
+            cursor = boundary
+        return windows
+
+    async def _fetch_window(self, start_ts: int, end_ts: int) -> List[Dict]:
+        """Fetch one window's raw feeds with exponential backoff"""
+        error = None
+        retry_after = 0.0
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.retries += 1
+                delay = settings.BACKFILL_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+                # An open breaker rejects everything until its probe is due
+                await asyncio.sleep(max(delay + random.uniform(0, delay / 2), retry_after))
+                retry_after = 0.0
+            try:
+                async with self._sem:
+                    response = await self.client.get_feeds(
+                        channel_id=self.channel_id,
+                        api_key=self.api_key,
+                        breaker=self.breaker,
+                        start=_thingspeak_time(start_ts),
+                        # ThingSpeak's end is inclusive
+                        end=_thingspeak_time(end_ts - 1),
+                        timezone="Etc/UTC",
+                        results=THINGSPEAK_MAX_RESULTS,
+                    )
+            except httpx.RequestError as e:
+                error = f"Connection failed: {e}"
+                continue
+            except CircuitOpenError as e:
+                error = str(e)
+                retry_after = e.retry_after
+                continue
+            if response.status_code == 200:
+                return response.json().get("feeds") or []
+            error = f"ThingSpeak API Error: {response.status_code}"
+            if 400 <= response.status_code < 500 and response.status_code != 429:
+                break
+        raise BackfillError(f"Window {_thingspeak_time(start_ts)} - {_thingspeak_time(end_ts)}: {error}")
+
+    async def _process_window(self, start_ts: int, end_ts: int) -> int:
+        """Fetch and store one window, splitting it if ThingSpeak truncated the response"""
+        feeds = await self._fetch_window(start_ts, end_ts)
+        if len(feeds) >= THINGSPEAK_MAX_RESULTS and end_ts - start_ts > 1:
+            self.splits += 1
+            mid = (start_ts + end_ts) // 2
+            halves = await asyncio.gather(
+                self._process_window(start_ts, mid),
+                self._process_window(mid, end_ts),
+            )
+            return sum(halves)
+
+        self.rows_fetched += len(feeds)
+        columns = decode_feeds(feeds)
+        inserted = await asyncio.to_thread(ReadingDB.insert_columns, self.channel_id, columns)
+        self.rows_inserted += inserted
+        if inserted:
+            get_series_cache().invalidate(self.channel_id, start_ts, end_ts)
+        return len(columns)
+
+    async def _run_window(self, window: Tuple[int, int]) -> None:
+        try:
+            rows = await self._process_window(*window)
+        except BackfillError as e:
+            self.windows_failed += 1
+            self.errors.append(str(e))
+            logger.error(f"Backfill window failed: {e}")
+            return
+        await asyncio.to_thread(BackfillCheckpointDB.mark_done, self.channel_id, window[0], window[1], rows)
+        self.windows_done += 1
+
+    async def run(self) -> Dict:
+        """Backfill every window not already checkpointed"""
+        self.state = "running"
+        self._started = time.monotonic()
+        try:
+            windows = self.windows()
+            completed = await asyncio.to_thread(
+                BackfillCheckpointDB.completed, self.channel_id, self.start_ts, self.end_ts
+            )
+            pending = [w for w in windows if w not in completed]
+            self.windows_total = len(windows)
+            self.windows_skipped = len(windows) - len(pending)
+            logger.info(
+                f"Backfill {self.channel_id}: {len(pending)} of {len(windows)} windows to fetch "
+                f"(concurrency {self.concurrency})"
+            )
+            await asyncio.gather(*(self._run_window(w) for w in pending))
+            self.state = "failed" if self.windows_failed else "completed"
+        except Exception as e:
+            self.state = "failed"
+            self.errors.append(str(e))
+            logger.exception("Backfill aborted")
+        finally:
+            self._finished = time.monotonic()
+        return self.status()
+
+    def status(self) -> Dict:
+        elapsed = None
+        if self._started is not None:
+            elapsed = round((self._finished or time.monotonic()) - self._started, 3)
+        return {
+            'state': self.state,
+            'channel_id': self.channel_id,
+            'start': _thingspeak_time(self.start_ts),
+            'end': _thingspeak_time(self.end_ts),
+            'windows_total': self.windows_total,
+            'windows_skipped': self.windows_skipped,
+            'windows_done': self.windows_done,
+            'windows_failed': self.windows_failed,
+            'splits': self.splits,
+            'retries': self.retries,
+            'rows_fetched': self.rows_fetched,
+            'rows_inserted': self.rows_inserted,
+            'elapsed_seconds': elapsed,
+            'circuit_breaker': self.breaker.stats(),
+            'errors': self.errors[-10:],
+        }
+
+
+# Most recent API-triggered job
+_current_job: Optional[BackfillJob] = None
+_current_task: Optional[asyncio.Task] = None
+
+
+def start_backfill(job: BackfillJob) -> BackfillJob:
+    """Run a job in the background; only one at a time"""
+    global _current_job, _current_task
+    if _current_task is not None and not _current_task.done():
+        raise RuntimeError("A backfill is already running")
+    _current_job = job
+    _current_task = asyncio.create_task(job.run(), name="thingspeak-backfill")
+    return job
+
+
+def get_current_backfill() -> Optional[BackfillJob]:
+    return _current_job
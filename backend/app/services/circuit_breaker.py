@@ -0,0 +1,105 @@
+"""
+Circuit breaker for upstream calls
+Opens after consecutive failures so callers fail fast instead of piling
+retries onto a struggling upstream; half-open probes decide when to close
+"""
+import logging
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the upstream while the breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Circuit '{name}' is open; retry in {retry_after:.1f}s")
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with timed half-open probes"""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_seconds: float = 30.0,
+        half_open_max_calls: int = 1,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self._state = CLOSED
+        self._opened_at: Optional[float] = None
+        self._half_open_inflight = 0
+        self.consecutive_failures = 0
+        self.total_failures = 0
+        self.total_rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        # An open breaker turns half-open once the recovery timeout elapses
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_seconds:
+            self._state = HALF_OPEN
+            self._half_open_inflight = 0
+        return self._state
+
+    def before_call(self) -> None:
+        """Admit a call or raise CircuitOpenError"""
+        state = self.state
+        if state == CLOSED:
+            return
+        if state == HALF_OPEN and self._half_open_inflight < self.half_open_max_calls:
+            self._half_open_inflight += 1
+            return
+        self.total_rejected += 1
+        retry_after = 0.0
+        if self._opened_at is not None:
+            retry_after = max(0.0, self.recovery_seconds - (time.monotonic() - self._opened_at))
+        raise CircuitOpenError(self.name, retry_after)
+
+    def release(self) -> None:
+        """Give back a half-open probe slot when a call ends without a verdict (e.g. cancelled)"""
+        if self._half_open_inflight:
+            self._half_open_inflight -= 1
+
+    def record_success(self) -> None:
+        if self._state != CLOSED:
+            logger.info(f"Circuit '{self.name}' closed after successful probe")
+        self._state = CLOSED
+        self._opened_at = None
+        self._half_open_inflight = 0
+        self.consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self.total_failures += 1
+        if self._state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self._state != OPEN:
+                self.times_opened += 1
+                logger.warning(
+                    f"Circuit '{self.name}' opened after {self.consecutive_failures} failures; "
+                    f"probing again in {self.recovery_seconds}s"
+                )
+            self._state = OPEN
+            self._opened_at = time.monotonic()
+            self._half_open_inflight = 0
+
+    def stats(self) -> Dict:
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'failure_threshold': self.failure_threshold,
+            'recovery_seconds': self.recovery_seconds,
+            'total_failures': self.total_failures,
+            'total_rejected': self.total_rejected,
+            'times_opened': self.times_opened,
+        }
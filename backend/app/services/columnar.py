@@ -0,0 +1,72 @@
+"""
+Columnar response encoding
+Opt-in compact form of reading lists: parallel value arrays plus delta-coded
+timestamps and entry ids, serialized with orjson (stdlib json when the
+optional package is missing) without per-row validation
+"""
+import json
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json, same output
+    orjson = None
+
+from app.services.feed_decoder import decode_timestamps
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.evara.columnar+json"
+COLUMNAR_METRICS = ("tds", "temp", "voltage")
+
+
+def wants_columnar(fmt: Optional[str], accept: Optional[str]) -> bool:
+    """?format= wins; otherwise look for the columnar media type in Accept"""
+    if fmt is not None:
+        return fmt == "columnar"
+    return bool(accept) and COLUMNAR_MEDIA_TYPE in accept
+
+
+def _deltas(values: np.ndarray) -> List[int]:
+    """Successive differences, first one 0 (values[i] = base + sum(deltas[:i + 1]))"""
+    return np.diff(values, prepend=values[:1]).tolist()
+
+
+def encode_columns(readings: List[Dict]) -> Dict:
+    """
+    Reading dicts (oldest first) -> columnar dict
+
+    `ts_base` is the first reading's epoch seconds and `ts_delta[i]` the gap
+    to the previous reading; `entry_id` is coded the same way. Metric arrays
+    are parallel to them.
+    """
+    if not readings:
+        return {"count": 0, "ts_base": None, "ts_delta": [], "entry_id_base": None,
+                "entry_id_delta": [], **{metric: [] for metric in COLUMNAR_METRICS}}
+    ts = decode_timestamps([r["created_at"] for r in readings])
+    entry_ids = np.fromiter((r["entry_id"] for r in readings), dtype=np.int64, count=len(readings))
+    return {
+        "count": len(readings),
+        "ts_base": int(ts[0]),
+        "ts_delta": _deltas(ts),
+        "entry_id_base": int(entry_ids[0]),
+        "entry_id_delta": _deltas(entry_ids),
+        **{metric: [r[metric] for r in readings] for metric in COLUMNAR_METRICS},
+    }
+
+
+def _isoformat(value):
+    """json.dumps default= matching orjson's OPT_NAIVE_UTC | OPT_UTC_Z"""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.isoformat().replace("+00:00", "Z")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(payload: Dict) -> bytes:
+    """Compact JSON bytes; datetimes come out as ISO-8601"""
+    if orjson is None:
+        return json.dumps(payload, separators=(",", ":"), default=_isoformat).encode()
+    return orjson.dumps(payload, option=orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z)
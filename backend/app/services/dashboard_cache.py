@@ -0,0 +1,92 @@
+"""
+Pre-rendered dashboard responses
+The full dashboard only changes when a poll appends readings or staleness
+flips, so its JSON bytes are rendered (and validated) once per change and
+then served as-is with a strong ETag
+"""
+import hashlib
+import time
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+
+class RenderedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    media_type: str
+    rendered_monotonic: float
+
+    def age_seconds(self) -> int:
+        return int(time.monotonic() - self.rendered_monotonic)
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, so W/ tags from compression still match)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+class DashboardResponseCache:
+    """
+    Rendered bodies for the current state key, one per response format
+
+    The key is whatever identifies the data behind the response (buffer
+    version and staleness); a new key drops every rendered format.
+    """
+
+    def __init__(self):
+        self._key: Optional[Tuple] = None
+        self._entries: Dict[str, RenderedResponse] = {}
+        self.hits = 0
+        self.renders = 0
+        self.not_modified = 0
+
+    def get(self, key: Tuple, fmt: str, render: Callable[[], Tuple[bytes, str]]) -> RenderedResponse:
+        """Cached response for (key, fmt); `render` returns (body, media_type) on a miss"""
+        if key != self._key:
+            self._key = key
+            self._entries = {}
+        entry = self._entries.get(fmt)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        self.renders += 1
+        body, media_type = render()
+        entry = RenderedResponse(body, make_etag(body), media_type, time.monotonic())
+        self._entries[fmt] = entry
+        return entry
+
+    def clear(self) -> None:
+        self._key = None
+        self._entries = {}
+
+    def stats(self) -> Dict:
+        total = self.hits + self.renders
+        return {
+            'formats_cached': len(self._entries),
+            'hits': self.hits,
+            'renders': self.renders,
+            'not_modified': self.not_modified,
+            'hit_ratio': round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+# Singleton instance
+_dashboard_cache = DashboardResponseCache()
+
+
+def get_dashboard_cache() -> DashboardResponseCache:
+    return _dashboard_cache
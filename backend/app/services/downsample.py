@@ -0,0 +1,245 @@
+"""
+Chart series downsampling
+Largest-Triangle-Three-Buckets (LTTB) over stored readings, so long ranges can
+be charted with ~1000 points while keeping peaks and the overall shape
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.database.readings import ReadingDB, RollupDB, from_epoch
+from app.services.feed_decoder import columns_from_rows
+
+SERIES_METRICS = ("tds", "temp", "voltage")
+
+
+def _first_valid(valid: np.ndarray, from_end: bool = False) -> np.ndarray:
+    """Per row index of the first (or last) True; -1 where a row has none"""
+    n = valid.shape[1]
+    if from_end:
+        idx = n - 1 - valid[:, ::-1].argmax(axis=1)
+    else:
+        idx = valid.argmax(axis=1)
+    return np.where(valid.any(axis=1), idx, -1)
+
+
+def _backfill_nan(values: np.ndarray) -> np.ndarray:
+    """Replace NaNs with the next non-NaN value along axis 1 (row-wise)"""
+    m, b = values.shape
+    idx = np.where(np.isnan(values), b, np.arange(b))
+    idx = np.minimum.accumulate(idx[:, ::-1], axis=1)[:, ::-1]
+    padded = np.concatenate([values, np.full((m, 1), np.nan)], axis=1)
+    return padded[np.arange(m)[:, None], idx]
+
+
+def lttb(x: np.ndarray, ys: np.ndarray, threshold: int) -> List[np.ndarray]:
+    """
+    LTTB-selected indices for several series sharing one x axis
+
+    Args:
+        x: (n,) ascending float64
+        ys: (m, n) float64, NaN where a value is missing
+        threshold: target point count per series (>= 3)
+
+    Returns:
+        m ascending index arrays into x; missing values are never selected.
+    """
+    m, n = ys.shape
+    valid = ~np.isnan(ys)
+    if threshold >= n or threshold < 3:
+        return [np.flatnonzero(row) for row in valid]
+
+    # Bucket j covers [edges[j], edges[j + 1]); the first and last points stand alone
+    n_buckets = threshold - 2
+    edges = (np.arange(n_buckets + 1) * ((n - 2) / n_buckets)).astype(np.int64) + 1
+    edges[-1] = n - 1
+    starts = edges[:-1]
+
+    # Per-bucket averages in one pass (the third triangle vertex)
+    inner_valid = valid[:, : n - 1]
+    counts = np.add.reduceat(inner_valid.astype(np.int64), starts, axis=1)
+    sum_x = np.add.reduceat(np.where(inner_valid, x[: n - 1], 0.0), starts, axis=1)
+    sum_y = np.add.reduceat(np.where(inner_valid, ys[:, : n - 1], 0.0), starts, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_x = sum_x / counts
+        avg_y = sum_y / counts
+
+    rows = np.arange(m)
+    first = _first_valid(valid)
+    last = _first_valid(valid, from_end=True)
+    # c for bucket j is the average of bucket j + 1 (skipping empty buckets),
+    # and the last point for the final bucket
+    c_x = _backfill_nan(np.concatenate([avg_x[:, 1:], np.where(last >= 0, x[last], np.nan)[:, None]], axis=1))
+    c_y = _backfill_nan(np.concatenate([avg_y[:, 1:], np.where(last >= 0, ys[rows, last], np.nan)[:, None]], axis=1))
+
+    selected = np.full((m, n_buckets), -1, dtype=np.int64)
+    a_x = np.where(first >= 0, x[first], np.nan)
+    a_y = np.where(first >= 0, ys[rows, np.maximum(first, 0)], np.nan)
+    for j in range(n_buckets):
+        lo, hi = edges[j], edges[j + 1]
+        px = x[lo:hi]
+        py = ys[:, lo:hi]
+        ax, ay = a_x[:, None], a_y[:, None]
+        area = np.abs((ax - c_x[:, j, None]) * (py - ay) - (ax - px) * (c_y[:, j, None] - ay))
+        # Missing points (and buckets before the first valid point) never win
+        area[np.isnan(area)] = -1.0
+        best = area.argmax(axis=1)
+        found = area[rows, best] >= 0
+        pick = lo + best
+        selected[:, j] = np.where(found, pick, -1)
+        a_x = np.where(found, x[pick], a_x)
+        a_y = np.where(found, ys[rows, pick], a_y)
+
+    result = []
+    for i in range(m):
+        if first[i] < 0:
+            result.append(np.empty(0, dtype=np.int64))
+            continue
+        chosen = selected[i][selected[i] > first[i]]
+        chosen = chosen[chosen < last[i]]
+        result.append(np.concatenate([[first[i]], chosen, [last[i]]]) if last[i] != first[i] else np.array([first[i]]))
+    return result
+
+
+def downsample_series(ts: np.ndarray, ys: np.ndarray, points: int, metrics: Sequence[str]) -> Dict:
+    """
+    Downsample metric rows `ys` (NaN = missing) over epoch seconds `ts`
+
+    Returns {metric: [{"created_at": ..., "value": ...}, ...]}.
+    """
+    if not len(ts):
+        return {metric: [] for metric in metrics}
+    indices = lttb(ts.astype(np.float64), ys, points)
+    # Format each timestamp once even if several metrics pick it
+    used = np.unique(np.concatenate(indices))
+    labels = dict(zip(used.tolist(), (from_epoch(t) for t in ts[used].tolist())))
+    series = {}
+    for metric, row, idx in zip(metrics, ys, indices):
+        series[metric] = [
+            {"created_at": labels[i], "value": v}
+            for i, v in zip(idx.tolist(), row[idx].tolist())
+        ]
+    return series
+
+
+_EMPTY_COLUMNS = (np.empty(0, dtype=np.int64), np.empty((len(SERIES_METRICS), 0)))
+
+
+class SeriesColumnCache:
+    """
+    Decoded per-day column chunks of the reading store
+
+    Pulling a month of rows out of SQLite costs far more than downsampling
+    them (one Python tuple per row), so complete days are kept as arrays.
+    A day is only cached once newer readings exist and it holds readings;
+    complete days the daily rollup counts as empty are never queried.
+    Before reuse each cached day is checked against its row count in the
+    daily rollup (one small query per request), so writes from another
+    process, such as the backfill CLI, are picked up; chunk_seconds must
+    be one of the rollup resolutions.
+    """
+
+    def __init__(self, max_chunks: int, chunk_seconds: int = 86400):
+        self.max_chunks = max_chunks
+        self.chunk_seconds = chunk_seconds
+        self._chunks: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def _load(self, channel: str, start_ts: int, end_ts: int) -> Tuple[np.ndarray, np.ndarray]:
+        columns = columns_from_rows(ReadingDB.range_rows(channel, start_ts, end_ts))
+        ys = np.vstack([columns.metric(metric).filled(np.nan) for metric in SERIES_METRICS])
+        return columns.ts, ys
+
+    def _chunk(self, channel: str, chunk_start: int, newest_ts: int, count: int) -> Tuple[np.ndarray, np.ndarray]:
+        chunk_end = chunk_start + self.chunk_seconds
+        if not count and newest_ts >= chunk_end:
+            # A complete day the rollup says is empty: nothing to load
+            return _EMPTY_COLUMNS
+        key = (channel, chunk_start)
+        with self._lock:
+            chunk = self._chunks.get(key)
+            if chunk is not None:
+                if chunk[2] == count:
+                    self._chunks.move_to_end(key)
+                    self.hits += 1
+                    return chunk[:2]
+                # Rows were added since it was cached (e.g. by a backfill in another process)
+                del self._chunks[key]
+                self.stale += 1
+            self.misses += 1
+        ts, ys = self._load(channel, chunk_start, chunk_end)
+        # A count mismatch means rows landed between the two queries; cache it next time
+        if count and len(ts) == count and newest_ts >= chunk_end:
+            with self._lock:
+                self._chunks[key] = (ts, ys, count)
+                while len(self._chunks) > self.max_chunks:
+                    self._chunks.popitem(last=False)
+        return ts, ys
+
+    def columns(self, channel: str, start_ts: int, end_ts: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(ts, ys) for readings in [start_ts, end_ts); ys rows follow SERIES_METRICS"""
+        oldest_ts, newest_ts = ReadingDB.ts_bounds(channel)
+        if newest_ts is None:
+            return _EMPTY_COLUMNS
+        # Only the stored span is worth walking (start may be 1970)
+        start_ts, end_ts = max(start_ts, oldest_ts), min(end_ts, newest_ts + 1)
+        if end_ts <= start_ts:
+            return _EMPTY_COLUMNS
+        first = start_ts - start_ts % self.chunk_seconds
+        counts = RollupDB.bucket_counts(channel, self.chunk_seconds, first, end_ts)
+        parts = [
+            self._chunk(channel, c, newest_ts, counts.get(c, 0))
+            for c in range(first, end_ts, self.chunk_seconds)
+        ]
+        ts = np.concatenate([p[0] for p in parts])
+        ys = np.concatenate([p[1] for p in parts], axis=1)
+        lo, hi = np.searchsorted(ts, [start_ts, end_ts])
+        return ts[lo:hi], ys[:, lo:hi]
+
+    def invalidate(self, channel: str, start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> None:
+        """Drop a channel's chunks overlapping [start_ts, end_ts) (all if no range)"""
+        with self._lock:
+            for key in list(self._chunks):
+                c_channel, c_start = key
+                if c_channel != channel:
+                    continue
+                if start_ts is None or (c_start < end_ts and c_start + self.chunk_seconds > start_ts):
+                    del self._chunks[key]
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            'chunks': len(self._chunks),
+            'max_chunks': self.max_chunks,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale': self.stale,
+            'hit_ratio': round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+_series_cache = SeriesColumnCache(max_chunks=settings.SERIES_CACHE_DAYS)
+
+
+def get_series_cache() -> SeriesColumnCache:
+    return _series_cache
+
+
+def load_series(channel: str, start_ts: int, end_ts: int, points: int, metrics: Sequence[str] = SERIES_METRICS) -> Dict:
+    """Downsampled series for readings stored in [start_ts, end_ts) (blocking; run in a thread)"""
+    ts, ys = _series_cache.columns(channel, start_ts, end_ts)
+    ys = ys[[SERIES_METRICS.index(metric) for metric in metrics]]
+    return {
+        "channel_id": channel,
+        "start": from_epoch(start_ts),
+        "end": from_epoch(end_ts),
+        "points": points,
+        "source_points": len(ts),
+        "series": downsample_series(ts, ys, points, metrics),
+    }
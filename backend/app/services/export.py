@@ -0,0 +1,189 @@
+"""
+Streaming reading export (CSV / Parquet)
+Reads the local store one keyset page at a time and encodes each page as it
+goes, so memory stays flat no matter how long the range is
+"""
+import asyncio
+import zlib
+from typing import AsyncIterator, Iterator, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.database.readings import ReadingDB
+from app.services.feed_decoder import FeedColumns, columns_from_rows
+
+CSV_HEADER = "Timestamp (UTC),TDS (PPM),Temp (°C),Voltage (V),Status\n"
+
+
+def parquet_available() -> bool:
+    """Parquet export needs the optional 'pyarrow' package"""
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _status(columns: FeedColumns, threshold: float) -> np.ndarray:
+    # Same rule as the History page: ALERT when tds is above the threshold
+    return np.where(columns.tds.filled(-np.inf) > threshold, "ALERT", "OK")
+
+
+def _csv_values(column: np.ma.MaskedArray) -> List[str]:
+    """Floats as repr, missing values as empty fields"""
+    return ["" if v is None else repr(v) for v in column.tolist(None)]
+
+
+def encode_csv(columns: FeedColumns, threshold: float) -> bytes:
+    timestamps = np.datetime_as_string(columns.ts.astype("datetime64[s]"), unit="s")
+    lines = map(
+        ",".join,
+        zip(
+            (f"{t}Z" for t in timestamps.tolist()),
+            _csv_values(columns.tds),
+            _csv_values(columns.temp),
+            _csv_values(columns.voltage),
+            _status(columns, threshold).tolist(),
+        ),
+    )
+    return ("\n".join(lines) + "\n").encode()
+
+
+class _ChunkSink:
+    """Write-only file object whose contents are drained after every row group"""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def writable(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+class ReadingExporter:
+    """Encodes a range of stored readings page by page"""
+
+    def __init__(
+        self,
+        channel: str,
+        start_ts: int,
+        end_ts: int,
+        fmt: str = "csv",
+        gzip: bool = False,
+        threshold: Optional[float] = None,
+        chunk_rows: Optional[int] = None,
+    ):
+        if fmt not in ("csv", "parquet"):
+            raise ValueError(f"Unsupported export format: {fmt}")
+        if fmt == "parquet" and not parquet_available():
+            raise RuntimeError("Parquet export requires the 'pyarrow' package")
+        self.channel = channel
+        self.start_ts = start_ts
+        self.end_ts = end_ts
+        self.fmt = fmt
+        # Parquet compresses its own column chunks
+        self.gzip = gzip and fmt == "csv"
+        self.threshold = settings.TDS_ALERT_THRESHOLD if threshold is None else threshold
+        self.chunk_rows = chunk_rows or settings.EXPORT_CHUNK_ROWS
+        self.rows_exported = 0
+
+    @property
+    def media_type(self) -> str:
+        if self.fmt == "parquet":
+            return "application/vnd.apache.parquet"
+        return "application/gzip" if self.gzip else "text/csv; charset=utf-8"
+
+    @property
+    def filename(self) -> str:
+        name = f"evara-tds-{self.channel}-{self.start_ts}-{self.end_ts}.{self.fmt}"
+        return name + ".gz" if self.gzip else name
+
+    def _pages(self) -> Iterator[FeedColumns]:
+        after = None
+        while True:
+            rows = ReadingDB.range_page(self.channel, self.start_ts, self.end_ts, self.chunk_rows, after)
+            if rows:
+                self.rows_exported += len(rows)
+                yield columns_from_rows(rows)
+            if len(rows) < self.chunk_rows:
+                return
+            after = (rows[-1][1], rows[-1][0])
+
+    def _csv_chunks(self) -> Iterator[bytes]:
+        # wbits=31: gzip container rather than raw zlib
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if self.gzip else None
+        encode = compressor.compress if compressor else bytes
+        yield encode(CSV_HEADER.encode())
+        for columns in self._pages():
+            yield encode(encode_csv(columns, self.threshold))
+        if compressor:
+            yield compressor.flush()
+
+    def _parquet_chunks(self) -> Iterator[bytes]:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([
+            ("timestamp", pa.timestamp("s", tz="UTC")),
+            ("entry_id", pa.int64()),
+            ("tds", pa.float64()),
+            ("temp", pa.float64()),
+            ("voltage", pa.float64()),
+            ("status", pa.string()),
+        ])
+        metric = lambda col: pa.array(col.data, mask=np.ma.getmaskarray(col), type=pa.float64())
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        # One row group per page
+        for columns in self._pages():
+            writer.write_table(pa.Table.from_arrays(
+                [
+                    pa.array(columns.ts, type=pa.timestamp("s", tz="UTC")),
+                    pa.array(columns.entry_id, type=pa.int64()),
+                    metric(columns.tds),
+                    metric(columns.temp),
+                    metric(columns.voltage),
+                    pa.array(_status(columns, self.threshold)),
+                ],
+                schema=schema,
+            ))
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+    def chunks(self) -> Iterator[bytes]:
+        """Encoded chunks (blocking; each page is one chunk)"""
+        return self._parquet_chunks() if self.fmt == "parquet" else self._csv_chunks()
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """Async byte iterator for a StreamingResponse; pages are read and encoded off the event loop"""
+        chunks = self.chunks()
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                return
+            if chunk:
+                yield chunk
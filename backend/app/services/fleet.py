@@ -0,0 +1,200 @@
+"""
+Fleet overview
+Latest reading, status and staleness for every registered device, fetched
+concurrently (bounded) so a page of 100 sites costs about one round trip
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.database.db import DeviceDB
+from app.services.circuit_breaker import CLOSED, CircuitBreaker
+from app.services.ingestion import get_ingestor, parse_created_at
+from app.services.poller import ensure_readings
+from app.services.status import live_thresholds, reading_status
+from app.services.thingspeak import get_thingspeak_client, parse_feeds
+
+logger = logging.getLogger(__name__)
+
+
+class FleetFetchError(Exception):
+    """ThingSpeak answered, but not with a usable feed"""
+
+
+def registered_devices() -> List[Dict]:
+    """Active devices; the configured channel alone when the registry is empty"""
+    devices = DeviceDB.get_all(active_only=True)
+    if devices:
+        return devices
+    return [{
+        "id": "default",
+        "name": settings.PROJECT_NAME,
+        "channel_id": settings.THINGSPEAK_CHANNEL_ID,
+        "read_key": settings.THINGSPEAK_READ_KEY,
+        "location": "",
+    }]
+
+
+class FleetMonitor:
+    """
+    Per-channel latest readings with a short TTL
+
+    Concurrent requests for the same channel share one fetch. A failed fetch
+    falls back to the last good reading, marked stale. The channel the
+    ingestor already follows is served from its buffer without a fetch.
+    Each channel has its own circuit breaker, so a failing device (or a 429
+    caused by the fan-out) never opens the breaker ingestion depends on.
+    """
+
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        timeout_seconds: Optional[float] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.concurrency = concurrency or settings.FLEET_CONCURRENCY
+        self.timeout_seconds = timeout_seconds or settings.FLEET_FETCH_TIMEOUT_SECONDS
+        self.ttl_seconds = settings.FLEET_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        # channel -> (fetched monotonic, reading or None)
+        self._latest: Dict[str, tuple] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self.fetches = 0
+        self.cache_hits = 0
+        self.failures = 0
+        self.last_elapsed_ms: Optional[float] = None
+
+    def _breaker(self, channel_id: str) -> CircuitBreaker:
+        breaker = self._breakers.get(channel_id)
+        if breaker is None:
+            breaker = self._breakers[channel_id] = CircuitBreaker(
+                f"fleet:{channel_id}",
+                failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+                recovery_seconds=settings.CIRCUIT_RECOVERY_SECONDS,
+                half_open_max_calls=settings.CIRCUIT_HALF_OPEN_MAX_CALLS,
+            )
+        return breaker
+
+    async def _fetch(self, channel_id: str, read_key: str) -> Optional[Dict]:
+        response = await get_thingspeak_client().get_feeds(
+            channel_id, read_key or "", breaker=self._breaker(channel_id), results=1
+        )
+        if response.status_code != 200:
+            raise FleetFetchError(f"ThingSpeak API Error: {response.status_code}")
+        feeds = parse_feeds(response.json().get("feeds") or [])
+        return feeds[-1] if feeds else None
+
+    async def _fetch_and_store(self, channel_id: str, read_key: str, semaphore: asyncio.Semaphore) -> Optional[Dict]:
+        async with semaphore:
+            self.fetches += 1
+            try:
+                reading = await asyncio.wait_for(self._fetch(channel_id, read_key), self.timeout_seconds)
+            except Exception as e:
+                self.failures += 1
+                logger.warning(f"Fleet fetch failed for channel {channel_id}: {e!r}")
+                raise
+        self._latest[channel_id] = (time.monotonic(), reading)
+        return reading
+
+    def _fetch_done(self, channel_id: str, task: asyncio.Task) -> None:
+        self._inflight.pop(channel_id, None)
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter went away
+            task.exception()
+
+    async def _latest_for(self, device: Dict, semaphore: asyncio.Semaphore) -> Dict:
+        """{"reading", "error"} for one device, from cache, a shared in-flight fetch, or a new one"""
+        channel_id = str(device["channel_id"])
+        cached = self._latest.get(channel_id)
+        if cached and time.monotonic() - cached[0] < self.ttl_seconds:
+            self.cache_hits += 1
+            return {"reading": cached[1], "error": None}
+
+        task = self._inflight.get(channel_id)
+        if task is None:
+            # A task of its own, so a caller that disconnects doesn't cancel it for the others
+            task = asyncio.create_task(self._fetch_and_store(channel_id, device.get("read_key") or "", semaphore))
+            task.add_done_callback(lambda done: self._fetch_done(channel_id, done))
+            self._inflight[channel_id] = task
+        try:
+            return {"reading": await asyncio.shield(task), "error": None}
+        except Exception as e:
+            # Whatever went wrong (HTTP, timeout, a malformed feed) only marks this device
+            last_good = self._latest.get(channel_id)
+            return {"reading": last_good[1] if last_good else None, "error": str(e) or type(e).__name__}
+
+    def _summary(self, device: Dict, reading: Optional[Dict], error: Optional[str], thresholds) -> Dict:
+        now = datetime.now(timezone.utc)
+        age = None
+        if reading and reading.get("created_at"):
+            age = round((now - parse_created_at(reading["created_at"])).total_seconds(), 1)
+        summary = {
+            "device_id": device["id"],
+            "name": device["name"],
+            "channel_id": str(device["channel_id"]),
+            "location": device.get("location", ""),
+            "status": reading_status(reading, thresholds) if reading else "UNKNOWN",
+            "stale": error is not None or age is None or age > settings.FLEET_STALE_AFTER_SECONDS,
+            "age_seconds": age,
+            "created_at": reading.get("created_at") if reading else None,
+            "entry_id": reading.get("entry_id") if reading else None,
+            "tds": reading.get("tds") if reading else None,
+            "temp": reading.get("temp") if reading else None,
+            "voltage": reading.get("voltage") if reading else None,
+        }
+        if error:
+            summary["error"] = error
+        return summary
+
+    async def _device(self, device: Dict, semaphore: asyncio.Semaphore, thresholds) -> Dict:
+        ingestor = get_ingestor()
+        if str(device["channel_id"]) == str(ingestor.channel_id):
+            result = await ensure_readings()
+            error = result.get("error") if ingestor.freshness()["stale"] else None
+            return self._summary(device, ingestor.buffer.latest(), error, thresholds)
+        latest = await self._latest_for(device, semaphore)
+        return self._summary(device, latest["reading"], latest["error"], thresholds)
+
+    async def overview(self, devices: List[Dict]) -> Dict:
+        """Summaries for `devices` in registry order, fetched at most `concurrency` at a time"""
+        started = time.monotonic()
+        thresholds = live_thresholds()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        summaries = await asyncio.gather(*(self._device(device, semaphore, thresholds) for device in devices))
+        counts: Dict[str, int] = {}
+        for summary in summaries:
+            counts[summary["status"]] = counts.get(summary["status"], 0) + 1
+        self.last_elapsed_ms = round((time.monotonic() - started) * 1000, 1)
+        return {
+            "count": len(summaries),
+            "status_counts": counts,
+            "stale_count": sum(summary["stale"] for summary in summaries),
+            "elapsed_ms": self.last_elapsed_ms,
+            "devices": summaries,
+        }
+
+    def stats(self) -> Dict:
+        return {
+            'channels_cached': len(self._latest),
+            'inflight': len(self._inflight),
+            'fetches': self.fetches,
+            'cache_hits': self.cache_hits,
+            'failures': self.failures,
+            'open_breakers': sum(breaker.state != CLOSED for breaker in self._breakers.values()),
+            'concurrency': self.concurrency,
+            'last_elapsed_ms': self.last_elapsed_ms,
+        }
+
+
+# Singleton instance
+_fleet_monitor: Optional[FleetMonitor] = None
+
+
+def get_fleet_monitor() -> FleetMonitor:
+    global _fleet_monitor
+    if _fleet_monitor is None:
+        _fleet_monitor = FleetMonitor()
+    return _fleet_monitor
@@ -0,0 +1,373 @@
+"""
+Incremental ThingSpeak ingestion
+Remembers the highest entry_id seen and only pulls newer entries into an
+in-memory ring buffer that the dashboard is served from
+"""
+import asyncio
+import logging
+import sqlite3
+import time
+from collections import deque
+from itertools import islice
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+import httpx
+from app.core.config import settings
+from app.database.readings import ReadingDB
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.snapshot_cache import SnapshotCache
+from app.services.thingspeak import ThingSpeakClient, get_thingspeak_client, parse_feeds
+
+logger = logging.getLogger(__name__)
+
+# ThingSpeak caps a single feeds.json response at 8000 entries
+THINGSPEAK_MAX_RESULTS = 8000
+
+
+def parse_created_at(value: str) -> datetime:
+    """Parse ThingSpeak's ISO-8601 'created_at' into an aware UTC datetime"""
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(timezone.utc)
+
+
+class ReadingBuffer:
+    """Fixed-size ring buffer of normalized readings, ordered by entry_id"""
+
+    def __init__(self, maxlen: int):
+        self._readings: deque = deque(maxlen=maxlen)
+        self.last_entry_id: Optional[int] = None
+        # Bumped on every append so readers can detect changes cheaply
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._readings)
+
+    @property
+    def maxlen(self) -> int:
+        return self._readings.maxlen
+
+    def extend(self, readings: List[Dict]) -> List[Dict]:
+        """Append readings newer than the cursor; returns the ones appended"""
+        appended = []
+        for reading in sorted(readings, key=lambda r: r["entry_id"]):
+            if self.last_entry_id is not None and reading["entry_id"] <= self.last_entry_id:
+                continue
+            self._readings.append(reading)
+            self.last_entry_id = reading["entry_id"]
+            appended.append(reading)
+        if appended:
+            self.version += 1
+        return appended
+
+    def latest(self) -> Optional[Dict]:
+        return self._readings[-1] if self._readings else None
+
+    def oldest_entry_id(self) -> Optional[int]:
+        return self._readings[0]["entry_id"] if self._readings else None
+
+    def _tail_while(self, is_newer: Callable[[Dict], bool], limit: Optional[int]) -> List[Dict]:
+        """
+        Oldest-first run of newest readings matching `is_newer`
+
+        With `limit`, the oldest `limit` of them, so a caller paging forward
+        from a cursor never skips rows.
+        """
+        newer = []
+        for reading in reversed(self._readings):
+            if not is_newer(reading):
+                break
+            newer.append(reading)
+        newer.reverse()
+        return newer if limit is None else newer[:limit]
+
+    def after(self, entry_id: int, limit: Optional[int] = None) -> List[Dict]:
+        """Readings with entry_id greater than `entry_id` (the oldest `limit` of them)"""
+        return self._tail_while(lambda r: r["entry_id"] > entry_id, limit)
+
+    def created_after(self, when: datetime, limit: Optional[int] = None) -> List[Dict]:
+        """Readings created strictly after `when` (the oldest `limit`; naive datetimes are UTC)"""
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return self._tail_while(lambda r: parse_created_at(r["created_at"]) > when, limit)
+
+    def covers(self, entry_id: int) -> bool:
+        """True if every reading after `entry_id` is still held"""
+        oldest = self.oldest_entry_id()
+        return oldest is None or entry_id >= oldest - 1
+
+    def covers_since(self, when: datetime) -> bool:
+        """True if every reading created after `when` is still held"""
+        if not self._readings:
+            return True
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return parse_created_at(self._readings[0]["created_at"]) <= when
+
+    def snapshot(self, limit: Optional[int] = None) -> List[Dict]:
+        """Oldest-first copy of the last `limit` readings (all if None)"""
+        if limit is None or limit >= len(self._readings):
+            return list(self._readings)
+        tail = list(islice(reversed(self._readings), limit))
+        tail.reverse()
+        return tail
+
+
+class IncrementalIngestor:
+    """Polls ThingSpeak for entries newer than the buffer's entry_id cursor"""
+
+    def __init__(
+        self,
+        buffer: ReadingBuffer,
+        client: Optional[ThingSpeakClient] = None,
+        channel_id: Optional[str] = None,
+        api_key: Optional[str] = None,
+        bootstrap_results: Optional[int] = None,
+    ):
+        self.buffer = buffer
+        self._client = client
+        self.channel_id = channel_id or settings.THINGSPEAK_CHANNEL_ID
+        self.api_key = api_key
+        self.bootstrap_results = bootstrap_results or settings.DASHBOARD_HISTORY_SIZE
+        self.polls = 0
+        self.rows_fetched = 0
+        self.rows_persisted = 0
+        self.consecutive_failures = 0
+        self.gap_pages = 0
+        self.gaps_handed_off = 0
+        self.last_error: Optional[str] = None
+        self.last_success_monotonic: Optional[float] = None
+        self._hydrated = False
+        # Called with every poll result (e.g. the stream broadcaster)
+        self._listeners: List[Callable[[Dict], None]] = []
+
+    @property
+    def client(self) -> ThingSpeakClient:
+        return self._client or get_thingspeak_client()
+
+    def add_listener(self, listener: Callable[[Dict], None]) -> None:
+        """Register a synchronous callback for poll results"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def _notify(self, result: Dict) -> None:
+        for listener in self._listeners:
+            try:
+                listener(result)
+            except Exception:
+                logger.exception("Ingestion listener raised")
+
+    def _window_params(self) -> Dict:
+        """
+        Request window for the next poll
+
+        ThingSpeak has no entry_id filter, so after bootstrap we ask for entries
+        created at or after the newest reading we hold (`start` is second
+        resolution and inclusive) and drop anything at or below the cursor.
+        """
+        latest = self.buffer.latest()
+        if latest is None or not latest.get("created_at"):
+            return {"results": self.bootstrap_results}
+        start = parse_created_at(latest["created_at"])
+        return {
+            "start": start.strftime("%Y-%m-%d %H:%M:%S"),
+            "timezone": "Etc/UTC",
+            "results": THINGSPEAK_MAX_RESULTS,
+        }
+
+    def hydrate(self) -> int:
+        """Seed the buffer and cursor from the local reading store (after a restart)"""
+        self._hydrated = True
+        if len(self.buffer):
+            return 0
+        try:
+            stored = ReadingDB.latest(self.channel_id, limit=self.buffer.maxlen)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not hydrate reading buffer: {e}")
+            return 0
+        return len(self.buffer.extend(stored))
+
+    async def _persist(self, readings: List[Dict]) -> None:
+        try:
+            self.rows_persisted += await asyncio.to_thread(ReadingDB.insert_many, self.channel_id, readings)
+        except sqlite3.Error as e:
+            # The buffer still serves the dashboard if the store is unavailable
+            logger.warning(f"Could not persist {len(readings)} readings: {e}")
+
+    async def poll(self) -> Dict:
+        """
+        Fetch new entries, append them to the buffer and persist them
+
+        Returns:
+            dict with 'new' (count appended), 'readings' (those appended),
+            'observed' (the same with missing fields as None, when any
+            were appended) and 'last_entry_id', or 'error'
+        """
+        if not self._hydrated:
+            await asyncio.to_thread(self.hydrate)
+
+        cursor = self.buffer.last_entry_id
+        params = self._window_params()
+        try:
+            response = await self.client.get_feeds(channel_id=self.channel_id, api_key=self.api_key, **params)
+        except httpx.RequestError as e:
+            logger.warning(f"ThingSpeak poll failed: {e}")
+            return self._failed("Connection to ThingSpeak failed")
+        except CircuitOpenError as e:
+            return self._failed(str(e))
+
+        if response.status_code != 200:
+            return self._failed(f"ThingSpeak API Error: {response.status_code}")
+
+        feeds = response.json().get("feeds") or []
+        if cursor is not None and "start" in params and len(feeds) >= THINGSPEAK_MAX_RESULTS:
+            feeds = await self._fill_gap(feeds, cursor, params)
+        self.polls += 1
+        self.rows_fetched += len(feeds)
+        self.consecutive_failures = 0
+        self.last_success_monotonic = time.monotonic()
+        appended = self.buffer.extend(parse_feeds(feeds))
+        result = {"new": len(appended), "readings": appended, "last_entry_id": self.buffer.last_entry_id}
+        if appended:
+            # The same readings with empty fields left as None, for listeners
+            # that must not mistake a gap for a zero
+            appended_ids = {reading["entry_id"] for reading in appended}
+            result["observed"] = sorted(
+                (reading for reading in parse_feeds(feeds, missing=None) if reading["entry_id"] in appended_ids),
+                key=lambda reading: reading["entry_id"],
+            )
+            # Stored with gaps as NULL, like backfilled rows
+            await self._persist(result["observed"])
+        self._notify(result)
+        return result
+
+    async def _fill_gap(self, feeds: List[Dict], cursor: int, params: Dict) -> List[Dict]:
+        """
+        Page backwards through a capped poll response
+
+        ThingSpeak returns the newest `results` entries of the window, so when
+        more than 8000 arrived since the last poll the oldest ones are missing.
+        Each page ends where the previous one began, up to INGEST_GAP_MAX_PAGES;
+        whatever is still missing is handed to a backfill job for the store.
+        """
+        pages = [feeds]
+        oldest = min(feeds, key=lambda f: f["entry_id"])
+        capped = True
+        for _ in range(settings.INGEST_GAP_MAX_PAGES):
+            if oldest["entry_id"] <= cursor + 1:
+                capped = False
+                break
+            try:
+                response = await self.client.get_feeds(
+                    channel_id=self.channel_id,
+                    api_key=self.api_key,
+                    **{**params, "end": parse_created_at(oldest["created_at"]).strftime("%Y-%m-%d %H:%M:%S")},
+                )
+            except (httpx.RequestError, CircuitOpenError) as e:
+                logger.warning(f"Paging back through a capped poll failed: {e}")
+                break
+            if response.status_code != 200:
+                break
+            page = response.json().get("feeds") or []
+            older = [f for f in page if f["entry_id"] < oldest["entry_id"]]
+            if not older:
+                capped = False
+                break
+            self.gap_pages += 1
+            pages.append(older)
+            oldest = min(older, key=lambda f: f["entry_id"])
+            if len(page) < THINGSPEAK_MAX_RESULTS:
+                capped = False
+                break
+
+        if capped and oldest["entry_id"] > cursor + 1:
+            self._hand_off_gap(params["start"], oldest["created_at"], oldest["entry_id"] - cursor - 1)
+        return [feed for page in reversed(pages) for feed in page]
+
+    def _hand_off_gap(self, start: str, oldest_created_at: str, missing: int) -> None:
+        """Backfill what paging couldn't reach (the store, not the buffer)"""
+        # Imported here: backfill imports this module
+        from app.services.backfill import BackfillJob, start_backfill
+        logger.warning(
+            f"Poll fell {missing} entries behind ThingSpeak's 8000-entry cap; "
+            f"backfilling {start} - {oldest_created_at}"
+        )
+        self.gaps_handed_off += 1
+        try:
+            start_backfill(BackfillJob(
+                start=datetime.strptime(start, "%Y-%m-%d %H:%M:%S"),
+                # Backfill's end is exclusive; overlap is ignored on insert
+                end=parse_created_at(oldest_created_at) + timedelta(seconds=1),
+                channel_id=self.channel_id,
+                api_key=self.api_key,
+                client=self._client,
+            ))
+        except (RuntimeError, ValueError) as e:
+            logger.error(f"Could not start backfill for the ingestion gap: {e}")
+
+    def _failed(self, error: str) -> Dict:
+        self.consecutive_failures += 1
+        self.last_error = error
+        result = {"error": error}
+        self._notify(result)
+        return result
+
+    def freshness(self) -> Dict:
+        """
+        How current the buffer is
+
+        'stale' means the latest poll failed (or none has succeeded) and the
+        buffer is being served as a last-good snapshot.
+        """
+        age = None
+        if self.last_success_monotonic is not None:
+            age = round(time.monotonic() - self.last_success_monotonic, 3)
+        return {
+            "stale": self.consecutive_failures > 0 or self.last_success_monotonic is None,
+            "snapshot_age_seconds": age,
+        }
+
+    def stats(self) -> Dict:
+        return {
+            'channel_id': self.channel_id,
+            'last_entry_id': self.buffer.last_entry_id,
+            'buffered': len(self.buffer),
+            'polls': self.polls,
+            'rows_fetched': self.rows_fetched,
+            'rows_persisted': self.rows_persisted,
+            'consecutive_failures': self.consecutive_failures,
+            'gap_pages': self.gap_pages,
+            'gaps_handed_off': self.gaps_handed_off,
+            'last_error': self.last_error,
+        }
+
+
+_reading_buffer = ReadingBuffer(maxlen=settings.INGEST_BUFFER_SIZE)
+_ingestor = IncrementalIngestor(_reading_buffer)
+_poll_cache = SnapshotCache(ttl_seconds=settings.SNAPSHOT_CACHE_TTL_SECONDS)
+
+
+def get_reading_buffer() -> ReadingBuffer:
+    return _reading_buffer
+
+
+def get_ingestor() -> IncrementalIngestor:
+    return _ingestor
+
+
+def get_poll_cache() -> SnapshotCache:
+    """Cache that rate-limits and coalesces upstream polls (exposed for metrics)"""
+    return _poll_cache
+
+
+async def ingest_latest() -> Dict:
+    """
+    Run one incremental poll, shared by concurrent callers
+
+    At most one upstream poll happens per SNAPSHOT_CACHE_TTL_SECONDS; callers
+    then read the buffer. Failed polls are not cached so the next call retries.
+    """
+    return await _poll_cache.get_or_load(
+        ("ingest", _ingestor.channel_id),
+        _ingestor.poll,
+        cacheable=lambda result: not result.get("error"),
+    )
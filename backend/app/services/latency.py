@@ -0,0 +1,41 @@
+"""
+Rolling latency recorder
+Keeps the most recent samples and reports percentiles for metrics and
+deadline tuning
+"""
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+
+
+class LatencyRecorder:
+    """Fixed-size window of latency samples in milliseconds"""
+
+    def __init__(self, maxlen: int = 1024):
+        self._samples: deque = deque(maxlen=maxlen)
+        self.count = 0
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, millis: float) -> None:
+        self._samples.append(millis)
+        self.count += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """q in [0, 100]; None until there are samples"""
+        if not self._samples:
+            return None
+        return float(np.percentile(np.fromiter(self._samples, dtype=np.float64), q))
+
+    def summary(self) -> Dict:
+        if not self._samples:
+            return {'count': self.count, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+        p50, p95, p99 = np.percentile(np.fromiter(self._samples, dtype=np.float64), [50, 95, 99])
+        return {
+            'count': self.count,
+            'p50_ms': round(float(p50), 2),
+            'p95_ms': round(float(p95), 2),
+            'p99_ms': round(float(p99), 2),
+        }
@@ -0,0 +1,131 @@
+"""
+Background ingestion poller
+Fetches from ThingSpeak on its own schedule so request handlers only read
+local state; owned by the FastAPI lifespan
+"""
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.services.ingestion import IncrementalIngestor, get_ingestor, ingest_latest, parse_created_at
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionPoller:
+    """Runs IncrementalIngestor.poll() every interval ± jitter"""
+
+    def __init__(
+        self,
+        ingestor: IncrementalIngestor,
+        interval_seconds: Optional[float] = None,
+        jitter_seconds: Optional[float] = None,
+    ):
+        self.ingestor = ingestor
+        self.interval_seconds = interval_seconds or settings.POLLER_INTERVAL_SECONDS
+        self.jitter_seconds = settings.POLLER_JITTER_SECONDS if jitter_seconds is None else jitter_seconds
+        self._task: Optional[asyncio.Task] = None
+        self.polls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_error: Optional[str] = None
+        self.last_success_monotonic: Optional[float] = None
+        self.last_poll_duration_ms: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self._run(), name="thingspeak-poller")
+            logger.info(f"Ingestion poller started (every {self.interval_seconds}s ± {self.jitter_seconds}s)")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Ingestion poller stopped")
+
+    async def poll_once(self) -> Dict:
+        started = time.monotonic()
+        try:
+            result = await self.ingestor.poll()
+        except Exception as e:
+            # Never let one bad response kill the loop
+            logger.exception("Ingestion poll raised")
+            result = {"error": str(e)}
+        self.last_poll_duration_ms = (time.monotonic() - started) * 1000
+        self.polls += 1
+
+        if result.get("error"):
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = result["error"]
+            logger.warning(f"Ingestion poll failed ({self.consecutive_failures} in a row): {result['error']}")
+        else:
+            self.consecutive_failures = 0
+            self.last_success_monotonic = time.monotonic()
+        return result
+
+    async def _run(self) -> None:
+        while True:
+            await self.poll_once()
+            delay = self.interval_seconds + random.uniform(-self.jitter_seconds, self.jitter_seconds)
+            await asyncio.sleep(max(0.0, delay))
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        latest = self.ingestor.buffer.latest()
+        data_lag = None
+        if latest and latest.get("created_at"):
+            data_lag = (datetime.now(timezone.utc) - parse_created_at(latest["created_at"])).total_seconds()
+        return {
+            'running': self.running,
+            'interval_seconds': self.interval_seconds,
+            'jitter_seconds': self.jitter_seconds,
+            'polls': self.polls,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'last_error': self.last_error,
+            'last_poll_duration_ms': self.last_poll_duration_ms,
+            # Seconds since the last successful poll
+            'poll_lag_seconds': round(now - self.last_success_monotonic, 3) if self.last_success_monotonic else None,
+            # Seconds between now and the newest reading's created_at
+            'data_lag_seconds': round(data_lag, 3) if data_lag is not None else None,
+        }
+
+
+# Singleton instance
+_poller: Optional[IngestionPoller] = None
+
+
+def get_poller() -> IngestionPoller:
+    """Get or create the shared ingestion poller"""
+    global _poller
+    if _poller is None:
+        _poller = IngestionPoller(get_ingestor())
+    return _poller
+
+
+async def ensure_readings() -> Dict:
+    """
+    Request-path hook for fresh readings
+
+    With the background poller running this does no upstream I/O. Without it
+    (Mangum runs with lifespan="off"), or before its first successful poll,
+    it falls back to an inline, coalesced poll.
+    """
+    poller = get_poller()
+    if poller.running and poller.ingestor.buffer.latest() is not None:
+        return {}
+    return await ingest_latest()
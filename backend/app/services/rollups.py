@@ -0,0 +1,72 @@
+"""
+Rollup queries
+Serves min/max/avg/std per bucket from the rollup tables, picking the coarsest
+resolution that still gives the caller enough buckets for the range
+"""
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from app.database.readings import ROLLUP_METRICS, ROLLUP_RESOLUTIONS, ROLLUP_STATS, RollupDB, from_epoch
+
+RESOLUTION_NAMES = {60: "1m", 900: "15m", 3600: "1h", 86400: "1d"}
+RESOLUTIONS_BY_NAME = {name: seconds for seconds, name in RESOLUTION_NAMES.items()}
+
+
+def pick_resolution(start_ts: int, end_ts: int, target_buckets: int) -> int:
+    """Coarsest resolution giving at least `target_buckets` over the range (finest if none does)"""
+    span = end_ts - start_ts
+    for resolution in reversed(ROLLUP_RESOLUTIONS):
+        if span // resolution >= target_buckets:
+            return resolution
+    return ROLLUP_RESOLUTIONS[0]
+
+
+def summarize(rows, metrics: Sequence[str] = ROLLUP_METRICS):
+    """Rollup tuples -> per-bucket dicts with count/min/max/avg/std per metric"""
+    if not rows:
+        return []
+    # NULL sums/min/max (buckets with no values for a metric) become NaN
+    table = np.array(rows, dtype=np.float64)
+    buckets = table[:, 0].astype(np.int64).tolist()
+    out = [{"bucket": from_epoch(b), "count": int(n)} for b, n in zip(buckets, table[:, 1].tolist())]
+    width = len(ROLLUP_STATS)
+    for metric in metrics:
+        offset = 2 + ROLLUP_METRICS.index(metric) * width
+        count, total, low, high, sumsq = (table[:, offset + i] for i in range(width))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            avg = total / count
+            std = np.sqrt(np.maximum(sumsq / count - avg * avg, 0.0))
+        stats = zip(count.astype(np.int64).tolist(), low.tolist(), high.tolist(), avg.tolist(), std.tolist())
+        for bucket, (c, lo, hi, mean, dev) in zip(out, stats):
+            bucket[metric] = (
+                {"count": c, "min": lo, "max": hi, "avg": round(mean, 4), "std": round(dev, 4)}
+                if c else {"count": 0, "min": None, "max": None, "avg": None, "std": None}
+            )
+    return out
+
+
+def query_rollups(
+    channel: str,
+    start_ts: int,
+    end_ts: int,
+    resolution: Optional[int] = None,
+    target_buckets: int = 300,
+    metrics: Sequence[str] = ROLLUP_METRICS,
+) -> Dict:
+    """
+    Rollup buckets for [start_ts, end_ts) (blocking; run in a thread)
+
+    Buckets are aligned to the resolution, so the first one may start before
+    start_ts.
+    """
+    resolution = resolution or pick_resolution(start_ts, end_ts, target_buckets)
+    rows = RollupDB.range_rows(channel, resolution, start_ts - start_ts % resolution, end_ts)
+    return {
+        "channel_id": channel,
+        "start": from_epoch(start_ts),
+        "end": from_epoch(end_ts),
+        "resolution": RESOLUTION_NAMES[resolution],
+        "resolution_seconds": resolution,
+        "buckets": summarize(rows, metrics),
+    }
@@ -0,0 +1,88 @@
+"""
+Snapshot cache - TTL cache with single-flight loading
+Concurrent misses for the same key share one in-flight upstream call
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SnapshotCache:
+    """In-memory TTL cache that coalesces concurrent loads per key"""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.loads = 0
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value if still fresh, without loading"""
+        entry = self._entries.get(key)
+        if entry and time.monotonic() - entry[0] < self.ttl_seconds:
+            return entry[1]
+        return None
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        cacheable: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """
+        Serve `key` from memory, or run `loader` once for all concurrent callers
+
+        Args:
+            key: Cache key
+            loader: Coroutine factory that fetches a fresh value
+            cacheable: Optional predicate; values it rejects (e.g. upstream
+                error payloads) are shared with waiters but not stored
+        """
+        entry = self._entries.get(key)
+        if entry and time.monotonic() - entry[0] < self.ttl_seconds:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            # The load runs as its own task so a caller that disconnects
+            # mid-flight does not cancel it for everyone else waiting
+            task = asyncio.ensure_future(loader())
+            self._inflight[key] = task
+            self.loads += 1
+            task.add_done_callback(lambda t: self._on_loaded(key, t, cacheable))
+        return await asyncio.shield(task)
+
+    def _on_loaded(self, key: Hashable, task: asyncio.Future, cacheable) -> None:
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        value = task.result()
+        if cacheable is None or cacheable(value):
+            self._entries[key] = (time.monotonic(), value)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one key, or everything"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for the metrics endpoint"""
+        lookups = self.hits + self.misses
+        return {
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'upstream_loads': self.loads,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'entries': len(self._entries),
+        }
@@ -0,0 +1,167 @@
+"""
+Reading status classification
+Maps readings to the NORMAL / WARNING / CRITICAL levels shown on the
+dashboard, one at a time or a whole batch at once with NumPy
+"""
+import json
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import SETTINGS_FILE, settings
+from app.database.readings import from_epoch
+from app.services.downsample import SERIES_METRICS, get_series_cache
+from app.services.feed_decoder import decode_timestamps
+
+STATUS_LABELS = ("NORMAL", "WARNING", "CRITICAL")
+NORMAL, WARNING, CRITICAL = range(3)
+
+
+class Thresholds(NamedTuple):
+    """CRITICAL above tds/temp, WARNING above the *_warning levels"""
+    tds: float
+    temp: float
+    tds_warning: float
+    temp_warning: float
+
+
+def make_thresholds(tds: float, temp: float) -> Thresholds:
+    return Thresholds(
+        tds, temp, tds * settings.STATUS_TDS_WARNING_RATIO, temp * settings.STATUS_TEMP_WARNING_RATIO
+    )
+
+
+# (mtime_ns, size) of the settings file -> thresholds parsed from it
+_live_cache: Dict = {"stamp": None, "thresholds": None}
+
+
+def live_thresholds() -> Thresholds:
+    """
+    Thresholds from the calibration settings file (Settings page), falling
+    back to TDS_ALERT_THRESHOLD / TEMP_ALERT_THRESHOLD
+
+    The file is only re-read when its mtime or size changes.
+    """
+    try:
+        stat = SETTINGS_FILE.stat()
+        stamp = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        stamp = None
+    if stamp is not None and stamp == _live_cache["stamp"]:
+        return _live_cache["thresholds"]
+
+    tds, temp = settings.TDS_ALERT_THRESHOLD, settings.TEMP_ALERT_THRESHOLD
+    if stamp is not None:
+        try:
+            with open(SETTINGS_FILE, 'r') as f:
+                data = json.load(f)
+            tds = float(data.get("tdsThreshold", tds))
+            temp = float(data.get("tempThreshold", temp))
+        except (OSError, ValueError, TypeError, AttributeError):
+            pass
+    thresholds = make_thresholds(tds, temp)
+    _live_cache.update(stamp=stamp, thresholds=thresholds)
+    return thresholds
+
+
+def classify(tds: np.ndarray, temp: np.ndarray, thresholds: Thresholds) -> np.ndarray:
+    """Status codes (int8, index into STATUS_LABELS); NaN values never raise the level"""
+    with np.errstate(invalid="ignore"):
+        critical = (tds > thresholds.tds) | (temp > thresholds.temp)
+        warning = (tds > thresholds.tds_warning) | (temp > thresholds.temp_warning)
+    return np.where(critical, CRITICAL, np.where(warning, WARNING, NORMAL)).astype(np.int8)
+
+
+def status_labels(codes: np.ndarray) -> List[str]:
+    return np.asarray(STATUS_LABELS)[codes].tolist()
+
+
+def reading_status(reading: Optional[Dict], thresholds: Optional[Thresholds] = None) -> str:
+    """Dashboard status for one reading (NORMAL when there is none)"""
+    if not reading:
+        return "NORMAL"
+    thresholds = thresholds or live_thresholds()
+    try:
+        tds = reading.get('tds', 0)
+        temp = reading.get('temp', 0)
+        if tds > thresholds.tds or temp > thresholds.temp:
+            return "CRITICAL"
+        if tds > thresholds.tds_warning or temp > thresholds.temp_warning:
+            return "WARNING"
+    except Exception:
+        return "WARNING"
+    return "NORMAL"
+
+
+def summarize_states(
+    ts: np.ndarray,
+    codes: np.ndarray,
+    window_seconds: Optional[int] = None,
+    until: Optional[int] = None,
+) -> Dict:
+    """
+    Reading counts and time-in-state, in total and per window
+
+    A reading's state lasts until the next reading (the last one until
+    `until`, if given), capped at STATUS_MAX_GAP_SECONDS so outages do not
+    count as time in any state. Time is attributed to the window in which
+    a reading starts.
+    """
+    if len(ts):
+        following = np.append(ts[1:], ts[-1] if until is None else max(until, int(ts[-1])))
+        durations = np.clip(following - ts, 0, settings.STATUS_MAX_GAP_SECONDS)
+    else:
+        durations = np.zeros(0, dtype=np.int64)
+
+    def tally(counts: Sequence[int], seconds: Sequence[float]) -> Dict:
+        return {
+            "counts": dict(zip(STATUS_LABELS, counts)),
+            "seconds": dict(zip(STATUS_LABELS, seconds)),
+        }
+
+    summary = tally(
+        np.bincount(codes, minlength=3).tolist(),
+        np.bincount(codes, weights=durations, minlength=3).astype(np.int64).tolist(),
+    )
+    if window_seconds:
+        starts, slot = np.unique(ts - ts % window_seconds, return_inverse=True)
+        index = slot * 3 + codes
+        counts = np.bincount(index, minlength=len(starts) * 3).reshape(-1, 3)
+        seconds = np.bincount(index, weights=durations, minlength=len(starts) * 3).reshape(-1, 3).astype(np.int64)
+        summary["window_seconds"] = window_seconds
+        summary["windows"] = [
+            {"start": from_epoch(start), **tally(c, s)}
+            for start, c, s in zip(starts.tolist(), counts.tolist(), seconds.tolist())
+        ]
+    return summary
+
+
+def classify_readings(readings: List[Dict], thresholds: Optional[Thresholds] = None) -> Dict:
+    """Labels for reading dicts (oldest first) plus their counts and time-in-state"""
+    thresholds = thresholds or live_thresholds()
+    n = len(readings)
+    tds = np.fromiter((r.get("tds", np.nan) for r in readings), dtype=np.float64, count=n)
+    temp = np.fromiter((r.get("temp", np.nan) for r in readings), dtype=np.float64, count=n)
+    codes = classify(tds, temp, thresholds)
+    ts = decode_timestamps([r["created_at"] for r in readings]) if n else np.zeros(0, dtype=np.int64)
+    return {"labels": status_labels(codes), "summary": summarize_states(ts, codes)}
+
+
+def state_summary_for_range(
+    channel: str,
+    start_ts: int,
+    end_ts: int,
+    window_seconds: Optional[int] = None,
+    thresholds: Optional[Thresholds] = None,
+) -> Dict:
+    """Counts and time-in-state for readings stored in [start_ts, end_ts) (blocking; run in a thread)"""
+    thresholds = thresholds or live_thresholds()
+    ts, ys = get_series_cache().columns(channel, start_ts, end_ts)
+    codes = classify(ys[SERIES_METRICS.index("tds")], ys[SERIES_METRICS.index("temp")], thresholds)
+    return {
+        "channel_id": channel,
+        "start": from_epoch(start_ts),
+        "end": from_epoch(end_ts),
+        "thresholds": thresholds._asdict(),
+        **summarize_states(ts, codes, window_seconds, until=end_ts),
+    }
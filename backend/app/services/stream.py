@@ -0,0 +1,198 @@
+"""
+Live reading stream (Server-Sent Events)
+Fans newly ingested readings and status changes out to subscribers. Each
+event is encoded once and the same bytes are queued for every connection.
+"""
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.ingestion import IncrementalIngestor, get_ingestor
+from app.services.poller import ensure_readings, get_poller
+from app.services.status import reading_status
+
+logger = logging.getLogger(__name__)
+
+
+class StreamFullError(Exception):
+    """Raised when STREAM_MAX_SUBSCRIBERS connections are already open"""
+
+
+def format_sse(event: str, data, event_id: Optional[int] = None) -> bytes:
+    """Encode one SSE message; compact JSON keeps `data` on a single line"""
+    message = f"event: {event}\n"
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    message += f"data: {json.dumps(data, separators=(',', ':'))}\n\n"
+    return message.encode()
+
+
+class Subscriber:
+    """One open stream: a bounded queue of encoded events"""
+
+    def __init__(self, queue_size: int, backlog: List[bytes]):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        # Sent before anything from the queue (snapshot or resume + status)
+        self.backlog = backlog
+        self.closed = False
+
+
+class ReadingBroadcaster:
+    """
+    Publishes ingestion results to SSE subscribers
+
+    Reading events carry the newest entry_id as their SSE id, so a reconnect
+    with Last-Event-ID resumes from the reading buffer. A subscriber whose
+    queue fills up is disconnected rather than slowing everyone else down; it
+    reconnects and resumes without losing readings.
+    """
+
+    def __init__(
+        self,
+        ingestor: IncrementalIngestor,
+        queue_size: Optional[int] = None,
+        max_subscribers: Optional[int] = None,
+    ):
+        self.ingestor = ingestor
+        self.queue_size = queue_size or settings.STREAM_QUEUE_SIZE
+        self.max_subscribers = max_subscribers or settings.STREAM_MAX_SUBSCRIBERS
+        self._subscribers: set = set()
+        self._last_status: Optional[tuple] = None
+        self.events_published = 0
+        self.messages_queued = 0
+        self.subscribers_dropped = 0
+        self.peak_subscribers = 0
+        self.snapshots_sent = 0
+        self.resumes = 0
+        ingestor.add_listener(self.on_poll)
+
+    def _status(self) -> Dict:
+        latest = self.ingestor.buffer.latest()
+        return {
+            "system_status": reading_status(latest),
+            "last_updated": latest.get("created_at") if latest else None,
+            "last_entry_id": self.ingestor.buffer.last_entry_id,
+            **self.ingestor.freshness(),
+        }
+
+    def on_poll(self, result: Dict) -> None:
+        """Ingestor listener: push new readings, then status if it changed"""
+        readings = result.get("readings")
+        if readings:
+            self.publish(format_sse("readings", readings, readings[-1]["entry_id"]))
+        status = self._status()
+        key = (status["system_status"], status["stale"])
+        if key != self._last_status:
+            self._last_status = key
+            self.publish(format_sse("status", status))
+
+    def publish(self, message: bytes) -> None:
+        self.events_published += 1
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(message)
+                self.messages_queued += 1
+            except asyncio.QueueFull:
+                logger.info("Dropping slow stream subscriber (queue full)")
+                self.subscribers_dropped += 1
+                self._close(subscriber)
+
+    def _backlog(self, last_event_id: Optional[int]) -> List[bytes]:
+        """Events a new connection needs before live updates"""
+        buffer = self.ingestor.buffer
+        oldest = buffer.oldest_entry_id()
+        messages = []
+        if (
+            last_event_id is not None
+            and oldest is not None
+            and oldest - 1 <= last_event_id <= buffer.last_entry_id
+        ):
+            # The buffer still covers the gap: replay only what was missed
+            self.resumes += 1
+            missed = buffer.after(last_event_id)
+            if missed:
+                messages.append(format_sse("readings", missed, missed[-1]["entry_id"]))
+        else:
+            self.snapshots_sent += 1
+            history = buffer.snapshot(settings.DASHBOARD_HISTORY_SIZE)
+            messages.append(format_sse("snapshot", history, buffer.last_entry_id))
+        messages.append(format_sse("status", self._status()))
+        return messages
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Subscriber:
+        """
+        Open a subscription
+
+        The backlog is built in the same step as registration (no await in
+        between), so no reading is missed or sent twice.
+        """
+        if len(self._subscribers) >= self.max_subscribers:
+            raise StreamFullError(f"Stream is at capacity ({self.max_subscribers} subscribers)")
+        subscriber = Subscriber(self.queue_size, self._backlog(last_event_id))
+        self._subscribers.add(subscriber)
+        self.peak_subscribers = max(self.peak_subscribers, len(self._subscribers))
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+    def _close(self, subscriber: Subscriber) -> None:
+        """Wake the subscriber's generator with an end-of-stream marker"""
+        self._subscribers.discard(subscriber)
+        subscriber.closed = True
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+    def close_all(self) -> None:
+        for subscriber in list(self._subscribers):
+            self._close(subscriber)
+
+    async def events(self, subscriber: Subscriber, heartbeat_seconds: Optional[float] = None) -> AsyncIterator[bytes]:
+        """Byte stream for one subscriber; ends when closed or the client leaves"""
+        heartbeat = heartbeat_seconds or settings.STREAM_HEARTBEAT_SECONDS
+        try:
+            yield f"retry: {settings.STREAM_RETRY_MS}\n\n".encode()
+            for message in subscriber.backlog:
+                yield message
+            subscriber.backlog = []
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    if not get_poller().running:
+                        # No background poller (serverless): poll on the heartbeat
+                        await ensure_readings()
+                    yield b": ping\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self) -> Dict:
+        return {
+            'subscribers': len(self._subscribers),
+            'peak_subscribers': self.peak_subscribers,
+            'max_subscribers': self.max_subscribers,
+            'events_published': self.events_published,
+            'messages_queued': self.messages_queued,
+            'subscribers_dropped': self.subscribers_dropped,
+            'snapshots_sent': self.snapshots_sent,
+            'resumes': self.resumes,
+        }
+
+
+# Singleton instance
+_broadcaster: Optional[ReadingBroadcaster] = None
+
+
+def get_broadcaster() -> ReadingBroadcaster:
+    """Get or create the shared broadcaster (registers with the ingestor)"""
+    global _broadcaster
+    if _broadcaster is None:
+        _broadcaster = ReadingBroadcaster(get_ingestor())
+    return _broadcaster
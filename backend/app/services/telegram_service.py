@@ -11,6 +11,23 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+ALERT_EMOJI = {
+    'high_tds': '🚨',
+    'high_temp': '🌡️',
+    'low_voltage': '⚡',
+    'anomaly': '📈',
+    'critical': '🔴'
+}
+
+
+def _format_value(value: Optional[float]) -> str:
+    return f"{value:.2f}" if value is not None else "n/a"
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    return f"{minutes}m {seconds:02d}s" if minutes else f"{seconds}s"
+
 class TelegramService:
     """Secure Telegram bot service wrapper"""
     
@@ -171,14 +188,7 @@ Click the link above to join the group now!"""
             voltage: Current voltage
             threshold: Threshold that was exceeded
         """
-        severity_emoji = {
-            'high_tds': '🚨',
-            'high_temp': '🌡️',
-            'low_voltage': '⚡',
-            'critical': '🔴'
-        }
-        
-        emoji = severity_emoji.get(alert_type, '⚠️')
+        emoji = ALERT_EMOJI.get(alert_type, '⚠️')
         
         message = f"""
 {emoji} <b>EVARA TDS ALERT</b> {emoji}
@@ -194,6 +204,45 @@ Click the link above to join the group now!"""
 <b>Timestamp:</b> {self._get_timestamp()}
 
 <i>This is an automated alert from Evara TDS Monitoring System</i>
+"""
+        return message.strip()
+    
+    def format_digest_message(self, entries: List[dict]) -> str:
+        """
+        Format several alerts as one message
+
+        Args:
+            entries: one per alert type, with alert_type, count, worst,
+                threshold, first_at and last_at (datetimes), and the
+                latest tds/temp/voltage readings
+        """
+        first = min(entry['first_at'] for entry in entries)
+        last = max(entry['last_at'] for entry in entries)
+        total = sum(entry['count'] for entry in entries)
+        lines = []
+        for entry in sorted(entries, key=lambda e: -e['count']):
+            emoji = ALERT_EMOJI.get(entry['alert_type'], '⚠️')
+            worst = _format_value(entry['worst'])
+            lines.append(
+                f"{emoji} <b>{entry['alert_type'].replace('_', ' ').title()}</b> × {entry['count']} "
+                f"— worst {worst} (threshold {entry['threshold']}), "
+                f"{_format_duration((entry['last_at'] - entry['first_at']).total_seconds())}"
+            )
+        latest = max(entries, key=lambda e: e['last_at'])
+        
+        message = f"""
+📋 <b>EVARA TDS ALERT DIGEST</b>
+
+<b>{total} alert{'s' if total != 1 else ''}</b> over {_format_duration((last - first).total_seconds())} ({first.strftime('%H:%M:%S')} – {last.strftime('%H:%M:%S')} UTC)
+
+{chr(10).join(lines)}
+
+<b>Latest Readings:</b>
+• TDS: <code>{_format_value(latest['tds'])} ppm</code>
+• Temperature: <code>{_format_value(latest['temp'])}°C</code>
+• Voltage: <code>{_format_value(latest['voltage'])}V</code>
+
+<i>This is an automated alert digest from Evara TDS Monitoring System</i>
 """
         return message.strip()
     
@@ -1,41 +1,315 @@
+"""
+ThingSpeak client - shared keep-alive connection pool for upstream fetches
+One client lives for the lifetime of the app instead of one per request
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
 import httpx
 from app.core.config import settings
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.latency import LatencyRecorder
+
+logger = logging.getLogger(__name__)
+
+THINGSPEAK_URL = f"{settings.THINGSPEAK_BASE_URL}/channels/{settings.THINGSPEAK_CHANNEL_ID}/feeds.json"
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional 'h2' package (httpx[http2])"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class ThingSpeakClient:
+    """Long-lived ThingSpeak HTTP client backed by a keep-alive connection pool"""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        http2: Optional[bool] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        timeout: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        hedge: Optional[bool] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.base_url = base_url or settings.THINGSPEAK_BASE_URL
+        self.http2 = settings.THINGSPEAK_HTTP2 if http2 is None else http2
+        self.max_connections = settings.THINGSPEAK_MAX_CONNECTIONS if max_connections is None else max_connections
+        self.max_keepalive_connections = (
+            settings.THINGSPEAK_MAX_KEEPALIVE if max_keepalive_connections is None else max_keepalive_connections
+        )
+        self.keepalive_expiry = settings.THINGSPEAK_KEEPALIVE_EXPIRY if keepalive_expiry is None else keepalive_expiry
+        self.timeout = settings.THINGSPEAK_TIMEOUT_SECONDS if timeout is None else timeout
+        self.connect_timeout = (
+            settings.THINGSPEAK_CONNECT_TIMEOUT_SECONDS if connect_timeout is None else connect_timeout
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.breaker = breaker or CircuitBreaker(
+            "thingspeak",
+            failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+            recovery_seconds=settings.CIRCUIT_RECOVERY_SECONDS,
+            half_open_max_calls=settings.CIRCUIT_HALF_OPEN_MAX_CALLS,
+        )
+        self._transport = transport
+
+        # Hedging: fire a duplicate request if the first one is slower than
+        # the recent THINGSPEAK_HEDGE_PERCENTILE of attempt latencies
+        self.hedge = settings.THINGSPEAK_HEDGE_ENABLED if hedge is None else hedge
+        self.hedge_percentile = settings.THINGSPEAK_HEDGE_PERCENTILE
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.attempt_latency = LatencyRecorder()
+        # End-to-end request latency, split by mode so the two can be compared
+        self.latency = {"hedged": LatencyRecorder(), "unhedged": LatencyRecorder()}
+
+        if self.http2 and not _http2_available():
+            logger.warning("THINGSPEAK_HTTP2 enabled but 'h2' is not installed - falling back to HTTP/1.1")
+            self.http2 = False
+
+    def _build_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            transport=self._transport,
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Underlying httpx client, created on first use
+
+        Pooled connections are bound to the event loop that opened them, so the
+        pool is rebuilt if we are called from a different loop (e.g. successive
+        asyncio.run() calls in scripts).
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._client = self._build_client()
+            self._loop = loop
+        return self._client
+
+    async def get_feeds(
+        self,
+        channel_id: Optional[str] = None,
+        api_key: Optional[str] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        **params,
+    ) -> httpx.Response:
+        """
+        GET /channels/{id}/feeds.json over the shared pool
+
+        Guarded by the circuit breaker (the client's own unless `breaker` is
+        given): raises CircuitOpenError without touching the network while it
+        is open. Connection errors, 5xx and 429 count as failures.
+        """
+        channel_id = channel_id or settings.THINGSPEAK_CHANNEL_ID
+        api_key = settings.THINGSPEAK_READ_KEY if api_key is None else api_key
+        if api_key:
+            params["api_key"] = api_key
+        path = f"/channels/{channel_id}/feeds.json"
+
+        started = time.monotonic()
+        hedged = self.hedge
+        self.requests += 1
+        try:
+            if hedged:
+                return await self._hedged_get(path, params, breaker or self.breaker)
+            return await self._get_once(path, params, breaker or self.breaker)
+        finally:
+            self.latency["hedged" if hedged else "unhedged"].record((time.monotonic() - started) * 1000)
+
+    async def _get_once(self, path: str, params: Dict, breaker: CircuitBreaker) -> httpx.Response:
+        """One attempt through the circuit breaker"""
+        breaker.before_call()
+        started = time.monotonic()
+        try:
+            response = await self.client.get(path, params=params)
+        except httpx.RequestError:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        self.attempt_latency.record((time.monotonic() - started) * 1000)
+        if response.status_code >= 500 or response.status_code == 429:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait on the first attempt before sending the hedge"""
+        floor = settings.THINGSPEAK_HEDGE_MIN_DELAY_MS
+        if len(self.attempt_latency) < settings.THINGSPEAK_HEDGE_MIN_SAMPLES:
+            return max(floor, settings.THINGSPEAK_HEDGE_DELAY_MS) / 1000
+        return max(floor, self.attempt_latency.percentile(self.hedge_percentile)) / 1000
+
+    async def _hedged_get(self, path: str, params: Dict, breaker: CircuitBreaker) -> httpx.Response:
+        """
+        First attempt, plus an identical second one if the first misses the
+        hedge deadline; returns whichever answers first and cancels the other
+        """
+        primary = asyncio.ensure_future(self._get_once(path, params, breaker))
+        attempts = {primary}
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=self.hedge_delay())
+            if done:
+                return primary.result()
+
+            self.hedges += 1
+            hedge = asyncio.ensure_future(self._get_once(path, params, breaker))
+            attempts.add(hedge)
+            pending = set(attempts)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            # Both attempts failed
+            raise error
+        finally:
+            for task in attempts:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict:
+        return {
+            'hedging_enabled': self.hedge,
+            'hedge_percentile': self.hedge_percentile,
+            'hedge_delay_ms': round(self.hedge_delay() * 1000, 2),
+            'requests': self.requests,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'hedge_rate': round(self.hedges / self.requests, 4) if self.requests else 0.0,
+            'attempt_latency': self.attempt_latency.summary(),
+            'latency_hedged': self.latency["hedged"].summary(),
+            'latency_unhedged': self.latency["unhedged"].summary(),
+        }
+
+    async def aclose(self) -> None:
+        """Close pooled connections"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+
+# Singleton instance
+_thingspeak_client: Optional[ThingSpeakClient] = None
+
+
+def get_thingspeak_client() -> ThingSpeakClient:
+    """
+    Get or create the shared ThingSpeak client
+
+    Normally created by the FastAPI lifespan hook; created lazily here when the
+    app runs without lifespan events (Mangum on Vercel uses lifespan="off").
+    """
+    global _thingspeak_client
+    if _thingspeak_client is None:
+        _thingspeak_client = ThingSpeakClient()
+    return _thingspeak_client
+
+
+async def close_thingspeak_client() -> None:
+    """Release the shared client's connection pool"""
+    global _thingspeak_client
+    if _thingspeak_client is not None:
+        await _thingspeak_client.aclose()
+        _thingspeak_client = None
+
+
+def _field(feed: Dict, key: str, missing: Optional[float]) -> Optional[float]:
+    value = feed.get(key)
+    return missing if value is None or value == "" else float(value)
+
+
+def parse_feeds(feeds: List[Dict], missing: Optional[float] = 0.0) -> List[Dict]:
+    """
+    Normalize raw ThingSpeak feed rows, skipping corrupt ones
+
+    Empty fields become `missing`: 0.0 for the dashboard, None where a gap
+    must not look like a reading of zero.
+    """
+    cleaned = []
+    for feed in feeds:
+        try:
+            cleaned.append({
+                "created_at": feed.get("created_at"),
+                "entry_id": feed.get("entry_id"),
+                "voltage": _field(feed, "field1", missing),
+                "tds": _field(feed, "field2", missing),
+                "temp": _field(feed, "field3", missing)
+            })
+        except (ValueError, TypeError):
+            continue
+    return cleaned
 
-THINGSPEAK_URL = f"https://api.thingspeak.com/channels/{settings.THINGSPEAK_CHANNEL_ID}/feeds.json"
 
 async def fetch_evara_data(results: int = 60):
     """
     Fetches raw data from ThingSpeak and normalizes it.
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(f"{THINGSPEAK_URL}?results={results}&api_key={settings.THINGSPEAK_READ_KEY}")
-
-            if response.status_code != 200:
-                return {"error": f"ThingSpeak API Error: {response.status_code}"}
-
-            data = response.json()
-            feeds = data.get('feeds', [])
-
-            cleaned_history = []
-
-            for feed in feeds:
-                try:
-                    cleaned_history.append({
-                        "created_at": feed.get("created_at"),
-                        "entry_id": feed.get("entry_id"),
-                        "voltage": float(feed.get("field1") or 0),
-                        "tds": float(feed.get("field2") or 0),
-                        "temp": float(feed.get("field3") or 0)
-                    })
-                except (ValueError, TypeError):
-                    continue
-
-            return {
-                "latest": cleaned_history[-1] if cleaned_history else None,
-                "history": cleaned_history
-            }
-
-        except httpx.RequestError as e:
-            print(f"Network Error: {e}")
-            return {"error": "Connection to ThingSpeak failed"}
+    try:
+        response = await get_thingspeak_client().get_feeds(results=results)
+
+        if response.status_code != 200:
+            return {"error": f"ThingSpeak API Error: {response.status_code}"}
+
+        data = response.json()
+        cleaned_history = parse_feeds(data.get('feeds', []))
+
+        return {
+            "latest": cleaned_history[-1] if cleaned_history else None,
+            "history": cleaned_history
+        }
+
+    except httpx.RequestError as e:
+        print(f"Network Error: {e}")
+        return {"error": "Connection to ThingSpeak failed"}
+    except CircuitOpenError as e:
+        return {"error": str(e)}
+
+
+class ThingSpeakService:
+    """Latest-reading helper used by the alert routes and periodic alert script"""
+
+    async def get_latest_data(self) -> Optional[Dict]:
+        """Return the newest reading, or None if ThingSpeak has no data"""
+        # Imported here: ingestion builds on this module
+        from app.services.ingestion import get_reading_buffer
+        from app.services.poller import ensure_readings
+
+        await ensure_readings()
+        latest = get_reading_buffer().latest()
+        if not latest:
+            return None
+        return {
+            "created_at": latest["created_at"],
+            "entry_id": latest["entry_id"],
+            "tds": latest["tds"],
+            "temperature": latest["temp"],
+            "voltage": latest["voltage"],
+        }
@@ -1,21 +1,47 @@
-﻿from fastapi import FastAPI
+﻿from contextlib import asynccontextmanager
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from app.core.config import Settings
+from app.core.compression import CompressionMiddleware
 from app.api.v1.endpoints import router as api_router
 from app.api.v1.alerts_minimal import router as alerts_router
 from app.api.v1.settings import router as settings_router
 from app.api.v1.recipients import router as recipients_router
+from app.services.thingspeak import get_thingspeak_client, close_thingspeak_client
+from app.services.poller import get_poller
+from app.services.stream import get_broadcaster
+from app.services.anomaly import get_anomaly_detector
+from app.services.alert_monitor import get_alert_monitor
+from app.services.alert_digest import get_alert_digest
 
 settings = Settings()
 
 # Rate limiting
 limiter = Limiter(key_func=get_remote_address, default_limits=["200/minute"])
 
-app = FastAPI(title=settings.PROJECT_NAME)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared upstream clients on startup, release them on shutdown"""
+    get_thingspeak_client()
+    # Registers with the ingestor before the first poll (unless disabled)
+    get_anomaly_detector()
+    if settings.ALERT_MONITOR_ENABLED:
+        get_alert_monitor()
+    if settings.POLLER_ENABLED:
+        get_poller().start()
+    yield
+    # End open SSE streams so shutdown doesn't wait on them
+    get_broadcaster().close_all()
+    await get_poller().stop()
+    # Don't drop alerts still waiting for their digest window
+    await get_alert_digest().flush()
+    await close_thingspeak_client()
+
+app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
@@ -40,6 +66,10 @@ app.add_middleware(
     expose_headers=["X-RateLimit-Limit", "X-RateLimit-Remaining"],
 )
 
+# Response compression (gzip / Brotli, per-route policy)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
 # Include routers
 app.include_router(api_router, prefix=settings.API_V1_STR)
 app.include_router(alerts_router, prefix="/api/v1/alerts")
@@ -11,12 +11,23 @@ from dotenv import load_dotenv
 # Load environment
 load_dotenv()
 
+from app.models.database import SessionLocal, init_db
+from app.services.alert_engine import AlertEngine
 from app.services.telegram_service import get_telegram_service
 from app.services.thingspeak import ThingSpeakService
 
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_ALERT_CHAT_ID", "1362954575")
-TDS_THRESHOLD = float(os.getenv("TDS_ALERT_THRESHOLD", "150"))
-TEMP_THRESHOLD = float(os.getenv("TEMP_ALERT_THRESHOLD", "35"))
+
+init_db()
+
+def check_rules(tds, temp, voltage):
+    """Alert config and the alert types breached, from the same rules as the alert engine"""
+    db = SessionLocal()
+    try:
+        engine = AlertEngine(db)
+        return engine.config, {hit['type'] for hit in engine.breaches(tds, temp, voltage)}
+    finally:
+        db.close()
 
 async def send_periodic_alert():
     """Send water quality status to Telegram group"""
@@ -42,8 +53,9 @@ async def send_periodic_alert():
         timestamp = data.get('created_at', 'Unknown')
         
         # Determine status
-        tds_safe = tds_value < TDS_THRESHOLD
-        temp_safe = temp_value < TEMP_THRESHOLD
+        config, breached = check_rules(tds_value, temp_value, voltage)
+        tds_safe = 'high_tds' not in breached
+        temp_safe = 'high_temp' not in breached
         overall_safe = tds_safe and temp_safe
         
         # Build message
@@ -61,11 +73,11 @@ async def send_periodic_alert():
 {status_icon} <b>Current Readings:</b>
 ━━━━━━━━━━━━━━━━━━━━
 💧 <b>TDS Level: {tds_value:.1f} ppm</b> {'✅' if tds_safe else '⚠️ HIGH'}
-   Threshold: {TDS_THRESHOLD} ppm
+   Threshold: {config.tds_threshold} ppm
    Status: {'Safe' if tds_safe else 'Exceeds safe limit'}
 
 🌡️ <b>Temperature: {temp_value:.1f}°C</b> {'✅' if temp_safe else '⚠️ HIGH'}
-   Threshold: {TEMP_THRESHOLD}°C
+   Threshold: {config.temp_threshold}°C
    Status: {'Normal' if temp_safe else 'Above normal'}
 
 ⚡ Voltage: {voltage:.2f}V
@@ -98,9 +110,10 @@ async def run_periodic_alerts():
     print("=" * 60)
     print("🚀 Evara TDS Periodic Alert System")
     print("=" * 60)
+    config, _ = check_rules(None, None, None)
     print(f"📍 Telegram Chat ID: {TELEGRAM_CHAT_ID}")
-    print(f"📊 TDS Threshold: {TDS_THRESHOLD} ppm")
-    print(f"🌡️  Temp Threshold: {TEMP_THRESHOLD}°C")
+    print(f"📊 TDS Threshold: {config.tds_threshold} ppm")
+    print(f"🌡️  Temp Threshold: {config.temp_threshold}°C")
     print(f"⏱️  Interval: Every 15 minutes (900 seconds)")
     print(f"🔗 Group Link: {os.getenv('TELEGRAM_GROUP_INVITE_LINK', 'Not set')}")
     print("=" * 60)
@@ -116,8 +129,8 @@ async def run_periodic_alerts():
 Periodic monitoring is now active.
 Reports will be sent every 15 minutes.
 
-TDS Threshold: {TDS_THRESHOLD} ppm
-Temp Threshold: {TEMP_THRESHOLD}°C
+TDS Threshold: {config.tds_threshold} ppm
+Temp Threshold: {config.temp_threshold}°C
 
 <i>Started at {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC</i>"""
         )
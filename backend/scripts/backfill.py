@@ -0,0 +1,50 @@
+"""
+Backfill ThingSpeak history into the local reading store
+
+Re-running the same range resumes from checkpoints: completed windows are skipped.
+
+Usage (from backend/):
+    python scripts/backfill.py --start 2024-01-01 --end 2024-04-01
+    python scripts/backfill.py --start 2024-01-01 --channel 2713286 --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.services.backfill import BackfillJob
+from app.services.thingspeak import close_thingspeak_client
+
+
+async def main(args):
+    job = BackfillJob(
+        start=datetime.fromisoformat(args.start),
+        end=datetime.fromisoformat(args.end) if args.end else None,
+        channel_id=args.channel,
+        concurrency=args.concurrency,
+        window_seconds=args.window_seconds,
+    )
+    try:
+        status = await job.run()
+    finally:
+        await close_thingspeak_client()
+    print(json.dumps(status, indent=2))
+    return 0 if status["state"] == "completed" else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", required=True, help="ISO date/time (UTC if no offset)")
+    parser.add_argument("--end", help="ISO date/time, defaults to now")
+    parser.add_argument("--channel", help="ThingSpeak channel ID, defaults to THINGSPEAK_CHANNEL_ID")
+    parser.add_argument("--concurrency", type=int)
+    parser.add_argument("--window-seconds", type=int)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,114 @@
+"""
+Benchmark: alert digest during an alert storm
+
+Replays an incident in virtual time: several devices breaching several
+non-critical rules every reading (15 s), plus an occasional critical TDS
+breach, with AlertEngine's per-type cooldown in front. Counts Telegram API
+calls and messages per recipient sent directly (one send_bulk_alert per
+alert) versus through AlertDigest (critical alerts still direct, the rest
+merged into one message per recipient per window).
+
+Usage (from backend/):
+    python scripts/bench_alert_digest.py --devices 5 --recipients 4 --minutes 30 --cooldown 0
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.alert_digest import AlertDigest
+from app.services.telegram_service import TelegramService
+
+TYPES = [("high_temp", "warning", 35.0), ("low_voltage", "warning", 3.0), ("anomaly", "warning", 110.0)]
+
+
+class CountingTelegram(TelegramService):
+    """Formats like the real service; counts sends instead of calling Telegram"""
+
+    def __init__(self):
+        self.bot = None
+        self.calls = 0
+        self.longest = 0
+
+    async def send_alert(self, chat_id, message, parse_mode="HTML"):
+        self.calls += 1
+        self.longest = max(self.longest, len(message))
+        return True
+
+
+def storm(args):
+    """(second, alert_type, severity, threshold, tds, temp, voltage), oldest first"""
+    rng = random.Random(args.seed)
+    events = []
+    for second in range(0, args.minutes * 60, 15):
+        for _ in range(args.devices):
+            tds, temp, voltage = rng.uniform(120, 200), rng.uniform(34, 39), rng.uniform(2.6, 3.2)
+            for alert_type, severity, threshold in TYPES:
+                if rng.random() < args.breach_rate:
+                    events.append((second, alert_type, severity, threshold, tds, temp, voltage))
+            if tds > 195:
+                events.append((second, "high_tds", "critical", 150.0, tds, temp, voltage))
+    return events
+
+
+async def replay(args, events, use_digest: bool):
+    telegram = CountingTelegram()
+    digest = AlertDigest(window_seconds=3600, telegram=telegram)
+    chat_ids = [str(1000 + r) for r in range(args.recipients)]
+    last_sent = {}
+    window_end = None
+    alerts = suppressed = 0
+    for second, alert_type, severity, threshold, tds, temp, voltage in events:
+        if use_digest and window_end is not None and second >= window_end:
+            await digest.flush()
+            window_end = None
+        value = {"high_temp": temp, "low_voltage": voltage, "high_tds": tds}.get(alert_type, tds)
+        if alert_type in last_sent and second - last_sent[alert_type] < args.cooldown * 60:
+            suppressed += 1
+            if use_digest and severity != "critical":
+                digest.note_repeat(alert_type, threshold, tds, temp, voltage, value)
+            continue
+        last_sent[alert_type] = second
+        alerts += 1
+        if use_digest and severity != "critical":
+            if window_end is None:
+                window_end = second + args.window
+            digest.add(chat_ids, alert_type, threshold, tds, temp, voltage, value)
+        else:
+            message = telegram.format_alert_message(alert_type, tds, temp, voltage, threshold)
+            for chat_id in chat_ids:
+                await telegram.send_alert(chat_id, message)
+    if use_digest:
+        await digest.flush()
+    return alerts, suppressed, telegram
+
+
+async def main(args):
+    events = storm(args)
+    print(
+        f"{len(events)} breaches over {args.minutes} min from {args.devices} devices, "
+        f"{args.recipients} recipients, cooldown {args.cooldown} min, digest window {args.window:.0f}s"
+    )
+    direct_alerts, suppressed, direct = await replay(args, events, use_digest=False)
+    _, _, digested = await replay(args, events, use_digest=True)
+    print(f"alerts past cooldown: {direct_alerts} (suppressed {suppressed})")
+    print(f"direct   {direct.calls:6d} Telegram calls  ({direct.calls // args.recipients} messages per recipient)")
+    print(f"digest   {digested.calls:6d} Telegram calls  ({digested.calls // args.recipients} messages per recipient, "
+          f"longest {digested.longest} chars)")
+    if digested.calls:
+        print(f"reduction: {direct.calls / digested.calls:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=5)
+    parser.add_argument("--recipients", type=int, default=4)
+    parser.add_argument("--minutes", type=int, default=30)
+    parser.add_argument("--cooldown", type=float, default=0.0, help="Per-type cooldown in minutes")
+    parser.add_argument("--window", type=float, default=120.0, help="Digest window in seconds")
+    parser.add_argument("--breach-rate", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,122 @@
+"""
+Benchmark: declarative alert rules over a multi-device batch
+
+Compiles a few hundred rules (thresholds, rates of change, combined
+conditions; some global, some per device) and evaluates them over one
+ingest batch spanning many devices, in a single pass versus one pass per
+device, and incrementally: just the newest readings per device, carrying
+state from the rest. Compilation is timed separately since it happens once per rule
+change, not per batch.
+
+Usage (from backend/):
+    python scripts/bench_alert_rules.py --devices 100 --readings 240 --rules 300
+"""
+import argparse
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.readings import from_epoch
+from app.services.alert_rules import ReadingBatch, RuleSet, compile_rule
+
+CONFIG = SimpleNamespace(tds_threshold=150.0, temp_threshold=35.0, warning_threshold=135.0)
+
+
+def make_batch(devices: int, readings: int, seed: int):
+    rng = np.random.default_rng(seed)
+    batch = {}
+    for device in range(devices):
+        tds = 120 + np.cumsum(rng.normal(0, 2, readings))
+        temp = 28 + rng.normal(0, 1.5, readings)
+        voltage = 3.6 + rng.normal(0, 0.2, readings)
+        batch[str(1000 + device)] = [
+            {"created_at": from_epoch(1_700_000_000 + 15 * i), "tds": float(tds[i]),
+             "temp": float(temp[i]), "voltage": float(voltage[i])}
+            for i in range(readings)
+        ]
+    return batch
+
+
+def make_rules(count: int, devices: int, seed: int):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(count):
+        kind = i % 4
+        level = float(rng.integers(130, 180))
+        if kind == 0:
+            condition = {"metric": "tds", "op": ">", "value": level}
+        elif kind == 1:
+            condition = {"metric": "tds", "rate": 60, "op": ">", "value": float(rng.integers(5, 20))}
+        elif kind == 2:
+            condition = {"all": [
+                {"metric": "tds", "op": ">", "value": "warning_threshold"},
+                {"metric": "temp", "op": ">", "value": float(rng.integers(29, 33))},
+            ]}
+        else:
+            condition = {"any": [
+                {"metric": "voltage", "op": "<", "value": 3.0},
+                {"not": {"metric": "temp", "op": "<", "value": "temp_threshold"}},
+            ]}
+        rows.append(SimpleNamespace(
+            id=i, name=f"rule-{i}", alert_type=f"type-{kind}", severity="warning", condition=condition,
+            min_duration_seconds=float(rng.choice([0, 60, 300])),
+            channel_id=str(1000 + int(rng.integers(devices))) if i % 3 == 0 else None,
+        ))
+    return rows
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def main(args):
+    readings_by_channel = make_batch(args.devices, args.readings, args.seed)
+    rows = make_rules(args.rules, args.devices, args.seed)
+    total = args.devices * args.readings
+    print(f"{args.rules} rules, {args.devices} devices x {args.readings} readings ({total} rows)")
+
+    compile_ms, rule_set = best_of(args.repeat, lambda: RuleSet([compile_rule(row, CONFIG) for row in rows]))
+    print(f"compile             {compile_ms:8.2f}ms")
+    batch_ms, batch = best_of(args.repeat, lambda: ReadingBatch(readings_by_channel))
+    print(f"build batch         {batch_ms:8.2f}ms")
+    one_ms, evaluation = best_of(args.repeat, lambda: rule_set.evaluate(ReadingBatch(readings_by_channel)))
+    print(f"one pass            {one_ms:8.2f}ms  (incl. batch build)")
+
+    def per_device():
+        return [rule_set.evaluate(ReadingBatch({channel: readings})) for channel, readings in readings_by_channel.items()]
+    each_ms, evaluations = best_of(max(1, args.repeat // 4), per_device)
+    print(f"pass per device     {each_ms:8.2f}ms")
+
+    # A poll's worth of new readings per device, continuing from the state
+    # the earlier readings left behind
+    head = {channel: readings[:-args.ingest] for channel, readings in readings_by_channel.items()}
+    tail = {channel: readings[-args.ingest:] for channel, readings in readings_by_channel.items()}
+    carried = rule_set.evaluate(ReadingBatch(head)).final_state
+    ingest_ms, incremental = best_of(args.repeat, lambda: rule_set.evaluate(ReadingBatch(tail), carried))
+    print(f"ingest batch        {ingest_ms:8.2f}ms  ({args.ingest} new readings per device, carried state)")
+
+    firing = {(hit["rule"].name, hit["channel_id"]) for hit in evaluation.active()}
+    separate = {(hit["rule"].name, hit["channel_id"]) for e in evaluations for hit in e.active()}
+    continued = {(hit["rule"].name, hit["channel_id"]) for hit in incremental.active()}
+    print(f"firing pairs: {len(firing)}  agree: {firing == separate == continued}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--readings", type=int, default=240, help="Readings per device in the batch")
+    parser.add_argument("--rules", type=int, default=300)
+    parser.add_argument("--ingest", type=int, default=4, help="New readings per device in the incremental batch")
+    parser.add_argument("--repeat", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=11)
+    main(parser.parse_args())
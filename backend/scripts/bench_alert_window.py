@@ -0,0 +1,94 @@
+"""
+Benchmark: windowed alert evaluation
+
+Builds a replay window of noisy readings (spikes plus a flapping stretch
+around the TDS threshold and a sustained temperature breach), then times
+evaluate_window() for every rule at once against a per-reading Python loop
+running the same hysteresis/debounce state machine, checks they agree, and
+counts alerts fired by a plain single-reading threshold check for contrast.
+
+Usage (from backend/):
+    python scripts/bench_alert_window.py --readings 10000 --min-duration 60
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.alert_window import ThresholdRule, evaluate_window
+
+
+def make_window(n: int, interval: int, seed: int):
+    rng = np.random.default_rng(seed)
+    ts = 1_700_000_000 + np.arange(n, dtype=np.int64) * interval
+    tds = 120 + rng.normal(0, 4, n)
+    spikes = rng.random(n) < 0.01
+    tds[spikes] += 60
+    # A stretch flapping across the threshold, then a sustained breach
+    tds[n // 4:n // 4 + 200] = 150 + rng.normal(0, 6, 200)
+    tds[n // 2:n // 2 + 100] = 170 + rng.normal(0, 3, 100)
+    temp = 28 + rng.normal(0, 0.5, n)
+    temp[3 * n // 4:3 * n // 4 + 60] = 37
+    voltage = 3.7 + rng.normal(0, 0.05, n)
+    voltage[rng.random(n) < 0.002] = np.nan
+    return ts, {"tds": tds, "temp": temp, "voltage": voltage}
+
+
+def reference(ts, metrics, rule: ThresholdRule):
+    """One reading at a time, as a stateful loop would do it"""
+    in_breach, since, firing = False, None, []
+    for t, value in zip(ts.tolist(), metrics[rule.metric].tolist()):
+        if rule.direction == "above":
+            enters, exits = value > rule.enter, value <= rule.exit
+        else:
+            enters, exits = value < rule.enter, value >= rule.exit
+        if enters and not in_breach:
+            in_breach, since = True, t
+        elif exits and in_breach:
+            in_breach, since = False, None
+        firing.append(in_breach and t - since >= rule.min_duration_seconds)
+    return np.array(firing, dtype=bool)
+
+
+def main(args):
+    ts, metrics = make_window(args.readings, args.interval, args.seed)
+    rules = [
+        ThresholdRule("high_tds", "TDS", "tds", "above", 150.0, 135.0, "critical", args.min_duration),
+        ThresholdRule("high_temp", "Temperature", "temp", "above", 35.0, 34.0, "warning", args.min_duration),
+        ThresholdRule("low_voltage", "Voltage", "voltage", "below", 3.0, 3.1, "warning", args.min_duration),
+    ]
+    print(f"{args.readings} readings at {args.interval}s, {len(rules)} rules, min duration {args.min_duration}s")
+
+    evaluate_window(ts, metrics, rules)
+    best = float("inf")
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        evaluation = evaluate_window(ts, metrics, rules)
+        best = min(best, time.perf_counter() - started)
+    print(f"vectorized  {best * 1000:8.2f}ms")
+
+    started = time.perf_counter()
+    expected = np.vstack([reference(ts, metrics, rule) for rule in rules])
+    print(f"python loop {(time.perf_counter() - started) * 1000:8.2f}ms")
+    print(f"agree: {bool((expected == evaluation.firing).all())}")
+
+    for rule, summary in zip(rules, evaluation.summary()):
+        naive = metrics[rule.metric] > rule.enter if rule.direction == "above" else metrics[rule.metric] < rule.enter
+        print(
+            f"  {rule.alert_type:<12} single-reading breaches {int(naive.sum()):5d}   "
+            f"debounced alerts {len(summary['fired_at']):3d}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readings", type=int, default=10000)
+    parser.add_argument("--interval", type=int, default=15, help="Seconds between readings")
+    parser.add_argument("--min-duration", type=float, default=60.0)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
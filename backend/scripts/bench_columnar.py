@@ -0,0 +1,79 @@
+"""
+Benchmark: dashboard payload as validated row objects vs. the columnar format
+
+"rows" mirrors what FastAPI does for response_model=DashboardData (validate,
+dump, json.dumps); "columnar" is encode_columns() + orjson.
+
+Usage (from backend/):
+    python scripts/bench_columnar.py
+    python scripts/bench_columnar.py --sizes 60 1000 5760
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from app.schemas.sensor import DashboardData
+from app.services.columnar import dumps, encode_columns
+from app.services.feed_decoder import FeedColumns
+
+
+def synthetic_readings(rows: int):
+    rng = np.random.default_rng(42)
+    columns = FeedColumns(
+        entry_id=np.arange(1, rows + 1, dtype=np.int64),
+        ts=1_704_067_200 + np.arange(rows, dtype=np.int64) * 15,
+        voltage=np.ma.masked_invalid(np.round(3.2 + rng.random(rows) * 0.2, 3)),
+        tds=np.ma.masked_invalid(np.round(100 + rng.random(rows) * 80, 1)),
+        temp=np.ma.masked_invalid(np.round(24 + rng.random(rows) * 6, 1)),
+    )
+    return columns.to_readings()
+
+
+def payload(history):
+    return {
+        "latest": history[-1],
+        "history": history,
+        "cursor": history[-1]["entry_id"],
+        "system_status": "NORMAL",
+        "last_updated": history[-1]["created_at"],
+        "stale": False,
+        "snapshot_age_seconds": 0.0,
+    }
+
+
+def encode_rows(history) -> bytes:
+    model = DashboardData.model_validate(payload(history))
+    return json.dumps(model.model_dump(mode="json"), separators=(",", ":")).encode()
+
+
+def encode_columnar(history) -> bytes:
+    data = payload(history)
+    data["format"] = "columnar"
+    data["history"] = encode_columns(history)
+    return dumps(data)
+
+
+def main(args):
+    print(f"{'rows':>6}  {'rows bytes':>11}  {'col bytes':>10}  {'shrink':>7}  {'rows time':>10}  {'col time':>10}  {'speedup':>8}")
+    for rows in args.sizes:
+        history = synthetic_readings(rows)
+        number = max(1, 50_000 // rows)
+        row_bytes = len(encode_rows(history))
+        col_bytes = len(encode_columnar(history))
+        row_time = min(timeit.repeat(lambda: encode_rows(history), number=number, repeat=5)) / number
+        col_time = min(timeit.repeat(lambda: encode_columnar(history), number=number, repeat=5)) / number
+        print(
+            f"{rows:>6}  {row_bytes:>11}  {col_bytes:>10}  {row_bytes / col_bytes:>6.1f}x  "
+            f"{row_time * 1000:>8.3f}ms  {col_time * 1000:>8.3f}ms  {row_time / col_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[60, 1000, 5760])
+    main(parser.parse_args())
@@ -0,0 +1,49 @@
+"""
+Benchmark: bytes and CPU time to compress dashboard payloads
+
+Encodes the dashboard response (row and columnar formats) and compresses it
+the way CompressionMiddleware does, per coding and level. Brotli rows only
+appear when the optional 'brotli' package is installed.
+
+Usage (from backend/):
+    python scripts/bench_compression.py
+    python scripts/bench_compression.py --sizes 60 5760
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.compression import CompressionPolicy, _Encoder, brotli_available
+from bench_columnar import encode_columnar, encode_rows, synthetic_readings
+
+CODINGS = [("gzip", 1), ("gzip", 4), ("gzip", 6), ("gzip", 9)]
+if brotli_available():
+    CODINGS += [("br", 1), ("br", 4), ("br", 6), ("br", 11)]
+
+
+def compress(body: bytes, coding: str, level: int) -> bytes:
+    return _Encoder(coding, CompressionPolicy(0, level, level)).finish(body)
+
+
+def main(args):
+    print(f"{'rows':>6}  {'format':<9}  {'coding':<8}  {'bytes':>8}  {'ratio':>6}  {'cpu':>9}")
+    for rows in args.sizes:
+        history = synthetic_readings(rows)
+        for label, encode in (("rows", encode_rows), ("columnar", encode_columnar)):
+            body = encode(history)
+            print(f"{rows:>6}  {label:<9}  {'identity':<8}  {len(body):>8}  {1.0:>5.1f}x  {'-':>9}")
+            for coding, level in CODINGS:
+                size = len(compress(body, coding, level))
+                number = max(1, 2_000_000 // len(body))
+                cpu = min(timeit.repeat(lambda: compress(body, coding, level), number=number, repeat=3)) / number
+                name = f"{coding}-{level}"
+                print(f"{rows:>6}  {label:<9}  {name:<8}  {size:>8}  {len(body) / size:>5.1f}x  {cpu * 1000:>7.3f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[60, 5760])
+    main(parser.parse_args())
@@ -0,0 +1,53 @@
+"""
+Benchmark: per-row dict decoding (parse_feeds) vs. columnar NumPy decoding (decode_feeds)
+
+Usage (from backend/):
+    python scripts/bench_feed_decoding.py
+    python scripts/bench_feed_decoding.py --sizes 60 8000 100000 --corrupt 0.01
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.feed_decoder import decode_feeds
+from app.services.thingspeak import parse_feeds
+
+
+def synthetic_feeds(rows: int, corrupt_ratio: float):
+    start = datetime(2024, 1, 1)
+    feeds = []
+    for i in range(rows):
+        feed = {
+            "created_at": (start + timedelta(seconds=15 * i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "entry_id": i + 1,
+            "field1": f"{3.2 + random.random() * 0.2:.3f}",
+            "field2": f"{100 + random.random() * 80:.1f}",
+            "field3": f"{24 + random.random() * 6:.1f}",
+        }
+        if random.random() < corrupt_ratio:
+            feed[random.choice(("field1", "field2", "field3"))] = random.choice(("", None, "nan", "ERR"))
+        feeds.append(feed)
+    return feeds
+
+
+def main(args):
+    random.seed(42)
+    print(f"{'rows':>8}  {'dict loop':>12}  {'numpy':>12}  {'speedup':>8}")
+    for rows in args.sizes:
+        feeds = synthetic_feeds(rows, args.corrupt)
+        number = max(1, 200_000 // rows)
+        loop = min(timeit.repeat(lambda: parse_feeds(feeds), number=number, repeat=5)) / number
+        vect = min(timeit.repeat(lambda: decode_feeds(feeds), number=number, repeat=5)) / number
+        print(f"{rows:>8}  {loop * 1000:>10.3f}ms  {vect * 1000:>10.3f}ms  {loop / vect:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[60, 8000, 100000])
+    parser.add_argument("--corrupt", type=float, default=0.0, help="Fraction of rows with one bad field")
+    main(parser.parse_args())
@@ -0,0 +1,71 @@
+"""
+Benchmark: fleet overview across many devices
+
+Serves N synthetic channels from the local ThingSpeak stand-in with per-request
+latency, then times FleetMonitor.overview() cold (every device fetched, bounded
+concurrency) and warm (TTL cache), against the slowest single fetch and the
+sum of all fetches (a sequential loop).
+
+Usage (from backend/):
+    python scripts/bench_fleet.py --devices 100 --latency uniform:50:250 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.services.fleet import FleetMonitor
+from app.services.thingspeak import close_thingspeak_client, get_thingspeak_client
+from mock_thingspeak import MockThingSpeakServer
+
+
+async def main(args):
+    channel_ids = tuple(range(1, args.devices + 1))
+    server = MockThingSpeakServer(
+        channel_ids=channel_ids, latency=args.latency, error_rate=args.error_rate, frozen=True
+    ).start()
+    settings.THINGSPEAK_BASE_URL = server.url
+    # The stand-in only speaks HTTP/1.1, so give the pool a connection per
+    # concurrent fetch (over HTTP/2 they would multiplex)
+    settings.THINGSPEAK_MAX_CONNECTIONS = max(settings.THINGSPEAK_MAX_CONNECTIONS, args.concurrency)
+    devices = [
+        {"id": f"dev-{cid}", "name": f"Site {cid}", "channel_id": str(cid), "read_key": "", "location": ""}
+        for cid in channel_ids
+    ]
+    client = get_thingspeak_client()
+    print(f"{args.devices} devices, latency {args.latency}, concurrency {args.concurrency}")
+
+    # Sequential baseline: one fetch after another
+    singles = []
+    for device in devices:
+        started = time.perf_counter()
+        await client.get_feeds(device["channel_id"], "", results=1)
+        singles.append((time.perf_counter() - started) * 1000)
+    print(f"sequential  {sum(singles):8.1f}ms  (slowest single fetch {max(singles):.1f}ms)")
+
+    monitor = FleetMonitor(concurrency=args.concurrency, ttl_seconds=args.ttl)
+    for label in ("cold", "warm"):
+        started = time.perf_counter()
+        result = await monitor.overview(devices)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(
+            f"{label:<10}  {elapsed:8.1f}ms  status={result['status_counts']}  "
+            f"stale={result['stale_count']}"
+        )
+    print(f"monitor: {monitor.stats()}")
+    await close_thingspeak_client()
+    server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--latency", default="uniform:50:250", help="Stand-in latency spec (see mock_thingspeak.py)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=settings.FLEET_CONCURRENCY)
+    parser.add_argument("--ttl", type=float, default=settings.FLEET_CACHE_TTL_SECONDS)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,82 @@
+"""
+Benchmark: ThingSpeak client latency with and without hedged requests
+
+Uses an in-process transport whose latency has a long tail (most responses
+are fast, a few stall), then reports p50/p95/p99 and hedge rate for both
+modes so the hedge percentile can be tuned.
+
+Usage (from backend/):
+    python scripts/bench_hedging.py --requests 500 --percentile 95
+    python scripts/bench_hedging.py --slow-ratio 0.1 --slow-ms 800
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from app.core.config import settings
+from app.services.thingspeak import ThingSpeakClient
+
+
+def long_tail_transport(fast_ms: float, slow_ms: float, slow_ratio: float) -> httpx.MockTransport:
+    async def handler(request):
+        if random.random() < slow_ratio:
+            delay = random.uniform(slow_ms * 0.5, slow_ms * 1.5)
+        else:
+            delay = random.expovariate(1 / fast_ms)
+        await asyncio.sleep(delay / 1000)
+        return httpx.Response(200, json={"channel": {}, "feeds": []})
+    return httpx.MockTransport(handler)
+
+
+async def run_mode(hedge: bool, args) -> dict:
+    random.seed(args.seed)
+    client = ThingSpeakClient(
+        base_url="http://thingspeak.local",
+        http2=False,
+        hedge=hedge,
+        transport=long_tail_transport(args.fast_ms, args.slow_ms, args.slow_ratio),
+    )
+    client.hedge_percentile = args.percentile
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def one():
+        async with sem:
+            await client.get_feeds(channel_id="1", api_key="", results=60)
+
+    await asyncio.gather(*(one() for _ in range(args.requests)))
+    await client.aclose()
+    return client.stats()
+
+
+async def main(args):
+    settings.THINGSPEAK_HEDGE_MIN_SAMPLES = min(settings.THINGSPEAK_HEDGE_MIN_SAMPLES, args.requests // 10 or 1)
+    print(
+        f"Latency model: {args.slow_ratio:.0%} slow (~{args.slow_ms:.0f} ms), "
+        f"rest ~{args.fast_ms:.0f} ms; hedge at p{args.percentile:g}"
+    )
+    print(f"{'mode':<10} {'p50':>9} {'p95':>9} {'p99':>9} {'hedge rate':>11} {'hedge wins':>11}")
+    for hedge in (False, True):
+        stats = await run_mode(hedge, args)
+        latency = stats["latency_hedged" if hedge else "latency_unhedged"]
+        print(
+            f"{'hedged' if hedge else 'unhedged':<10} "
+            f"{latency['p50_ms']:>7.1f}ms {latency['p95_ms']:>7.1f}ms {latency['p99_ms']:>7.1f}ms "
+            f"{stats['hedge_rate']:>10.1%} {stats['hedge_wins']:>11}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--fast-ms", type=float, default=40.0)
+    parser.add_argument("--slow-ms", type=float, default=600.0)
+    parser.add_argument("--slow-ratio", type=float, default=0.05)
+    parser.add_argument("--percentile", type=float, default=95.0)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
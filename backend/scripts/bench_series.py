@@ -0,0 +1,64 @@
+"""
+Benchmark: LTTB chart series over the local reading store
+
+Fills a throwaway SQLite store with synthetic 15 s readings, then times
+load_series() cold (rows read from SQLite) and warm (day chunks cached).
+
+Usage (from backend/):
+    python scripts/bench_series.py --days 30 --points 1000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Point the reading store at a temp file before app modules read the path
+os.environ.setdefault("READINGS_DB_PATH", os.path.join(tempfile.mkdtemp(), "bench_readings.db"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from app.database.readings import READINGS_DB_PATH, ReadingDB, init_readings_db
+from app.services.downsample import get_series_cache, load_series
+from app.services.feed_decoder import FeedColumns
+
+CHANNEL = "bench"
+INTERVAL = 15
+
+
+def fill_store(days: int, start_ts: int) -> int:
+    n = days * 86400 // INTERVAL
+    rng = np.random.default_rng(0)
+    ts = start_ts + np.arange(n, dtype=np.int64) * INTERVAL
+    daily = np.sin(2 * np.pi * (ts % 86400) / 86400)
+    columns = FeedColumns(
+        entry_id=np.arange(1, n + 1, dtype=np.int64),
+        ts=ts,
+        voltage=np.ma.masked_invalid(3.3 + rng.normal(0, 0.02, n)),
+        tds=np.ma.masked_invalid(120 + 25 * daily + np.cumsum(rng.normal(0, 0.2, n)) % 20),
+        temp=np.ma.masked_invalid(26 + 3 * daily + rng.normal(0, 0.3, n)),
+    )
+    return ReadingDB.insert_columns(CHANNEL, columns)
+
+
+def main(args):
+    init_readings_db()
+    start_ts = 1_700_000_000 - 1_700_000_000 % 86400
+    end_ts = start_ts + args.days * 86400
+    if ReadingDB.count(CHANNEL) == 0:
+        print(f"Writing {fill_store(args.days, start_ts)} readings to {READINGS_DB_PATH}")
+
+    for label in ("cold", "warm", "warm"):
+        started = time.perf_counter()
+        result = load_series(CHANNEL, start_ts, end_ts, args.points)
+        elapsed = (time.perf_counter() - started) * 1000
+        returned = {metric: len(points) for metric, points in result["series"].items()}
+        print(f"{label:<5} {elapsed:8.1f}ms  source_points={result['source_points']}  returned={returned}")
+    print(f"cache: {get_series_cache().stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--points", type=int, default=1000)
+    main(parser.parse_args())
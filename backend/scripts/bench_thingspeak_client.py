@@ -0,0 +1,80 @@
+"""
+Benchmark: pooled ThingSpeak client vs. a fresh httpx.AsyncClient per call
+
+Runs against the local ThingSpeak stand-in (scripts/mock_thingspeak.py) so the
+numbers are repeatable offline. The stand-in sleeps once per *new connection*
+to model the TCP+TLS handshake cost that the pooled client avoids.
+
+Usage (from backend/):
+    python scripts/bench_thingspeak_client.py --requests 200 --concurrency 10 --handshake-ms 40
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from app.services.thingspeak import ThingSpeakClient
+from mock_thingspeak import MockThingSpeakServer
+
+
+async def _run(label, fetch, total, concurrency):
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with sem:
+            start = time.perf_counter()
+            response = await fetch()
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    wall = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    wall = time.perf_counter() - wall
+
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+    print(
+        f"{label:<10} total={wall:6.2f}s  req/s={total / wall:7.1f}  "
+        f"mean={statistics.mean(latencies):6.1f}ms  p50={p(0.50):6.1f}ms  "
+        f"p95={p(0.95):6.1f}ms  p99={p(0.99):6.1f}ms"
+    )
+
+
+async def main(args):
+    server = MockThingSpeakServer(channel_ids=(1,), handshake_ms=args.handshake_ms, frozen=True).start()
+    base_url = server.url
+    print(f"Stand-in ThingSpeak at {base_url} (handshake {args.handshake_ms} ms)")
+
+    async def per_call():
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            return await client.get("/channels/1/feeds.json", params={"results": 60})
+
+    pooled_client = ThingSpeakClient(base_url=base_url, http2=False, max_connections=args.concurrency)
+
+    async def pooled():
+        return await pooled_client.get_feeds(channel_id="1", api_key="", results=60)
+
+    server.connections = 0
+    await _run("per-call", per_call, args.requests, args.concurrency)
+    print(f"{'':<10} connections opened: {server.connections}")
+
+    server.connections = 0
+    await _run("pooled", pooled, args.requests, args.concurrency)
+    print(f"{'':<10} connections opened: {server.connections}")
+
+    await pooled_client.aclose()
+    server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--handshake-ms", type=float, default=40.0)
+    asyncio.run(main(parser.parse_args()))
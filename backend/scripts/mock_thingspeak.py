@@ -0,0 +1,376 @@
+"""
+Local ThingSpeak stand-in for offline load and latency testing
+
+Serves /channels/{id}/feeds.json (and feeds/last.json) from a deterministic
+synthetic channel: entry N was created at origin + (N - 1) * interval and its
+field values depend only on the seed and N, so overlapping requests always
+agree. The channel keeps growing with the wall clock unless --frozen is set.
+
+results/start/end/timezone follow ThingSpeak: at most 8000 rows, the newest
+`results` rows inside [start, end] (both inclusive). Latency, HTTP 500/429
+rates and stalls are configurable so client behaviour can be exercised.
+
+Usage (from backend/):
+    python scripts/mock_thingspeak.py --port 8090 --latency lognormal:40:0.6 --error-rate 0.02
+    THINGSPEAK_BASE_URL=http://127.0.0.1:8090 uvicorn main:app
+
+Latency specs (milliseconds):
+    none | fixed:MS | uniform:LO:HI | lognormal:MEDIAN:SIGMA | longtail:FAST:SLOW:RATIO
+
+Also importable for benchmarks:
+    with MockThingSpeakServer(latency="fixed:20") as server:
+        client = ThingSpeakClient(base_url=server.url)
+"""
+import argparse
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+MAX_RESULTS = 8000
+DEFAULT_RESULTS = 100
+
+_FEEDS_PATH = re.compile(r"^/channels/(\d+)/feeds(/last)?\.json$")
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Turn a latency spec into a sampler returning seconds"""
+    kind, _, rest = spec.partition(":")
+    args = [float(a) for a in rest.split(":")] if rest else []
+    if kind == "none":
+        return lambda rng: 0.0
+    if kind == "fixed" and len(args) == 1:
+        return lambda rng: args[0] / 1000
+    if kind == "uniform" and len(args) == 2:
+        return lambda rng: rng.uniform(args[0], args[1]) / 1000
+    if kind == "lognormal" and len(args) == 2:
+        mu = math.log(args[0])
+        return lambda rng: rng.lognormvariate(mu, args[1]) / 1000
+    if kind == "longtail" and len(args) == 3:
+        fast, slow, ratio = args
+        return lambda rng: (
+            rng.uniform(slow * 0.5, slow * 1.5) if rng.random() < ratio else rng.expovariate(1 / fast)
+        ) / 1000
+    raise ValueError(f"Bad latency spec: {spec!r}")
+
+
+def _parse_time(value: str, tz_offset: float) -> int:
+    """ThingSpeak 'YYYY-MM-DD HH:MM:SS' (or ISO-8601) -> epoch seconds"""
+    value = value.strip().replace("T", " ").rstrip("Z")
+    parsed = datetime.strptime(value, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() - tz_offset)
+
+
+def _noise(entry_id: int, salt: float) -> float:
+    """Deterministic pseudo-random value in [0, 1) for an entry"""
+    x = math.sin(entry_id * 12.9898 + salt) * 43758.5453
+    return x - math.floor(x)
+
+
+class SyntheticChannel:
+    """Deterministic reading generator for one channel"""
+
+    def __init__(
+        self,
+        channel_id: int,
+        interval: float = 15.0,
+        history_seconds: float = 7 * 86400,
+        seed: int = 0,
+        gap_rate: float = 0.0,
+        spike_rate: float = 0.0,
+        frozen: bool = False,
+    ):
+        self.channel_id = channel_id
+        self.interval = interval
+        self.seed = seed
+        self.gap_rate = gap_rate
+        self.spike_rate = spike_rate
+        now = time.time()
+        # Whole-second origin so created_at values are exact
+        self.origin = int(now - history_seconds)
+        self._frozen_at = now if frozen else None
+
+    def last_entry_id(self) -> int:
+        now = self._frozen_at if self._frozen_at is not None else time.time()
+        return max(0, int((now - self.origin) // self.interval) + 1)
+
+    def entry_ts(self, entry_id: int) -> int:
+        return self.origin + int((entry_id - 1) * self.interval)
+
+    def entry_at_or_after(self, ts: int) -> int:
+        return max(1, math.ceil((ts - self.origin) / self.interval) + 1)
+
+    def entry_at_or_before(self, ts: int) -> int:
+        return int((ts - self.origin) // self.interval) + 1
+
+    def feed(self, entry_id: int, tz_offset: float = 0.0) -> Dict:
+        ts = self.entry_ts(entry_id)
+        day_phase = 2 * math.pi * (ts % 86400) / 86400
+        tds = 110 + 25 * math.sin(day_phase) + 10 * _noise(entry_id, self.seed + 0.2)
+        if _noise(entry_id, self.seed + 0.5) < self.spike_rate:
+            tds *= 3
+        fields = {
+            "field1": f"{3.2 + 0.2 * _noise(entry_id, self.seed + 0.1):.3f}",
+            "field2": f"{tds:.1f}",
+            "field3": f"{26 + 3 * math.sin(day_phase - 1) + _noise(entry_id, self.seed + 0.3):.1f}",
+        }
+        if _noise(entry_id, self.seed + 0.7) < self.gap_rate:
+            fields[("field1", "field2", "field3")[entry_id % 3]] = ""
+        if tz_offset:
+            created_at = datetime.fromtimestamp(ts + tz_offset, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+            sign = "+" if tz_offset >= 0 else "-"
+            minutes = int(abs(tz_offset)) // 60
+            created_at += f"{sign}{minutes // 60:02d}:{minutes % 60:02d}"
+        else:
+            created_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts))
+        return {"created_at": created_at, "entry_id": entry_id, **fields}
+
+    def feeds(
+        self,
+        results: Optional[int] = None,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        tz_offset: float = 0.0,
+    ) -> List[Dict]:
+        """Newest `results` entries within [start, end] (epoch seconds, inclusive)"""
+        last = self.last_entry_id()
+        first = 1
+        if start is not None:
+            first = max(first, self.entry_at_or_after(start))
+        if end is not None:
+            last = min(last, self.entry_at_or_before(end))
+        if results is None:
+            # ThingSpeak returns up to 8000 when a range is given, else 100
+            results = MAX_RESULTS if start is not None or end is not None else DEFAULT_RESULTS
+        results = max(0, min(results, MAX_RESULTS))
+        first = max(first, last - results + 1)
+        return [self.feed(i, tz_offset) for i in range(first, last + 1)]
+
+    def channel_info(self) -> Dict:
+        return {
+            "id": self.channel_id,
+            "name": "Evara TDS (mock)",
+            "field1": "Voltage",
+            "field2": "TDS",
+            "field3": "Temperature",
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.origin)),
+            "last_entry_id": self.last_entry_id(),
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    server: "MockThingSpeakServer"
+
+    def do_GET(self):
+        srv = self.server
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        with srv.lock:
+            srv.requests += 1
+            delay = srv.sample_latency(srv.rng)
+            roll = srv.rng.random()
+        if delay:
+            time.sleep(delay)
+
+        if roll < srv.stall_rate:
+            srv.count("stalls")
+            # Hold the connection well past any sane client timeout
+            time.sleep(srv.stall_seconds)
+            return self._send(504, {"error": "stalled"})
+        roll -= srv.stall_rate
+        if roll < srv.error_rate:
+            srv.count("errors")
+            return self._send(500, {"error": "Internal Server Error"})
+        roll -= srv.error_rate
+        if roll < srv.rate_limit_rate:
+            srv.count("rate_limited")
+            return self._send(429, {"error": "Too Many Requests"})
+
+        match = _FEEDS_PATH.match(url.path)
+        if not match:
+            return self._send(404, {"error": "Not Found"})
+        channel = srv.channel(int(match.group(1)))
+        if channel is None:
+            return self._send(404, -1)
+        try:
+            tz_offset = srv.tz_offset(query.get("timezone"))
+            if match.group(2):
+                last = channel.last_entry_id()
+                return self._send(200, channel.feed(last, tz_offset) if last else -1)
+            feeds = channel.feeds(
+                results=int(query["results"]) if "results" in query else None,
+                start=_parse_time(query["start"], tz_offset) if "start" in query else None,
+                end=_parse_time(query["end"], tz_offset) if "end" in query else None,
+                tz_offset=tz_offset,
+            )
+        except ValueError as e:
+            return self._send(400, {"error": str(e)})
+        srv.count("rows_served", len(feeds))
+        self._send(200, {"channel": channel.channel_info(), "feeds": feeds})
+
+    def _send(self, status: int, body) -> None:
+        payload = json.dumps(body, separators=(",", ":")).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        if self.server.verbose:
+            super().log_message(*args)
+
+
+class MockThingSpeakServer(ThreadingHTTPServer):
+    """Threaded HTTP server hosting one or more synthetic channels"""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        channel_ids: tuple = (2713286,),
+        latency: str = "none",
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        stall_rate: float = 0.0,
+        stall_seconds: float = 30.0,
+        handshake_ms: float = 0.0,
+        seed: int = 0,
+        verbose: bool = False,
+        **channel_options,
+    ):
+        super().__init__((host, port), _Handler)
+        self.channels = {
+            cid: SyntheticChannel(cid, seed=seed + i, **channel_options) for i, cid in enumerate(channel_ids)
+        }
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.handshake_delay = handshake_ms / 1000
+        self.verbose = verbose
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.counters: Dict[str, int] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def channel(self, channel_id: int) -> Optional[SyntheticChannel]:
+        return self.channels.get(channel_id)
+
+    @staticmethod
+    def tz_offset(name: Optional[str]) -> float:
+        """Seconds east of UTC for a timezone name (UTC when absent or unknown)"""
+        if not name:
+            return 0.0
+        try:
+            from zoneinfo import ZoneInfo
+            return datetime.now(ZoneInfo(name)).utcoffset().total_seconds()
+        except Exception:
+            return 0.0
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def process_request_thread(self, request, client_address):
+        # Runs once per accepted connection; models TCP+TLS setup cost
+        with self.lock:
+            self.connections += 1
+        if self.handshake_delay:
+            time.sleep(self.handshake_delay)
+        super().process_request_thread(request, client_address)
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up on a slow or stalled response is expected here
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {'requests': self.requests, 'connections': self.connections, **self.counters}
+
+    def start(self) -> "MockThingSpeakServer":
+        """Serve from a daemon thread"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "MockThingSpeakServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--channel", type=int, action="append", help="Channel id to serve (repeatable)")
+    parser.add_argument("--interval", type=float, default=15.0, help="Seconds between entries")
+    parser.add_argument("--history-days", type=float, default=7.0, help="History available at startup")
+    parser.add_argument("--frozen", action="store_true", help="Do not add new entries over time")
+    parser.add_argument("--latency", default="none", help="Latency spec (see above)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of HTTP 500 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of HTTP 429 responses")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="Fraction of requests that hang")
+    parser.add_argument("--stall-seconds", type=float, default=30.0)
+    parser.add_argument("--handshake-ms", type=float, default=0.0, help="Delay per new connection")
+    parser.add_argument("--gap-rate", type=float, default=0.0, help="Fraction of entries with an empty field")
+    parser.add_argument("--spike-rate", type=float, default=0.0, help="Fraction of entries with a TDS spike")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    server = MockThingSpeakServer(
+        host=args.host,
+        port=args.port,
+        channel_ids=tuple(args.channel or (2713286,)),
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        stall_rate=args.stall_rate,
+        stall_seconds=args.stall_seconds,
+        handshake_ms=args.handshake_ms,
+        seed=args.seed,
+        verbose=args.verbose,
+        interval=args.interval,
+        history_seconds=args.history_days * 86400,
+        gap_rate=args.gap_rate,
+        spike_rate=args.spike_rate,
+        frozen=args.frozen,
+    )
+    print(f"Mock ThingSpeak serving channels {sorted(server.channels)} at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served: {server.stats()}")
+
+
+if __name__ == "__main__":
+    main()
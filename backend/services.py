@@ -1,6 +1,6 @@
-import httpx
 import os
 from datetime import datetime
+from app.services.thingspeak import get_thingspeak_client
 
 # Configuration
 CHANNEL_ID = os.getenv("THINGSPEAK_CHANNEL_ID", "2713286")
@@ -11,47 +11,46 @@ async def fetch_evara_data(results: int = 60):
     Fetches the last 'results' entries from ThingSpeak.
     Processes them for the dashboard.
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            # Fetch last N entries
-            response = await client.get(f"{THINGSPEAK_URL}?results={results}")
-            data = response.json()
-            
-            feeds = data.get('feeds', [])
-            processed_feeds = []
+    try:
+        # Fetch last N entries over the shared connection pool
+        response = await get_thingspeak_client().get_feeds(channel_id=CHANNEL_ID, api_key="", results=results)
+        data = response.json()
+        
+        feeds = data.get('feeds', [])
+        processed_feeds = []
 
-            for feed in feeds:
-                # Parse data safely
-                try:
-                    tds = float(feed.get('field2', 0) or 0)
-                    temp = float(feed.get('field3', 0) or 0)
-                    voltage = float(feed.get('field1', 0) or 0)
-                    timestamp = feed.get('created_at')
-                except ValueError:
-                    continue # Skip corrupt frames
+        for feed in feeds:
+            # Parse data safely
+            try:
+                tds = float(feed.get('field2', 0) or 0)
+                temp = float(feed.get('field3', 0) or 0)
+                voltage = float(feed.get('field1', 0) or 0)
+                timestamp = feed.get('created_at')
+            except ValueError:
+                continue # Skip corrupt frames
 
-                processed_feeds.append({
-                    "created_at": timestamp,
-                    "tds": tds,
-                    "temp": temp,
-                    "voltage": voltage
-                })
+            processed_feeds.append({
+                "created_at": timestamp,
+                "tds": tds,
+                "temp": temp,
+                "voltage": voltage
+            })
 
-            # Get Latest Reading for Status
-            latest = processed_feeds[-1] if processed_feeds else None
-            
-            # Analyze for Alerts (TDS > 150)
-            system_status = "NORMAL"
-            if latest and latest['tds'] > 150:
-                system_status = "CRITICAL_HIGH_TDS"
+        # Get Latest Reading for Status
+        latest = processed_feeds[-1] if processed_feeds else None
+        
+        # Analyze for Alerts (TDS > 150)
+        system_status = "NORMAL"
+        if latest and latest['tds'] > 150:
+            system_status = "CRITICAL_HIGH_TDS"
 
-            return {
-                "channel_info": data.get('channel', {}),
-                "latest": latest,
-                "history": processed_feeds,
-                "status": system_status
-            }
+        return {
+            "channel_info": data.get('channel', {}),
+            "latest": latest,
+            "history": processed_feeds,
+            "status": system_status
+        }
 
-        except Exception as e:
-            print(f"Error fetching ThingSpeak: {e}")
-            return {"error": "Failed to fetch data"}
\ No newline at end of file
+    except Exception as e:
+        print(f"Error fetching ThingSpeak: {e}")
+        return {"error": "Failed to fetch data"}
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+Shared test setup
+Points both databases at a temporary directory before the app is imported,
+and provides an in-process ThingSpeak stand-in built on the mock server's
+SyntheticChannel
+"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="evara-tests-")
+atexit.register(shutil.rmtree, _TMP, ignore_errors=True)
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP}/alerts.db"
+os.environ["READINGS_DB_PATH"] = f"{_TMP}/readings.db"
+os.environ["ALERTS_DB_PATH"] = f"{_TMP}/evara_alerts.db"
+os.environ["POLLER_ENABLED"] = "false"
+os.environ.pop("TELEGRAM_BOT_TOKEN", None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import pytest
+
+from scripts.mock_thingspeak import SyntheticChannel, _parse_time
+
+
+class FakeThingSpeak:
+    """Answers get_feeds() from a SyntheticChannel, recording each call's params"""
+
+    def __init__(self, channel: SyntheticChannel):
+        self.channel = channel
+        self.calls = []
+
+    async def get_feeds(self, channel_id=None, api_key=None, **params):
+        self.calls.append(params)
+        start, end = params.get("start"), params.get("end")
+        feeds = self.channel.feeds(
+            results=params.get("results"),
+            start=_parse_time(start, 0) if start else None,
+            end=_parse_time(end, 0) if end else None,
+        )
+        return httpx.Response(200, json={"feeds": feeds})
+
+
+@pytest.fixture
+def channel():
+    return SyntheticChannel(channel_id=1, history_seconds=5 * 86400, frozen=True)
+
+
+@pytest.fixture
+def thingspeak(channel):
+    return FakeThingSpeak(channel)
+
+
+@pytest.fixture
+def app_client(monkeypatch):
+    """TestClient for the app with upstream polling replaced by a no-op"""
+    from fastapi.testclient import TestClient
+
+    import main
+    from app.api.v1 import endpoints
+
+    async def no_poll():
+        return {"new": 0}
+
+    monkeypatch.setattr(endpoints, "ensure_readings", no_poll)
+    with TestClient(main.app, base_url="http://localhost") as client:
+        yield client
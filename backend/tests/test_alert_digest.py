@@ -0,0 +1,130 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.models.database import DBAlertHistory, DBAlertRecipient, SessionLocal, init_db
+from app.services import alert_digest, alert_engine
+from app.services.alert_digest import AlertDigest, record_delivery
+from app.services.alert_engine import AlertEngine
+from app.services.alert_state import get_alert_state
+from app.services.telegram_service import TelegramService
+
+
+class FakeTelegram(TelegramService):
+    """Formats like the real service; records sends instead of calling Telegram"""
+
+    def __init__(self, ok=True):
+        self.bot = None
+        self.ok = ok
+        self.sent = []
+
+    async def send_alert(self, chat_id, message, parse_mode="HTML"):
+        self.sent.append((chat_id, message))
+        return self.ok
+
+    async def send_bulk_alert(self, chat_ids, message):
+        self.sent.extend((chat_id, message) for chat_id in chat_ids)
+        return {'success': len(chat_ids), 'failed': 0, 'total': len(chat_ids)}
+
+
+@pytest.fixture
+def db():
+    init_db()
+    session = SessionLocal()
+    session.query(DBAlertHistory).delete()
+    session.query(DBAlertRecipient).delete()
+    session.add_all([DBAlertRecipient(name=f"r{i}", telegram_chat_id=str(1000 + i)) for i in range(2)])
+    session.commit()
+    get_alert_state().invalidate()
+    yield session
+    session.close()
+    get_alert_state().invalidate()
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    fake = FakeTelegram()
+    monkeypatch.setattr(alert_engine, "get_telegram_service", lambda: fake)
+    return fake
+
+
+@pytest.fixture
+def digest(monkeypatch, telegram):
+    """Digest enabled, as if the background poller were running"""
+    digest = AlertDigest(window_seconds=3600, telegram=telegram, on_sent=record_delivery)
+    monkeypatch.setattr(settings, "ALERT_DIGEST_ENABLED", True)
+    monkeypatch.setattr(alert_digest, "get_poller", lambda: SimpleNamespace(running=True))
+    monkeypatch.setattr(alert_engine, "get_alert_digest", lambda: digest)
+    return digest
+
+
+def trigger(db, alert_type="high_temp", severity="warning", temp=36.0):
+    return AlertEngine(db).trigger_alert(alert_type, severity, tds=120.0, temp=temp, voltage=3.3, threshold=35.0)
+
+
+def cooling(db, alert_type="high_temp"):
+    return AlertEngine(db).state.cooldown_remaining(alert_type).total_seconds() > 0
+
+
+def test_without_the_poller_alerts_go_out_directly(db, telegram, monkeypatch):
+    monkeypatch.setattr(settings, "ALERT_DIGEST_ENABLED", True)
+    monkeypatch.setattr(alert_digest, "get_poller", lambda: SimpleNamespace(running=False))
+
+    async def run():
+        return await trigger(db)
+    result = asyncio.run(run())
+    assert result['sent'] and result['recipients'] == 2
+    assert len(telegram.sent) == 2
+    assert cooling(db)
+
+
+def test_cooldown_starts_when_the_digest_is_sent(db, digest, telegram):
+    async def run():
+        first = await trigger(db)
+        assert first['queued']
+        # Nothing sent yet: no cooldown, and repeats fold into the queued alert
+        assert not cooling(db)
+        repeat = await trigger(db, temp=38.5)
+        assert repeat['reason'] == 'queued'
+        assert db.query(DBAlertHistory).count() == 1
+
+        assert await digest.flush() == 2
+        assert cooling(db)
+        after = await trigger(db)
+        assert after['reason'] == 'cooldown'
+    asyncio.run(run())
+
+    assert len(telegram.sent) == 2
+    assert "38.5" in telegram.sent[0][1]
+    db.expire_all()
+    row = db.query(DBAlertHistory).one()
+    assert row.recipient_count == 2
+    # A restart restores the cooldown from the delivered history row
+    get_alert_state().invalidate()
+    assert cooling(db)
+
+
+def test_an_unsent_digest_starts_no_cooldown(db, digest, telegram):
+    telegram.ok = False
+
+    async def run():
+        await trigger(db)
+        assert await digest.flush() == 0
+    asyncio.run(run())
+
+    assert not cooling(db)
+    # Nor after a restart: the queued row never reached anyone
+    get_alert_state().invalidate()
+    assert not cooling(db)
+
+
+def test_critical_alerts_skip_the_digest(db, digest, telegram):
+    async def run():
+        return await trigger(db, alert_type="high_tds", severity="critical")
+    result = asyncio.run(run())
+    assert result['sent']
+    assert len(telegram.sent) == 2
+    assert digest.stats()['alerts_queued'] == 0
+    assert cooling(db, "high_tds")
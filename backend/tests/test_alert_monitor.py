@@ -0,0 +1,95 @@
+import pytest
+
+from app.database.readings import from_epoch
+from app.models.database import DBAlertRule, SessionLocal, init_db
+from app.services.alert_engine import AlertEngine
+from app.services.alert_monitor import AlertMonitor
+from app.services.alert_rules import DEFAULT_RULES, get_rule_registry
+from app.services.ingestion import IncrementalIngestor, ReadingBuffer
+
+T0 = 1_700_000_000
+
+
+@pytest.fixture
+def db():
+    """The default rules (60 s minimum duration) and nothing else"""
+    init_db()
+    session = SessionLocal()
+    session.query(DBAlertRule).delete()
+    for rule in DEFAULT_RULES:
+        session.add(DBAlertRule(min_duration_seconds=60.0, **rule))
+    session.commit()
+    get_rule_registry().invalidate()
+    yield session
+    session.close()
+    get_rule_registry().invalidate()
+
+
+@pytest.fixture
+def monitor(db):
+    ingestor = IncrementalIngestor(ReadingBuffer(maxlen=1000), channel_id="1")
+    return AlertMonitor(ingestor)
+
+
+def poll(monitor, values, first_entry_id):
+    readings = [
+        {"entry_id": entry_id, "created_at": from_epoch(T0 + 15 * entry_id), "tds": tds, "temp": 25.0, "voltage": 3.3}
+        for entry_id, tds in enumerate(values, start=first_entry_id)
+    ]
+    appended = monitor.ingestor.buffer.extend(readings)
+    monitor.ingestor._notify({"new": len(appended), "readings": appended, "last_entry_id": appended[-1]["entry_id"]})
+
+
+def firing(monitor):
+    return [hit["alert_type"] for hit in monitor.firing]
+
+
+def test_monitor_keeps_rule_state_between_polls(monitor):
+    # Each poll alone is too short to fire; together the breach lasts 75 s
+    poll(monitor, [140, 155, 156], 1)
+    assert firing(monitor) == []
+    assert monitor.state[("High TDS", "1")].in_breach
+
+    poll(monitor, [152, 151, 153], 4)
+    assert firing(monitor) == ["high_tds"]
+    assert monitor.firing[0]["since"] == from_epoch(T0 + 30)
+    assert (monitor.firing[0]["value"], monitor.firing[0]["threshold"]) == (153.0, 150.0)
+
+
+def test_default_rules_clear_past_the_exit_threshold(monitor):
+    poll(monitor, [155] * 6, 1)
+    assert firing(monitor) == ["high_tds"]
+    # Below the enter threshold, above warning_threshold (135): still firing
+    poll(monitor, [140], 7)
+    assert firing(monitor) == ["high_tds"]
+    # A missing value neither ends nor extends the breach
+    poll(monitor, [None], 8)
+    assert monitor.state[("High TDS", "1")].in_breach
+    poll(monitor, [130], 9)
+    assert firing(monitor) == []
+    assert monitor.stats()["readings"] == 9
+
+
+def test_monitor_starts_from_the_buffer(db):
+    ingestor = IncrementalIngestor(ReadingBuffer(maxlen=1000), channel_id="1")
+    ingestor.buffer.extend([
+        {"entry_id": i, "created_at": from_epoch(T0 + 15 * i), "tds": 160.0, "temp": 25.0, "voltage": 3.3}
+        for i in range(1, 10)
+    ])
+    monitor = AlertMonitor(ingestor)
+    assert firing(monitor) == []
+    assert monitor.catch_up()[0]["since"] == from_epoch(T0 + 15)
+
+
+def test_check_thresholds_follows_the_rules(db):
+    engine = AlertEngine(db)
+    assert engine.check_thresholds(120, 25, 3.3) is None
+    assert engine.check_thresholds(160, 40, 3.3)["type"] == "high_tds"
+    assert [hit["type"] for hit in engine.breaches(160, 40, 2.5)] == ["high_tds", "high_temp", "low_voltage"]
+
+    # Deactivating a rule takes it out of the legacy path too
+    db.query(DBAlertRule).filter(DBAlertRule.alert_type == "high_tds").update({"is_active": False})
+    db.commit()
+    get_rule_registry().invalidate()
+    hit = engine.check_thresholds(160, 40, 3.3)
+    assert (hit["type"], hit["threshold"], hit["current_value"]) == ("high_temp", 35.0, 40)
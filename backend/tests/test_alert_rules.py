@@ -0,0 +1,123 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.database.readings import from_epoch
+from app.models.database import DBAlertRule, SessionLocal, init_db
+from app.services.alert_rules import (
+    DEFAULT_RULES, ReadingBatch, RuleDefinitionError, RuleRegistry, RuleSet, compile_condition, compile_rule,
+)
+from app.services.alert_window import evaluate_window, readings_columns, rules_from_config
+
+
+@pytest.fixture
+def db():
+    init_db()
+    session = SessionLocal()
+    session.query(DBAlertRule).delete()
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_empty_table_is_seeded_with_the_defaults(db):
+    RuleRegistry().ensure_table(db)
+    names = [row.name for row in db.query(DBAlertRule).order_by(DBAlertRule.id)]
+    assert names == [rule["name"] for rule in DEFAULT_RULES]
+
+    # Existing rows (even inactive ones) are left alone
+    db.query(DBAlertRule).update({"is_active": False})
+    db.commit()
+    RuleRegistry().ensure_table(db)
+    assert db.query(DBAlertRule).count() == len(DEFAULT_RULES)
+
+
+CONFIG = SimpleNamespace(tds_threshold=150.0, temp_threshold=35.0, warning_threshold=135.0, version=None)
+T0 = 1_700_000_000
+
+
+def batch(**columns):
+    n = len(next(iter(columns.values())))
+    readings = [
+        {"entry_id": i, "created_at": from_epoch(T0 + 15 * i), **{metric: values[i] for metric, values in columns.items()}}
+        for i in range(n)
+    ]
+    return ReadingBatch({"1": readings})
+
+
+def holds(condition, **columns):
+    predicate, _ = compile_condition(condition, CONFIG)
+    return predicate(batch(**columns)).tolist()
+
+
+def test_threshold_follows_the_config_value():
+    predicate, threshold = compile_condition({"metric": "tds", "op": ">", "value": "tds_threshold"}, CONFIG)
+    assert threshold == 150.0
+    assert predicate(batch(tds=[140, 151])).tolist() == [False, True]
+
+
+@pytest.mark.parametrize("condition", [
+    {"metric": "ph", "op": ">", "value": 1},
+    {"metric": "tds", "op": "=>", "value": 1},
+    {"metric": "tds", "op": ">", "value": "nope"},
+    {"metric": "tds", "op": ">", "value": True},
+    {"metric": "tds", "rate": 0, "op": ">", "value": 1},
+    {"all": []},
+    {"not": {"metric": "tds", "op": ">", "value": 1}, "extra": 1},
+])
+def test_invalid_conditions_are_rejected(condition):
+    with pytest.raises(RuleDefinitionError):
+        compile_condition(condition, CONFIG)
+
+
+def test_missing_values_never_satisfy_a_condition():
+    tds = [160, None, 120]
+    assert holds({"metric": "tds", "op": ">", "value": 150}, tds=tds) == [True, False, False]
+    assert holds({"metric": "tds", "op": "!=", "value": 150}, tds=tds) == [True, False, True]
+    assert holds({"not": {"metric": "tds", "op": ">", "value": 150}}, tds=tds) == [False, False, True]
+    assert holds({"not": {"not": {"metric": "tds", "op": ">", "value": 150}}}, tds=tds) == [True, False, False]
+
+
+def test_negated_rate_is_undefined_for_the_first_reading():
+    condition = {"not": {"metric": "tds", "rate": 60, "op": ">", "value": 20}}
+    assert holds(condition, tds=[100, 101, 130]) == [False, True, False]
+
+
+def test_combinators_follow_three_valued_logic():
+    high_tds = {"metric": "tds", "op": ">", "value": 150}
+    high_temp = {"metric": "temp", "op": ">", "value": 35}
+    tds, temp = [None, None, 160], [30, 40, 30]
+    # all(unknown, false) is false, so its negation holds; all(unknown, true) stays unknown
+    assert holds({"not": {"all": [high_tds, high_temp]}}, tds=tds, temp=temp) == [True, False, True]
+    assert holds({"not": {"any": [high_tds, high_temp]}}, tds=tds, temp=temp) == [False, False, False]
+
+
+def test_firing_rules_report_the_breaching_value():
+    rule = compile_rule(SimpleNamespace(
+        name="High TDS", alert_type="high_tds", severity="critical", channel_id=None, min_duration_seconds=0,
+        condition={"any": [{"metric": "tds", "rate": 60, "op": ">", "value": 20}, {"metric": "tds", "op": ">", "value": 150}]},
+    ), CONFIG)
+    (hit,) = RuleSet([rule]).evaluate(batch(tds=[100, 155])).active()
+    assert (rule.metric, rule.threshold) == ("tds", 150.0)
+    assert hit["value"] == 155.0
+
+
+def test_default_rules_match_the_windowed_rules():
+    rng = np.random.default_rng(7)
+    tds = rng.normal(145, 12, 400)
+    tds[rng.random(400) < 0.05] = np.nan
+    readings = {"1": [{"entry_id": i, "created_at": from_epoch(T0 + 15 * i), "tds": v, "temp": 30.0, "voltage": 3.3}
+                      for i, v in enumerate(tds.tolist())]}
+    rules = [
+        compile_rule(SimpleNamespace(channel_id=None, min_duration_seconds=60, **rule), CONFIG)
+        for rule in DEFAULT_RULES
+    ]
+    # Split in two to carry state across batches as the monitor does
+    first = RuleSet(rules).evaluate(ReadingBatch({"1": readings["1"][:150]}))
+    second = RuleSet(rules).evaluate(ReadingBatch({"1": readings["1"][150:]}), first.final_state)
+    ts, metrics = readings_columns(readings["1"])
+    window = evaluate_window(ts, metrics, [r._replace(min_duration_seconds=60) for r in rules_from_config(CONFIG)])
+
+    assert np.concatenate([first.breach, second.breach], axis=1).tolist() == window.breach.tolist()
+    assert np.concatenate([first.firing, second.firing], axis=1).tolist() == window.firing.tolist()
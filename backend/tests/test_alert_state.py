@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.models.database import DBAlertConfig, DBAlertHistory, SessionLocal, engine, init_db
+from app.services.alert_state import AlertStateCache, get_alert_state
+
+
+@pytest.fixture
+def db():
+    init_db()
+    session = SessionLocal()
+    session.query(DBAlertHistory).delete()
+    session.query(DBAlertConfig).delete()
+    session.commit()
+    yield session
+    session.close()
+    # The shared cache may hold the row deleted above
+    get_alert_state().invalidate()
+
+
+@pytest.fixture
+def queries():
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", count)
+    yield statements
+    event.remove(engine, "before_cursor_execute", count)
+
+
+def test_config_is_served_from_memory(db, queries):
+    state = AlertStateCache(revalidate_seconds=3600)
+    config = state.config(db)
+    assert config.tds_threshold == 150.0
+    before = len(queries)
+    for _ in range(100):
+        assert state.config(db) is config
+    assert len(queries) == before and state.stats()["loads"] == 1
+
+
+def test_changes_from_elsewhere_are_picked_up_on_revalidation(db):
+    state = AlertStateCache(revalidate_seconds=0)
+    state.config(db)
+    other = SessionLocal()
+    other.query(DBAlertConfig).update({"tds_threshold": 180.0, "updated_at": datetime.utcnow() + timedelta(seconds=1)})
+    other.commit()
+    other.close()
+
+    assert state.config(db).tds_threshold == 180.0
+    assert state.stats()["reloads_on_change"] == 1
+
+
+def test_updates_are_written_through(db):
+    state = AlertStateCache(revalidate_seconds=3600)
+    state.config(db)
+    assert state.update_config(db, cooldown_minutes=5).cooldown_minutes == 5
+    assert db.query(DBAlertConfig).one().cooldown_minutes == 5
+    with pytest.raises(ValueError):
+        state.update_config(db, version=None)
+
+
+def test_cooldowns_are_per_type_and_survive_a_reload(db):
+    state = AlertStateCache(revalidate_seconds=0)
+    version = state.config(db).version
+    now = datetime.utcnow()
+    state.record_alert(db, "high_tds", now)
+    db.add(DBAlertHistory(alert_type="high_tds", severity="critical", message="m", recipient_count=1, created_at=now))
+    db.commit()
+
+    # Recording an alert is not a config change
+    assert state.config(db).version == version and state.stats()["reloads_on_change"] == 0
+    assert state.cooldown_remaining("high_tds", now) == timedelta(minutes=15)
+    assert state.cooldown_remaining("high_temp", now) == timedelta(0)
+    assert state.config(db).last_alert_time == now
+
+    restarted = AlertStateCache()
+    restarted.config(db)
+    assert restarted.cooldown_remaining("high_tds", now + timedelta(minutes=5)) == timedelta(minutes=10)
@@ -0,0 +1,51 @@
+import numpy as np
+
+from app.services.alert_window import RuleState, ThresholdRule, evaluate_window
+
+T0 = 1_700_000_000
+TDS = ThresholdRule("high_tds", "TDS", "tds", "above", 150.0, 135.0, "critical", 60.0)
+VOLTAGE = ThresholdRule("low_voltage", "Voltage", "voltage", "below", 3.0, 3.1, "warning", 0.0)
+
+
+def run(values, rule=TDS, initial=None, start=T0):
+    ts = start + 15 * np.arange(len(values))
+    return evaluate_window(ts, {rule.metric: np.array(values, dtype=np.float64)}, [rule], initial)
+
+
+def test_breach_clears_only_past_the_exit_threshold():
+    evaluation = run([140, 155, 145, 140, 136, 134, 145])
+    assert evaluation.breach[0].tolist() == [False, True, True, True, True, False, False]
+
+
+def test_below_rule_mirrors_hysteresis():
+    evaluation = run([3.2, 2.9, 3.05, 3.1, 3.05], rule=VOLTAGE)
+    assert evaluation.breach[0].tolist() == [False, True, True, False, False]
+
+
+def test_breach_fires_once_sustained():
+    # 15 s readings: the breach starting at index 1 has lasted 60 s at index 5
+    evaluation = run([140, 155, 156, 157, 158, 159, 160])
+    assert evaluation.firing[0].tolist() == [False, False, False, False, False, True, True]
+    assert evaluation.active() == [TDS]
+
+
+def test_short_blips_never_fire():
+    evaluation = run([155, 120, 155, 120, 155, 120] * 3)
+    assert not evaluation.firing.any()
+    assert evaluation.active() == []
+
+
+def test_missing_values_hold_the_state():
+    evaluation = run([155, np.nan, np.nan, 120, np.nan])
+    assert evaluation.breach[0].tolist() == [True, True, True, False, False]
+
+
+def test_state_carries_across_windows():
+    values = [140, 155, 156, 145, 146, 147, 148, 120]
+    whole = run(values)
+    first = run(values[:3])
+    second = run(values[3:], initial=first.final_state, start=T0 + 45)
+
+    assert first.final_state["high_tds"] == RuleState(True, T0 + 15)
+    assert np.concatenate([first.firing, second.firing], axis=1).tolist() == whole.firing.tolist()
+    assert second.final_state["high_tds"] == RuleState()
@@ -0,0 +1,132 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.database.readings import ReadingDB, from_epoch
+from app.services import anomaly
+from app.services.anomaly import AnomalyDetector
+from app.services.ingestion import IncrementalIngestor, ReadingBuffer
+from app.services.thingspeak import parse_feeds
+from scripts.mock_thingspeak import SyntheticChannel
+
+T0 = 1_700_000_000
+
+
+def readings(values, first_entry_id=1):
+    return [
+        {"entry_id": i, "created_at": from_epoch(T0 + 15 * i), "tds": v}
+        for i, v in enumerate(values, start=first_entry_id)
+    ]
+
+
+def steady(n, seed=1):
+    return (120 + np.random.default_rng(seed).normal(0, 1, n)).tolist()
+
+
+def test_spike_is_flagged_after_warmup():
+    detector = AnomalyDetector(metrics=["tds"])
+    assert detector.process("1", readings(steady(200))) == []
+
+    (hit,) = detector.process("1", readings([160.0], first_entry_id=201))
+    assert hit["value"] == 160.0
+    assert {"ewma", "mad"} <= set(hit["methods"])
+    assert abs(hit["expected"] - 120) < 1
+
+
+def test_nothing_is_flagged_during_warmup():
+    detector = AnomalyDetector(metrics=["tds"])
+    values = steady(settings.ANOMALY_WARMUP_READINGS)
+    values[30] = 500.0
+    assert detector.process("1", readings(values)) == []
+
+
+def test_slow_drift_trips_cusum():
+    detector = AnomalyDetector(metrics=["tds"])
+    detector.process("1", readings(steady(200)))
+    # +0.1 ppm per reading: never a spike, but the level keeps moving
+    drift = [v + 0.1 * i for i, v in enumerate(steady(300, seed=2))]
+    found = detector.process("1", readings(drift, first_entry_id=201))
+    assert any("cusum_up" in hit["methods"] for hit in found)
+    assert not any("cusum_down" in hit["methods"] for hit in found)
+
+
+def test_replayed_entries_are_ignored():
+    detector = AnomalyDetector(metrics=["tds"])
+    batch = readings(steady(100))
+    detector.process("1", batch)
+    detector.process("1", batch)
+    assert detector.stats()["readings"] == 100
+
+
+def feed(entry_id, tds):
+    return {"entry_id": entry_id, "created_at": from_epoch(T0 + 15 * entry_id),
+            "field1": "3.3", "field2": tds, "field3": "25.0"}
+
+
+def test_gaps_in_a_poll_are_not_read_as_zero():
+    ingestor = IncrementalIngestor(ReadingBuffer(maxlen=1000), channel_id="1")
+    detector = AnomalyDetector(ingestor, metrics=["tds"])
+    feeds = [feed(i, str(v)) for i, v in enumerate(steady(200), start=1)]
+    feeds += [feed(201, ""), feed(202, None), feed(203, "120.5")]
+
+    appended = ingestor.buffer.extend(parse_feeds(feeds))
+    assert appended[-2]["tds"] == 0.0
+    observed = parse_feeds(feeds, missing=None)
+    ingestor._notify({"new": len(appended), "readings": appended, "observed": observed})
+
+    assert detector.anomalies == 0
+    assert detector.stats()["readings"] == 203
+
+
+def test_warm_up_neither_flags_nor_learns_gaps():
+    channel = "anomaly-warmup"
+    history = readings(steady(300))
+    for reading in history[24::25]:
+        reading["tds"] = None
+    ReadingDB.insert_many(channel, [{**r, "voltage": 3.3, "temp": 25.0} for r in history])
+    ingestor = IncrementalIngestor(ReadingBuffer(maxlen=1000), channel_id=channel)
+    ingestor.hydrate()
+    assert ingestor.buffer.snapshot()[24]["tds"] == 0.0
+    detector = AnomalyDetector(ingestor, metrics=["tds"])
+
+    (new,) = readings([120.5], first_entry_id=301)
+    ingestor._notify({"new": 1, "readings": [new], "observed": [new]})
+
+    assert detector.anomalies == 0 and list(detector.recent) == []
+    assert detector.stats()["readings"] == 1
+    (state,) = detector._devices[channel].metrics
+    assert state.count == 301 - 12 and min(state.ordered) > 100
+
+
+def test_disabled_detector_is_never_created(monkeypatch, app_client):
+    monkeypatch.setattr(settings, "ANOMALY_ENABLED", False)
+    monkeypatch.setattr(anomaly, "_anomaly_detector", None)
+
+    assert anomaly.get_anomaly_detector() is None
+    assert app_client.get("/api/v1/anomalies").json()["status"] == "disabled"
+    assert app_client.get("/api/v1/metrics").json()["anomaly"] == {"enabled": False}
+    assert anomaly._anomaly_detector is None
+
+
+@pytest.fixture
+def channel():
+    """A day of readings, a fifth of them with one empty field"""
+    return SyntheticChannel(channel_id=1, history_seconds=86400, frozen=True, gap_rate=0.2)
+
+
+def test_poll_passes_missing_fields_as_none(channel, thingspeak):
+    buffer = ReadingBuffer(maxlen=1000)
+    buffer.extend(parse_feeds([channel.feed(channel.last_entry_id() - 100)]))
+    ingestor = IncrementalIngestor(buffer, client=thingspeak, channel_id="1")
+    result = asyncio.run(ingestor.poll())
+
+    assert [r["entry_id"] for r in result["observed"]] == [r["entry_id"] for r in result["readings"]]
+    gaps = [(r, o) for r, o in zip(result["readings"], result["observed"]) if None in o.values()]
+    assert gaps
+    for reading, observed in gaps:
+        assert all(reading[key] == 0.0 for key, value in observed.items() if value is None)
+    # The store keeps the gaps as NULL
+    stored = {r["entry_id"]: r for r in ReadingDB.latest("1", limit=len(result["readings"]), missing=None)}
+    assert all(stored[o["entry_id"]] == o for _, o in gaps)
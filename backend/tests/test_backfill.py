@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.database.readings import BackfillCheckpointDB, ReadingDB
+from app.services.backfill import BackfillJob
+from app.services.circuit_breaker import CLOSED
+from app.services.thingspeak import ThingSpeakClient
+from scripts.mock_thingspeak import SyntheticChannel
+
+DAY = 86400
+
+
+def utc(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc)
+
+
+@pytest.fixture
+def channel():
+    """Long enough that any two-day grid window before today is fully covered"""
+    return SyntheticChannel(channel_id=1, history_seconds=8 * DAY, frozen=True)
+
+
+@pytest.fixture
+def span(channel):
+    """The channel's two most recent complete days"""
+    today = channel.entry_ts(channel.last_entry_id()) // DAY * DAY
+    return today - 2 * DAY, today
+
+
+def expected_ids(channel, start_ts, end_ts):
+    return list(range(channel.entry_at_or_after(start_ts), channel.entry_at_or_before(end_ts - 1) + 1))
+
+
+def stored_ids(name):
+    return [r["entry_id"] for r in ReadingDB.latest(name, limit=100000)]
+
+
+def test_windows_follow_a_fixed_grid():
+    job = BackfillJob(utc(DAY + 100), utc(3 * DAY + 50), channel_id="grid", window_seconds=DAY)
+    assert job.windows() == [(DAY + 100, 2 * DAY), (2 * DAY, 3 * DAY), (3 * DAY, 3 * DAY + 50)]
+
+
+def test_backfill_stores_the_range_and_resumes(channel, thingspeak, span):
+    name = "backfill-resume"
+    job = BackfillJob(utc(span[0]), utc(span[1]), channel_id=name, client=thingspeak)
+    status = asyncio.run(job.run())
+
+    assert status["state"] == "completed" and status["windows_done"] == 2
+    assert stored_ids(name) == expected_ids(channel, *span)
+    assert BackfillCheckpointDB.completed(name, *span) == {(span[0], span[0] + DAY), (span[0] + DAY, span[1])}
+
+    calls = len(thingspeak.calls)
+    rerun = asyncio.run(BackfillJob(utc(span[0]), utc(span[1]), channel_id=name, client=thingspeak).run())
+    assert rerun["windows_skipped"] == 2 and len(thingspeak.calls) == calls
+
+
+def test_truncated_windows_are_split(channel, thingspeak, span):
+    # One window of two days: more than one ThingSpeak response holds
+    name = "backfill-split"
+    start = (span[0] - DAY) // (2 * DAY) * (2 * DAY)
+    job = BackfillJob(utc(start), utc(start + 2 * DAY), channel_id=name, client=thingspeak, window_seconds=2 * DAY)
+    status = asyncio.run(job.run())
+    assert status["windows_total"] == 1 and status["splits"] >= 1
+    assert stored_ids(name) == expected_ids(channel, start, start + 2 * DAY)
+
+
+def test_upstream_errors_open_only_the_jobs_breaker(monkeypatch, span):
+    monkeypatch.setattr(settings, "BACKFILL_RETRY_BACKOFF_SECONDS", 0.0)
+    monkeypatch.setattr(settings, "CIRCUIT_RECOVERY_SECONDS", 0.01)
+    client = ThingSpeakClient(transport=httpx.MockTransport(lambda request: httpx.Response(429)), hedge=False)
+
+    async def run():
+        try:
+            job = BackfillJob(utc(span[0]), utc(span[0] + 60), channel_id="backfill-429", client=client, max_retries=6)
+            return await job.run()
+        finally:
+            await client.aclose()
+    status = asyncio.run(run())
+
+    assert status["state"] == "failed"
+    assert status["circuit_breaker"]["times_opened"] >= 1
+    assert client.breaker.state == CLOSED and client.breaker.total_failures == 0
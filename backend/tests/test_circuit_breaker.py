@@ -0,0 +1,72 @@
+import pytest
+
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _fail(breaker, times):
+    for _ in range(times):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures_and_rejects(clock):
+    breaker = CircuitBreaker("t", failure_threshold=3, recovery_seconds=30)
+    _fail(breaker, 2)
+    assert breaker.state == CLOSED
+    _fail(breaker, 1)
+    assert breaker.state == OPEN
+
+    clock[0] += 10
+    with pytest.raises(CircuitOpenError) as e:
+        breaker.before_call()
+    assert e.value.retry_after == pytest.approx(20)
+    assert breaker.stats()["total_rejected"] == 1
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker("t", failure_threshold=3)
+    _fail(breaker, 2)
+    breaker.record_success()
+    _fail(breaker, 2)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_admits_one_probe_and_closes_on_success(clock):
+    breaker = CircuitBreaker("t", failure_threshold=1, recovery_seconds=30)
+    _fail(breaker, 1)
+    clock[0] += 30
+    assert breaker.state == HALF_OPEN
+
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_reopens_for_a_full_recovery_period(clock):
+    breaker = CircuitBreaker("t", failure_threshold=2, recovery_seconds=30)
+    _fail(breaker, 2)
+    clock[0] += 30
+    _fail(breaker, 1)
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 2
+    clock[0] += 29
+    assert breaker.state == OPEN
+
+
+def test_released_probe_frees_the_half_open_slot(clock):
+    breaker = CircuitBreaker("t", failure_threshold=1, recovery_seconds=5)
+    _fail(breaker, 1)
+    clock[0] += 5
+    breaker.before_call()
+    breaker.release()
+    breaker.before_call()
@@ -0,0 +1,68 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from app.api.v1 import endpoints
+from app.core.config import settings
+from app.database.readings import to_epoch
+from app.services import columnar
+from app.services.columnar import COLUMNAR_MEDIA_TYPE, encode_columns, wants_columnar
+from app.services.ingestion import ReadingBuffer
+from app.services.thingspeak import parse_feeds
+
+
+def decode(columns):
+    """Inverse of encode_columns' delta coding"""
+    ts = (columns["ts_base"] + np.cumsum(columns["ts_delta"])).tolist()
+    ids = (columns["entry_id_base"] + np.cumsum(columns["entry_id_delta"])).tolist()
+    return ts, ids
+
+
+@pytest.fixture
+def buffer(channel, monkeypatch):
+    buffer = ReadingBuffer(maxlen=100)
+    newest = channel.last_entry_id()
+    buffer.extend(parse_feeds([channel.feed(i) for i in range(newest - 99, newest + 1)]))
+    monkeypatch.setattr(endpoints, "get_reading_buffer", lambda: buffer)
+    monkeypatch.setattr(settings, "DASHBOARD_RENDER_CACHE", False)
+    return buffer
+
+
+def test_format_parameter_wins_over_accept():
+    assert wants_columnar("columnar", None)
+    assert not wants_columnar("rows", COLUMNAR_MEDIA_TYPE)
+    assert wants_columnar(None, f"{COLUMNAR_MEDIA_TYPE}, application/json")
+    assert not wants_columnar(None, "application/json")
+
+
+def test_columns_round_trip(buffer):
+    readings = buffer.snapshot()
+    columns = encode_columns(readings)
+    ts, ids = decode(columns)
+    assert columns["count"] == len(readings)
+    assert ts == [to_epoch(r["created_at"]) for r in readings]
+    assert ids == [r["entry_id"] for r in readings]
+    assert columns["tds"] == [r["tds"] for r in readings]
+    assert encode_columns([])["count"] == 0
+
+
+def test_dashboard_serves_columnar_history(app_client, buffer):
+    rows = app_client.get("/api/v1/dashboard").json()
+    response = app_client.get("/api/v1/dashboard", headers={"Accept": COLUMNAR_MEDIA_TYPE})
+    assert response.headers["content-type"] == COLUMNAR_MEDIA_TYPE
+    body = response.json()
+    assert body["format"] == "columnar"
+    assert body["history"]["tds"] == [row["tds"] for row in rows["history"]]
+    assert body["cursor"] == rows["cursor"] == buffer.last_entry_id
+
+
+def test_stdlib_fallback_matches_orjson(monkeypatch):
+    payload = {
+        "naive": datetime(2024, 1, 1, 1, 2, 3, 456000),
+        "aware": datetime(2024, 1, 1, tzinfo=timezone.utc),
+        "values": [1, None, 2.5],
+    }
+    fast = columnar.dumps(payload)
+    monkeypatch.setattr(columnar, "orjson", None)
+    assert columnar.dumps(payload) == fast
@@ -0,0 +1,94 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core import compression
+from app.core.compression import CompressionMiddleware, CompressionPolicy, negotiate
+
+BODY = "reading,tds,temp\n" * 500
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.get("/big")
+    def big():
+        return PlainTextResponse(BODY, headers={"ETag": '"v1"'})
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("ok")
+
+    @app.get("/chunks")
+    def chunks():
+        return StreamingResponse(iter([BODY, BODY]), media_type="text/csv")
+
+    @app.get("/events")
+    def events():
+        return StreamingResponse(iter(["data: 1\n\n" * 200]), media_type="text/event-stream")
+
+    @app.get("/raw/big")
+    def raw():
+        return PlainTextResponse(BODY)
+
+    @app.get("/cached")
+    def cached():
+        return Response(status_code=304)
+
+    app.add_middleware(
+        CompressionMiddleware,
+        routes=(("/raw", None),),
+        default=CompressionPolicy(1024, 6, 4),
+    )
+    with TestClient(app) as client:
+        yield client
+
+
+def get(client, path, coding="gzip"):
+    return client.get(path, headers={"Accept-Encoding": coding})
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate", "gzip"),
+    ("gzip;q=0, deflate", None),
+    ("identity", None),
+    ("*", "gzip"),
+    ("*;q=0.5, gzip;q=0", None),
+    ("", None),
+])
+def test_negotiation(header, expected, monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert negotiate(header) == expected
+
+
+def test_brotli_wins_ties_when_installed(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", object())
+    assert negotiate("gzip, br") == "br"
+    assert negotiate("gzip, br;q=0.5") == "gzip"
+
+
+def test_large_responses_are_compressed(client):
+    response = get(client, "/big")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) == response.num_bytes_downloaded < len(BODY)
+    assert response.headers["etag"] == 'W/"v1"'
+    assert response.text == BODY
+
+
+def test_small_and_unwanted_responses_pass_through(client):
+    small = get(client, "/small")
+    assert "content-encoding" not in small.headers and small.headers["vary"] == "Accept-Encoding"
+    assert "content-encoding" not in get(client, "/big", coding="identity").headers
+    assert "content-encoding" not in get(client, "/raw/big").headers
+    assert "content-encoding" not in get(client, "/events").headers
+    assert get(client, "/cached").status_code == 304
+
+
+def test_streamed_responses_are_compressed_per_chunk(client):
+    response = get(client, "/chunks")
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text == BODY * 2
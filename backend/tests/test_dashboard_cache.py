@@ -0,0 +1,74 @@
+import pytest
+
+from app.api.v1 import endpoints
+from app.core.config import settings
+from app.services.dashboard_cache import DashboardResponseCache, etag_matches, get_dashboard_cache
+from app.services.ingestion import ReadingBuffer
+from app.services.thingspeak import parse_feeds
+
+
+@pytest.mark.parametrize("header, matches", [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"x", "abc"', True),
+    ("*", True),
+    ('"abcd"', False),
+    (None, False),
+])
+def test_etag_comparison_is_weak(header, matches):
+    assert etag_matches(header, '"abc"') is matches
+    assert etag_matches(header, 'W/"abc"') is matches
+
+
+def test_each_format_renders_once_per_key():
+    cache = DashboardResponseCache()
+    renders = []
+
+    def render(fmt):
+        return lambda: renders.append(fmt) or (fmt.encode(), "application/json")
+    first = cache.get((1, False), "rows", render("rows"))
+    assert cache.get((1, False), "rows", render("rows")) is first
+    cache.get((1, False), "columnar", render("columnar"))
+    cache.get((2, False), "rows", render("rows"))
+    assert renders == ["rows", "columnar", "rows"]
+    assert cache.stats()["hits"] == 1 and cache.stats()["formats_cached"] == 1
+
+
+@pytest.fixture
+def buffer(channel, monkeypatch):
+    buffer = ReadingBuffer(maxlen=100)
+    newest = channel.last_entry_id()
+    buffer.extend(parse_feeds([channel.feed(i) for i in range(newest - 99, newest)]))
+    monkeypatch.setattr(endpoints, "get_reading_buffer", lambda: buffer)
+    monkeypatch.setattr(settings, "DASHBOARD_RENDER_CACHE", True)
+    get_dashboard_cache().clear()
+    yield buffer
+    get_dashboard_cache().clear()
+
+
+def test_unchanged_dashboard_is_not_modified(app_client, buffer, channel):
+    first = app_client.get("/api/v1/dashboard", headers={"Accept-Encoding": "identity"})
+    etag = first.headers["etag"]
+    again = app_client.get("/api/v1/dashboard", headers={"If-None-Match": etag, "Accept-Encoding": "identity"})
+    assert again.status_code == 304 and again.headers["etag"] == etag
+
+    buffer.extend(parse_feeds([channel.feed(channel.last_entry_id())]))
+    changed = app_client.get("/api/v1/dashboard", headers={"If-None-Match": etag, "Accept-Encoding": "identity"})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert changed.json()["cursor"] == channel.last_entry_id()
+
+
+def test_compressed_etag_still_revalidates(app_client, buffer):
+    compressed = app_client.get("/api/v1/dashboard", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["etag"].startswith("W/")
+    revalidated = app_client.get("/api/v1/dashboard", headers={"If-None-Match": compressed.headers["etag"]})
+    assert revalidated.status_code == 304
+
+
+def test_formats_have_their_own_etags(app_client, buffer):
+    renders = get_dashboard_cache().renders
+    rows = app_client.get("/api/v1/dashboard", headers={"Accept-Encoding": "identity"})
+    columnar = app_client.get("/api/v1/dashboard", params={"format": "columnar"}, headers={"Accept-Encoding": "identity"})
+    assert rows.headers["etag"] != columnar.headers["etag"]
+    app_client.get("/api/v1/dashboard", headers={"Accept-Encoding": "identity"})
+    assert get_dashboard_cache().renders - renders == 2
@@ -0,0 +1,68 @@
+import pytest
+
+from app.api.v1 import endpoints
+from app.core.config import settings
+from app.services.ingestion import ReadingBuffer
+from app.services.thingspeak import parse_feeds
+
+
+@pytest.fixture
+def buffer(channel, monkeypatch):
+    """Buffer holding the channel's newest 200 entries, served by /dashboard"""
+    buffer = ReadingBuffer(maxlen=200)
+    newest = channel.last_entry_id()
+    buffer.extend(parse_feeds([channel.feed(i) for i in range(newest - 199, newest + 1)]))
+    monkeypatch.setattr(endpoints, "get_reading_buffer", lambda: buffer)
+    monkeypatch.setattr(settings, "DASHBOARD_HISTORY_SIZE", 60)
+    return buffer
+
+
+def _ids(body, buffer):
+    """entry_ids of the history rows (row responses carry created_at, not entry_id)"""
+    by_time = {r["created_at"]: r["entry_id"] for r in buffer.snapshot()}
+    return [by_time[row["created_at"]] for row in body["history"]]
+
+
+def test_delta_pages_forward_without_skipping(app_client, buffer):
+    cursor = buffer.oldest_entry_id() + 9
+    seen = []
+    for _ in range(10):
+        body = app_client.get("/api/v1/dashboard", params={"since_entry_id": cursor}).json()
+        assert body["delta"] and not body["reset"]
+        seen += _ids(body, buffer)
+        cursor = body["cursor"]
+        if not body["has_more"]:
+            break
+
+    assert seen == list(range(buffer.oldest_entry_id() + 10, buffer.last_entry_id + 1))
+    assert cursor == buffer.last_entry_id
+
+
+def test_first_delta_page_is_the_oldest_rows(app_client, buffer):
+    start = buffer.oldest_entry_id()
+    body = app_client.get("/api/v1/dashboard", params={"since_entry_id": start}).json()
+    assert _ids(body, buffer) == list(range(start + 1, start + 61))
+    assert body["cursor"] == start + 60
+    assert body["has_more"]
+
+
+def test_caught_up_delta_is_empty(app_client, buffer):
+    body = app_client.get("/api/v1/dashboard", params={"since_entry_id": buffer.last_entry_id}).json()
+    assert body["history"] == [] and not body["has_more"] and not body["reset"]
+    assert body["cursor"] == buffer.last_entry_id
+
+
+def test_cursor_older_than_the_buffer_resets(app_client, buffer):
+    body = app_client.get("/api/v1/dashboard", params={"since_entry_id": buffer.oldest_entry_id() - 5}).json()
+    assert body["reset"] and not body["delta"]
+    assert _ids(body, buffer) == list(range(buffer.last_entry_id - 59, buffer.last_entry_id + 1))
+    assert body["cursor"] == buffer.last_entry_id
+
+
+def test_since_timestamp_before_the_buffer_resets(app_client, buffer, channel):
+    oldest = buffer.snapshot()[0]["created_at"]
+    covered = app_client.get("/api/v1/dashboard", params={"since": oldest}).json()
+    assert not covered["reset"] and _ids(covered, buffer)[0] == buffer.oldest_entry_id() + 1
+
+    before = app_client.get("/api/v1/dashboard", params={"since": "2000-01-01T00:00:00Z"}).json()
+    assert before["reset"]
@@ -0,0 +1,54 @@
+import numpy as np
+
+from app.database.readings import to_epoch
+from app.services.feed_decoder import columns_from_rows, decode_feeds, decode_timestamps
+from app.services.thingspeak import parse_feeds
+
+
+def test_decoding_matches_parse_feeds(channel):
+    newest = channel.last_entry_id()
+    feeds = [channel.feed(i) for i in range(newest - 500, newest + 1)]
+    columns = decode_feeds(feeds)
+    assert columns.to_readings() == parse_feeds(feeds)
+
+
+def test_bad_fields_are_masked_not_dropped():
+    feeds = [
+        {"entry_id": 1, "created_at": "2024-01-01T00:00:00Z", "field1": "3.3", "field2": "", "field3": "25"},
+        {"entry_id": 2, "created_at": "2024-01-01T00:00:15Z", "field1": "x", "field2": None, "field3": "nan"},
+        {"entry_id": 3, "created_at": "2024-01-01T00:00:30Z", "field1": "3.2", "field2": "120"},
+    ]
+    columns = decode_feeds(feeds)
+    assert columns.entry_id.tolist() == [1, 2, 3]
+    assert columns.voltage.mask.tolist() == [False, True, False]
+    assert columns.tds.mask.tolist() == [True, True, False]
+    assert columns.temp.mask.tolist() == [False, True, True]
+
+
+def test_rows_are_ordered_and_unplaceable_ones_dropped():
+    feeds = [
+        {"entry_id": 3, "created_at": "2024-01-01T00:00:30Z", "field2": "3"},
+        {"entry_id": None, "created_at": "2024-01-01T00:00:20Z", "field2": "9"},
+        {"entry_id": 1, "created_at": "2024-01-01T00:00:00Z", "field2": "1"},
+        {"entry_id": 2, "created_at": None, "field2": "2"},
+    ]
+    columns = decode_feeds(feeds)
+    assert columns.entry_id.tolist() == [1, 3]
+    assert columns.tds.tolist() == [1.0, 3.0]
+
+
+def test_timestamps_match_to_epoch():
+    fixed = ["1970-01-01T00:00:00Z", "2000-02-29T23:59:59Z", "2024-03-01T00:00:00Z", "2100-03-01T12:30:00Z"]
+    assert decode_timestamps(fixed).tolist() == [to_epoch(v) for v in fixed]
+    # Other shapes take the per-value path
+    mixed = ["2024-01-01T05:30:00+05:30", "2024-01-01T00:00:00Z"]
+    assert decode_timestamps(mixed).tolist() == [to_epoch(v) for v in mixed]
+    assert decode_timestamps([None, "2024-01-01T00:00:00Z"])[0] == -1
+
+
+def test_stored_nulls_come_back_masked():
+    columns = columns_from_rows([(1, 100, 3.3, None, 25.0), (2, 115, None, 120.0, 25.1)])
+    assert columns.ts.tolist() == [100, 115]
+    assert columns.tds.mask.tolist() == [True, False]
+    assert np.ma.getmaskarray(columns.voltage).tolist() == [False, True]
+    assert len(columns_from_rows([])) == 0
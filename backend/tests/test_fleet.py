@@ -0,0 +1,47 @@
+import asyncio
+
+import httpx
+
+from app.services import fleet
+from app.services.circuit_breaker import CLOSED, OPEN
+from app.services.fleet import FleetMonitor
+from app.services.thingspeak import ThingSpeakClient
+
+
+def _handler(request: httpx.Request) -> httpx.Response:
+    channel = request.url.path.split("/")[2]
+    if channel == "9001":
+        return httpx.Response(500)
+    if channel == "9002":
+        # Valid JSON, but not a feed document
+        return httpx.Response(200, json=[])
+    return httpx.Response(200, json={"feeds": [
+        {"created_at": "2026-01-01T00:00:00Z", "entry_id": 7, "field1": "3.3", "field2": "120", "field3": "25"}
+    ]})
+
+
+def _device(channel_id):
+    return {"id": channel_id, "name": f"site {channel_id}", "channel_id": channel_id, "read_key": ""}
+
+
+def test_bad_devices_are_marked_without_failing_the_overview(monkeypatch):
+    client = ThingSpeakClient(http2=False, hedge=False, transport=httpx.MockTransport(_handler))
+    monkeypatch.setattr(fleet, "get_thingspeak_client", lambda: client)
+    monitor = FleetMonitor(concurrency=4, ttl_seconds=0)
+    devices = [_device("9001"), _device("9002"), _device("9003")]
+
+    async def run():
+        for _ in range(6):
+            overview = await monitor.overview(devices)
+        return overview
+
+    overview = asyncio.run(run())
+    by_channel = {d["channel_id"]: d for d in overview["devices"]}
+
+    assert by_channel["9003"]["tds"] == 120.0 and "error" not in by_channel["9003"]
+    assert by_channel["9001"]["stale"] and "open" in by_channel["9001"]["error"]
+    assert by_channel["9002"]["stale"] and "has no attribute" in by_channel["9002"]["error"]
+    # Only the failing channel's own breaker opened; the shared one ingestion uses did not
+    assert monitor._breakers["9001"].state == OPEN
+    assert monitor._breakers["9003"].state == CLOSED
+    assert client.breaker.state == CLOSED and client.breaker.total_failures == 0
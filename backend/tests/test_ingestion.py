@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services import backfill
+from app.services.ingestion import THINGSPEAK_MAX_RESULTS, IncrementalIngestor, ReadingBuffer
+from app.services.thingspeak import parse_feeds
+
+
+def _ingestor(channel, thingspeak, behind: int, maxlen: int = 30000):
+    """Ingestor whose cursor sits `behind` entries before the channel's newest"""
+    buffer = ReadingBuffer(maxlen=maxlen)
+    cursor = channel.last_entry_id() - behind
+    buffer.extend(parse_feeds([channel.feed(cursor)]))
+    return IncrementalIngestor(buffer, client=thingspeak, channel_id="1"), cursor
+
+
+def test_poll_only_asks_for_entries_since_the_cursor(channel, thingspeak):
+    ingestor, cursor = _ingestor(channel, thingspeak, behind=10)
+    result = asyncio.run(ingestor.poll())
+
+    assert result["new"] == 10
+    assert [r["entry_id"] for r in result["readings"]] == list(range(cursor + 1, cursor + 11))
+    assert len(thingspeak.calls) == 1 and "start" in thingspeak.calls[0]
+
+
+def test_capped_poll_pages_back_to_the_cursor(channel, thingspeak, monkeypatch):
+    monkeypatch.setattr(backfill, "start_backfill", lambda job: pytest.fail("no backfill expected"))
+    behind = 2 * THINGSPEAK_MAX_RESULTS + 500
+    ingestor, cursor = _ingestor(channel, thingspeak, behind=behind)
+    result = asyncio.run(ingestor.poll())
+
+    ids = [r["entry_id"] for r in result["readings"]]
+    assert ids == list(range(cursor + 1, cursor + behind + 1))
+    assert ingestor.gap_pages == 2
+    assert ingestor.gaps_handed_off == 0
+
+
+def test_gap_beyond_max_pages_goes_to_backfill(channel, thingspeak, monkeypatch):
+    jobs = []
+    monkeypatch.setattr(backfill, "start_backfill", jobs.append)
+    monkeypatch.setattr(settings, "INGEST_GAP_MAX_PAGES", 1)
+    behind = 3 * THINGSPEAK_MAX_RESULTS
+    ingestor, cursor = _ingestor(channel, thingspeak, behind=behind)
+    result = asyncio.run(ingestor.poll())
+
+    ids = [r["entry_id"] for r in result["readings"]]
+    oldest = ids[0]
+    # Pages overlap by the boundary second, so two pages hold a little under 16000
+    assert ids == list(range(oldest, channel.last_entry_id() + 1))
+    assert oldest - cursor > THINGSPEAK_MAX_RESULTS
+    assert ingestor.gaps_handed_off == 1
+    (job,) = jobs
+    # The job covers the cursor's second up to and including the oldest polled entry
+    assert job.start_ts == channel.entry_ts(cursor)
+    assert job.end_ts == channel.entry_ts(oldest) + 1
@@ -0,0 +1,72 @@
+import random
+import time
+
+import httpx
+import pytest
+
+from scripts.mock_thingspeak import MAX_RESULTS, MockThingSpeakServer, SyntheticChannel, parse_latency
+
+
+@pytest.fixture
+def server():
+    with MockThingSpeakServer(channel_ids=(7,), frozen=True, history_seconds=3 * 86400) as server:
+        yield server
+
+
+def test_channel_is_deterministic_and_evenly_spaced():
+    a, b = SyntheticChannel(7, frozen=True), SyntheticChannel(7, frozen=True)
+    assert a.feed(100) == b.feed(100)
+    assert a.entry_ts(101) - a.entry_ts(100) == 15
+
+
+def test_feeds_follow_thingspeak_paging(server):
+    channel = server.channel(7)
+    last = channel.last_entry_id()
+    with httpx.Client(base_url=server.url) as client:
+        default = client.get("/channels/7/feeds.json").json()["feeds"]
+        assert [f["entry_id"] for f in default] == list(range(last - 99, last + 1))
+
+        start = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(channel.entry_ts(last - 10)))
+        ranged = client.get("/channels/7/feeds.json", params={"start": start}).json()["feeds"]
+        assert [f["entry_id"] for f in ranged] == list(range(last - 10, last + 1))
+
+        whole = client.get("/channels/7/feeds.json", params={"results": 100000}).json()["feeds"]
+        assert len(whole) == MAX_RESULTS and whole[-1]["entry_id"] == last
+
+        assert client.get("/channels/7/feeds/last.json").json()["entry_id"] == last
+        assert client.get("/channels/8/feeds.json").status_code == 404
+    # One keep-alive connection served every request
+    assert server.stats()["connections"] == 1
+
+
+def test_timezone_shifts_created_at(server):
+    with httpx.Client(base_url=server.url) as client:
+        utc = client.get("/channels/7/feeds/last.json").json()
+        local = client.get("/channels/7/feeds/last.json", params={"timezone": "Asia/Kolkata"}).json()
+    assert utc["created_at"].endswith("Z") and local["created_at"].endswith("+05:30")
+
+
+def test_injected_failures():
+    with MockThingSpeakServer(channel_ids=(7,), error_rate=1.0) as server:
+        with httpx.Client(base_url=server.url) as client:
+            assert client.get("/channels/7/feeds.json").status_code == 500
+        assert server.stats()["errors"] == 1
+    with MockThingSpeakServer(channel_ids=(7,), rate_limit_rate=1.0) as server:
+        with httpx.Client(base_url=server.url) as client:
+            assert client.get("/channels/7/feeds.json").status_code == 429
+
+
+@pytest.mark.parametrize("spec, low, high", [
+    ("none", 0.0, 0.0),
+    ("fixed:40", 0.04, 0.04),
+    ("uniform:10:20", 0.01, 0.02),
+])
+def test_latency_specs(spec, low, high):
+    sample = parse_latency(spec)
+    rng = random.Random(1)
+    assert all(low <= sample(rng) <= high for _ in range(100))
+
+
+def test_bad_latency_spec_is_rejected():
+    with pytest.raises(ValueError):
+        parse_latency("fixed:1:2")
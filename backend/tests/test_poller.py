@@ -0,0 +1,71 @@
+import asyncio
+
+from app.services import poller as poller_module
+from app.services.ingestion import IncrementalIngestor, ReadingBuffer
+from app.services.poller import IngestionPoller, ensure_readings
+from app.services.thingspeak import parse_feeds
+
+
+def make_poller(channel, client, interval=0.01):
+    buffer = ReadingBuffer(maxlen=1000)
+    buffer.extend(parse_feeds([channel.feed(channel.last_entry_id() - 50)]))
+    ingestor = IncrementalIngestor(buffer, client=client, channel_id="poller-1")
+    return IngestionPoller(ingestor, interval_seconds=interval, jitter_seconds=0)
+
+
+def test_polls_on_a_schedule_until_stopped(channel, thingspeak):
+    poller = make_poller(channel, thingspeak)
+
+    async def run():
+        poller.start()
+        poller.start()
+        await asyncio.sleep(0.1)
+        assert poller.running
+        await poller.stop()
+    asyncio.run(run())
+
+    assert not poller.running
+    assert poller.polls >= 2 and poller.failures == 0
+    assert poller.ingestor.buffer.last_entry_id == channel.last_entry_id()
+    assert poller.stats()["poll_lag_seconds"] is not None
+
+
+def test_a_raising_poll_does_not_end_the_loop(channel, thingspeak):
+    class Flaky:
+        calls = 0
+
+        async def get_feeds(self, **params):
+            Flaky.calls += 1
+            if Flaky.calls == 1:
+                raise RuntimeError("boom")
+            return await thingspeak.get_feeds(**params)
+    poller = make_poller(channel, Flaky())
+
+    async def run():
+        poller.start()
+        await asyncio.sleep(0.1)
+        await poller.stop()
+    asyncio.run(run())
+
+    assert poller.failures == 1 and poller.last_error == "boom"
+    assert poller.consecutive_failures == 0 and poller.polls >= 2
+
+
+def test_request_path_polls_inline_only_without_the_poller(channel, thingspeak, monkeypatch):
+    poller = make_poller(channel, thingspeak, interval=60)
+    inline = []
+
+    async def ingest_latest():
+        inline.append(1)
+        return {"new": 0}
+    monkeypatch.setattr(poller_module, "get_poller", lambda: poller)
+    monkeypatch.setattr(poller_module, "ingest_latest", ingest_latest)
+
+    async def run():
+        await ensure_readings()
+        poller.start()
+        await asyncio.sleep(0.05)
+        await ensure_readings()
+        await poller.stop()
+    asyncio.run(run())
+    assert len(inline) == 1
@@ -0,0 +1,60 @@
+import asyncio
+import sqlite3
+
+from app.database.readings import ReadingDB, from_epoch, to_epoch
+from app.services import ingestion
+from app.services.ingestion import IncrementalIngestor, ReadingBuffer
+from app.services.thingspeak import parse_feeds
+
+T0 = 1_700_000_000
+
+
+def readings(first, last):
+    return [
+        {"entry_id": i, "created_at": from_epoch(T0 + 15 * i), "voltage": 3.3, "tds": 100.0 + i, "temp": 25.0}
+        for i in range(first, last + 1)
+    ]
+
+
+def test_inserts_ignore_entries_already_stored():
+    assert ReadingDB.insert_many("store-dedupe", readings(1, 10)) == 10
+    assert ReadingDB.insert_many("store-dedupe", readings(6, 15)) == 5
+    assert ReadingDB.count("store-dedupe") == 15
+    assert ReadingDB.max_entry_id("store-dedupe") == 15
+
+
+def test_queries_by_time_and_entry_id():
+    channel = "store-query"
+    ReadingDB.insert_many(channel, readings(1, 20))
+
+    in_range = ReadingDB.range(channel, T0 + 15 * 5, T0 + 15 * 8)
+    assert [r["entry_id"] for r in in_range] == [5, 6, 7]
+    assert in_range[0] == readings(5, 5)[0]
+    assert [r["entry_id"] for r in ReadingDB.latest(channel, limit=3)] == [18, 19, 20]
+    assert [r["entry_id"] for r in ReadingDB.after_entry_id(channel, 17)] == [18, 19, 20]
+    assert ReadingDB.max_ts(channel) == to_epoch(readings(20, 20)[0]["created_at"])
+    assert ReadingDB.latest("store-none") == [] and ReadingDB.max_entry_id("store-none") is None
+
+
+def test_polls_are_persisted_and_hydrate_a_restarted_buffer(channel, thingspeak):
+    newest = channel.last_entry_id()
+    buffer = ReadingBuffer(maxlen=100)
+    buffer.extend(parse_feeds([channel.feed(newest - 30)]))
+    result = asyncio.run(IncrementalIngestor(buffer, client=thingspeak, channel_id="store-poll").poll())
+    assert result["new"] == 30 and ReadingDB.count("store-poll") == 30
+
+    # After a restart: an empty buffer picks up the stored history and cursor
+    restarted = IncrementalIngestor(ReadingBuffer(maxlen=100), client=thingspeak, channel_id="store-poll")
+    assert restarted.hydrate() == 30
+    assert restarted.buffer.last_entry_id == newest
+    assert asyncio.run(restarted.poll())["new"] == 0
+
+
+def test_store_errors_do_not_fail_the_poll(channel, thingspeak, monkeypatch):
+    def unavailable(*args):
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(ingestion.ReadingDB, "insert_many", unavailable)
+    buffer = ReadingBuffer(maxlen=100)
+    buffer.extend(parse_feeds([channel.feed(channel.last_entry_id() - 5)]))
+    result = asyncio.run(IncrementalIngestor(buffer, client=thingspeak, channel_id="store-down").poll())
+    assert result["new"] == 5 and buffer.last_entry_id == channel.last_entry_id()
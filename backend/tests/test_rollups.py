@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from app.database.readings import ROLLUP_RESOLUTIONS, ReadingDB, RollupDB, from_epoch
+from app.services.rollups import pick_resolution, query_rollups
+
+DAY = 86400
+T0 = 1_700_000_000 // DAY * DAY
+
+
+def store(channel, ts, tds):
+    ReadingDB.insert_many(channel, [
+        {"entry_id": int(t - T0) + 1, "created_at": from_epoch(int(t)), "voltage": 3.3, "tds": v, "temp": 25.0}
+        for t, v in zip(ts.tolist(), tds)
+    ])
+
+
+def expected(ts, tds, resolution):
+    """{bucket_ts: (n, count, min, max, avg)} for the tds column"""
+    buckets = {}
+    for bucket in np.unique(ts - ts % resolution).tolist():
+        values = np.array([v for t, v in zip(ts.tolist(), tds) if t - t % resolution == bucket and v is not None])
+        n = int(((ts - ts % resolution) == bucket).sum())
+        buckets[bucket] = (
+            (n, len(values), values.min(), values.max(), round(values.mean(), 4)) if len(values)
+            else (n, 0, None, None, None)
+        )
+    return buckets
+
+
+@pytest.fixture
+def readings():
+    rng = np.random.default_rng(3)
+    ts = T0 + np.sort(rng.choice(DAY, 3000, replace=False))
+    tds = [None if rng.random() < 0.05 else round(float(v), 1) for v in rng.normal(120, 15, len(ts))]
+    return ts, tds
+
+
+def test_every_resolution_matches_the_raw_readings(readings):
+    ts, tds = readings
+    # Two halves, in reverse order: late readings refresh the buckets they land in
+    half = len(ts) // 2
+    store("rollup-all", ts[half:], tds[half:])
+    store("rollup-all", ts[:half], tds[:half])
+
+    for resolution in ROLLUP_RESOLUTIONS:
+        result = query_rollups("rollup-all", T0, T0 + DAY, resolution=resolution)
+        got = {
+            b["bucket"]: (b["count"], b["tds"]["count"], b["tds"]["min"], b["tds"]["max"], b["tds"]["avg"])
+            for b in result["buckets"]
+        }
+        assert got == {from_epoch(k): v for k, v in expected(ts, tds, resolution).items()}
+
+
+def test_rebuild_matches_incremental_rollups(readings):
+    ts, tds = readings
+    store("rollup-rebuild", ts, tds)
+    before = [RollupDB.range_rows("rollup-rebuild", r, T0, T0 + DAY) for r in ROLLUP_RESOLUTIONS]
+    RollupDB.rebuild("rollup-rebuild")
+    after = [RollupDB.range_rows("rollup-rebuild", r, T0, T0 + DAY) for r in ROLLUP_RESOLUTIONS]
+    for rebuilt, incremental in zip(after, before):
+        np.testing.assert_allclose(np.array(rebuilt, dtype=float), np.array(incremental, dtype=float))
+
+
+def test_buckets_without_values_report_none():
+    ts = np.array([T0 + 5, T0 + 65])
+    store("rollup-empty", ts, [None, 100.0])
+    (first, second) = query_rollups("rollup-empty", T0, T0 + 120, resolution=60)["buckets"]
+    assert first["count"] == 1 and first["tds"] == {"count": 0, "min": None, "max": None, "avg": None, "std": None}
+    assert second["tds"]["avg"] == 100.0 and second["tds"]["std"] == 0.0
+
+
+def test_auto_resolution_is_the_coarsest_with_enough_buckets():
+    assert pick_resolution(T0, T0 + 7 * DAY, 100) == 3600
+    assert pick_resolution(T0, T0 + 7 * DAY, 5) == 86400
+    assert pick_resolution(T0, T0 + 600, 300) == 60
+
+
+def test_endpoint_validates_the_resolution(app_client):
+    assert app_client.get("/api/v1/rollups", params={"resolution": "5m"}).status_code == 400
+    body = app_client.get("/api/v1/rollups", params={"channel_id": "rollup-none"}).json()
+    assert body["resolution"] == "15m" and body["buckets"] == []
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from app.database.readings import ReadingDB
+from app.services.downsample import SeriesColumnCache, lttb
+from app.services.feed_decoder import decode_feeds
+
+DAY = 86400
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.sin(x / 50)
+    y[137], y[611] = 25.0, -25.0
+    (idx,) = lttb(x, y[None, :], 50)
+
+    assert len(idx) == 50
+    assert idx[0] == 0 and idx[-1] == 999
+    assert np.all(np.diff(idx) > 0)
+    assert {137, 611} <= set(idx.tolist())
+
+
+def test_lttb_never_picks_missing_values():
+    x = np.arange(500, dtype=np.float64)
+    ys = np.vstack([np.cos(x / 20), np.cos(x / 20)])
+    ys[1, :40] = np.nan
+    ys[1, 300:320] = np.nan
+    picked = lttb(x, ys, 30)
+
+    assert not np.isnan(ys[1, picked[1]]).any()
+    assert picked[1][0] == 40
+
+
+def test_lttb_returns_everything_below_the_threshold():
+    x = np.arange(10, dtype=np.float64)
+    ys = np.vstack([x, np.where(x % 2 == 0, x, np.nan)])
+    whole, evens = lttb(x, ys, 100)
+    assert whole.tolist() == list(range(10))
+    assert evens.tolist() == [0, 2, 4, 6, 8]
+
+
+def _store(channel, channel_name, first, last):
+    ReadingDB.insert_columns(channel_name, decode_feeds([channel.feed(i) for i in range(first, last + 1)]))
+
+
+@pytest.fixture
+def days(channel):
+    """Entry ids covering the channel's three most recent complete days"""
+    newest = channel.last_entry_id()
+    today = channel.entry_ts(newest) // DAY * DAY
+    return [
+        (channel.entry_at_or_after(day), channel.entry_at_or_before(day + DAY - 1))
+        for day in (today - 3 * DAY, today - 2 * DAY, today - DAY)
+    ], today
+
+
+def test_cached_day_is_reloaded_after_an_out_of_process_write(channel, days):
+    (first, second, third), today = days
+    name = "series-stale"
+    _store(channel, name, *first)
+    _store(channel, name, *third)
+    _store(channel, name, third[1] + 1, channel.last_entry_id())
+    cache = SeriesColumnCache(max_chunks=10)
+    span = (today - 3 * DAY, today)
+
+    ts, _ = cache.columns(name, *span)
+    before = len(ts)
+    # The empty middle day was not cached, the complete ones were
+    assert cache.stats()["chunks"] == 2
+
+    # A backfill from another process: no invalidate() reaches this cache
+    _store(channel, name, *second)
+    ts, _ = cache.columns(name, *span)
+    assert len(ts) == before + (second[1] - second[0] + 1)
+
+    cache.columns(name, *span)
+    assert cache.stats()["hits"] >= 3
+
+
+def test_day_still_growing_is_not_cached(channel, days):
+    _, today = days
+    name = "series-today"
+    _store(channel, name, channel.entry_at_or_after(today), channel.last_entry_id())
+    cache = SeriesColumnCache(max_chunks=10)
+    cache.columns(name, today, today + DAY)
+    assert cache.stats()["chunks"] == 0
+
+
+def test_only_stored_days_with_readings_are_loaded(channel, days, monkeypatch):
+    (first, _, third), today = days
+    name = "series-gap"
+    _store(channel, name, *first)
+    _store(channel, name, *third)
+    cache = SeriesColumnCache(max_chunks=10)
+    loads = []
+    load = cache._load
+    monkeypatch.setattr(cache, "_load", lambda *args: loads.append(args[1]) or load(*args))
+
+    ts, _ = cache.columns(name, 0, today + 30 * DAY)
+    assert len(ts) == (first[1] - first[0] + 1) + (third[1] - third[0] + 1)
+    # Neither the decades before the store nor the empty day between are queried
+    assert loads == [today - 3 * DAY, today - DAY]
+
+
+def test_series_over_an_empty_store_is_empty(app_client):
+    body = app_client.get("/api/v1/series", params={"start": "1970-01-01", "channel_id": "series-none"}).json()
+    assert body["source_points"] == 0
+    assert all(points == [] for points in body["series"].values())
+    summary = app_client.get("/api/v1/status/summary", params={"start": "1970-01-01", "channel_id": "series-none"}).json()
+    assert summary["windows"] == [] and sum(summary["counts"].values()) == 0
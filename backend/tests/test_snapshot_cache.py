@@ -0,0 +1,77 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import snapshot_cache
+from app.services.snapshot_cache import SnapshotCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    # Only the cache's clock: the event loop needs the real one
+    monkeypatch.setattr(snapshot_cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def counting_loader(value="fresh"):
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return value
+    return load, calls
+
+
+def test_concurrent_misses_share_one_load():
+    cache = SnapshotCache(ttl_seconds=15)
+    load, calls = counting_loader()
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load("k", load) for _ in range(10)))
+    assert asyncio.run(run()) == ["fresh"] * 10
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 9
+
+
+def test_values_expire_after_the_ttl(clock):
+    cache = SnapshotCache(ttl_seconds=15)
+    load, calls = counting_loader()
+
+    async def get():
+        return await cache.get_or_load("k", load)
+    asyncio.run(get())
+    clock[0] += 14
+    asyncio.run(get())
+    assert len(calls) == 1 and cache.stats()["hits"] == 1
+    clock[0] += 1
+    asyncio.run(get())
+    assert len(calls) == 2
+
+
+def test_rejected_values_are_shared_but_not_cached():
+    cache = SnapshotCache(ttl_seconds=15)
+    load, calls = counting_loader({"error": "upstream"})
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load("k", load, lambda v: "error" not in v) for _ in range(3)))
+    assert asyncio.run(run()) == [{"error": "upstream"}] * 3
+    assert len(calls) == 1 and cache.peek("k") is None
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_a_cancelled_caller_does_not_cancel_the_load():
+    cache = SnapshotCache(ttl_seconds=15)
+    load, calls = counting_loader()
+
+    async def run():
+        first = asyncio.ensure_future(cache.get_or_load("k", load))
+        second = asyncio.ensure_future(cache.get_or_load("k", load))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+    assert asyncio.run(run()) == "fresh"
+    assert len(calls) == 1 and cache.peek("k") == "fresh"
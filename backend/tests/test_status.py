@@ -0,0 +1,73 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.database.readings import ReadingDB, from_epoch
+from app.services import status
+from app.services.status import (
+    CRITICAL, NORMAL, WARNING, classify, classify_readings, make_thresholds, reading_status, summarize_states,
+)
+
+THRESHOLDS = make_thresholds(150.0, 35.0)
+T0 = 1_700_000_000 // 3600 * 3600
+
+
+def test_batch_classification_matches_single_readings():
+    rng = np.random.default_rng(5)
+    tds, temp = rng.uniform(100, 170, 500), rng.uniform(25, 40, 500)
+    codes = classify(tds, temp, THRESHOLDS)
+    singles = [reading_status({"tds": a, "temp": b}, THRESHOLDS) for a, b in zip(tds.tolist(), temp.tolist())]
+    assert classify_readings(
+        [{"created_at": from_epoch(T0 + i), "tds": a, "temp": b} for i, (a, b) in enumerate(zip(tds, temp))],
+        THRESHOLDS,
+    )["labels"] == singles
+    assert set(codes.tolist()) == {NORMAL, WARNING, CRITICAL}
+
+
+def test_missing_values_never_raise_the_level():
+    codes = classify(np.array([np.nan, 160.0, np.nan]), np.array([np.nan, np.nan, 20.0]), THRESHOLDS)
+    assert codes.tolist() == [NORMAL, CRITICAL, NORMAL]
+
+
+def test_time_in_state_caps_gaps_and_splits_windows(monkeypatch):
+    monkeypatch.setattr(settings, "STATUS_MAX_GAP_SECONDS", 60)
+    ts = np.array([T0, T0 + 15, T0 + 30, T0 + 3600, T0 + 3615])
+    codes = np.array([NORMAL, CRITICAL, NORMAL, WARNING, NORMAL], dtype=np.int8)
+    summary = summarize_states(ts, codes, window_seconds=3600, until=T0 + 3630)
+
+    assert summary["counts"] == {"NORMAL": 3, "WARNING": 1, "CRITICAL": 1}
+    # The 30 s reading's state would last ~1 h; the cap keeps it to 60 s
+    assert summary["seconds"] == {"NORMAL": 15 + 60 + 15, "WARNING": 15, "CRITICAL": 15}
+    assert [w["start"] for w in summary["windows"]] == [from_epoch(T0), from_epoch(T0 + 3600)]
+    assert summary["windows"][1]["counts"] == {"NORMAL": 1, "WARNING": 1, "CRITICAL": 0}
+
+
+def test_live_thresholds_follow_the_settings_file(tmp_path, monkeypatch):
+    path = tmp_path / "settings.json"
+    monkeypatch.setattr(status, "SETTINGS_FILE", path)
+    monkeypatch.setattr(status, "_live_cache", {"stamp": None, "thresholds": None})
+    assert status.live_thresholds().tds == settings.TDS_ALERT_THRESHOLD
+
+    path.write_text(json.dumps({"tdsThreshold": 200, "tempThreshold": 30}))
+    thresholds = status.live_thresholds()
+    assert (thresholds.tds, thresholds.temp) == (200.0, 30.0)
+    assert thresholds.tds_warning == 200 * settings.STATUS_TDS_WARNING_RATIO
+
+    path.write_text("{not json")
+    assert status.live_thresholds().tds == settings.TDS_ALERT_THRESHOLD
+
+
+def test_summary_endpoint_counts_stored_readings(app_client, monkeypatch):
+    monkeypatch.setattr(status, "live_thresholds", lambda: THRESHOLDS)
+    ReadingDB.insert_many("status-summary", [
+        {"entry_id": i, "created_at": from_epoch(T0 + 15 * i), "voltage": 3.3, "tds": tds, "temp": 25.0}
+        for i, tds in enumerate([120.0, 145.0, 160.0, 120.0], start=1)
+    ])
+    body = app_client.get("/api/v1/status/summary", params={
+        "channel_id": "status-summary", "start": from_epoch(T0), "end": from_epoch(T0 + 3600), "window": "15m",
+    }).json()
+    assert body["counts"] == {"NORMAL": 2, "WARNING": 1, "CRITICAL": 1}
+    assert len(body["windows"]) == 1
+    assert app_client.get("/api/v1/status/summary", params={"window": "2h"}).status_code == 400
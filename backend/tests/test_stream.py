@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+import pytest
+
+from app.services.ingestion import IncrementalIngestor, ReadingBuffer
+from app.services.stream import ReadingBroadcaster, StreamFullError
+from app.services.thingspeak import parse_feeds
+
+
+def parse(message: bytes):
+    """(event, id, data) of one SSE message"""
+    fields = dict(line.split(": ", 1) for line in message.decode().strip().split("\n"))
+    return fields["event"], int(fields["id"]) if "id" in fields else None, json.loads(fields["data"])
+
+
+@pytest.fixture
+def ingestor(channel):
+    buffer = ReadingBuffer(maxlen=100)
+    newest = channel.last_entry_id()
+    buffer.extend(parse_feeds([channel.feed(i) for i in range(newest - 149, newest - 49)]))
+    return IncrementalIngestor(buffer, channel_id="stream-1")
+
+
+def poll(ingestor, channel, count):
+    """Append the next `count` entries and notify listeners, as a poll would"""
+    start = ingestor.buffer.last_entry_id + 1
+    appended = ingestor.buffer.extend(parse_feeds([channel.feed(i) for i in range(start, start + count)]))
+    ingestor._notify({"new": len(appended), "readings": appended})
+    return appended
+
+
+def queued(subscriber):
+    messages = []
+    while not subscriber.queue.empty():
+        messages.append(parse(subscriber.queue.get_nowait()))
+    return messages
+
+
+def test_new_subscriber_gets_a_snapshot_then_only_new_readings(ingestor, channel):
+    broadcaster = ReadingBroadcaster(ingestor)
+    subscriber = broadcaster.subscribe()
+    (snapshot, status) = [parse(m) for m in subscriber.backlog]
+    assert snapshot[0] == "snapshot" and snapshot[1] == ingestor.buffer.last_entry_id
+    assert status[0] == "status"
+
+    appended = poll(ingestor, channel, 3)
+    poll(ingestor, channel, 2)
+    events = queued(subscriber)
+    assert [e[0] for e in events] == ["readings", "status", "readings"]
+    assert [r["entry_id"] for r in events[0][2]] == [r["entry_id"] for r in appended]
+    assert events[2][1] == ingestor.buffer.last_entry_id
+
+
+def test_reconnect_resumes_from_last_event_id(ingestor, channel):
+    broadcaster = ReadingBroadcaster(ingestor)
+    last_seen = ingestor.buffer.last_entry_id
+    poll(ingestor, channel, 4)
+
+    (missed, _) = [parse(m) for m in broadcaster.subscribe(last_seen).backlog]
+    assert missed[0] == "readings"
+    assert [r["entry_id"] for r in missed[2]] == list(range(last_seen + 1, last_seen + 5))
+    # Evicted from the buffer: start over
+    (snapshot, _) = [parse(m) for m in broadcaster.subscribe(ingestor.buffer.oldest_entry_id() - 5).backlog]
+    assert snapshot[0] == "snapshot"
+    assert broadcaster.stats()["resumes"] == 1
+
+
+def test_slow_subscriber_is_dropped(ingestor, channel):
+    broadcaster = ReadingBroadcaster(ingestor, queue_size=3)
+    slow, fast = broadcaster.subscribe(), broadcaster.subscribe()
+    for _ in range(3):
+        poll(ingestor, channel, 1)
+        queued(fast)
+    poll(ingestor, channel, 1)
+
+    assert slow.closed and slow.queue.get_nowait() is None
+    assert not fast.closed and len(queued(fast)) == 1
+    assert broadcaster.stats()["subscribers"] == 1
+
+
+def test_capacity_is_enforced(ingestor):
+    broadcaster = ReadingBroadcaster(ingestor, max_subscribers=1)
+    broadcaster.subscribe()
+    with pytest.raises(StreamFullError):
+        broadcaster.subscribe()
+
+
+def test_event_stream_ends_on_close(ingestor, channel):
+    broadcaster = ReadingBroadcaster(ingestor)
+
+    async def run():
+        subscriber = broadcaster.subscribe()
+        received = []
+
+        async def read():
+            async for chunk in broadcaster.events(subscriber, heartbeat_seconds=5):
+                received.append(chunk)
+        reader = asyncio.ensure_future(read())
+        await asyncio.sleep(0.01)
+        poll(ingestor, channel, 1)
+        await asyncio.sleep(0.01)
+        broadcaster.close_all()
+        await asyncio.wait_for(reader, 1)
+        return received
+    received = asyncio.run(run())
+
+    assert received[0].startswith(b"retry: ")
+    assert [parse(m)[0] for m in received[1:]] == ["snapshot", "status", "readings", "status"]
+    assert broadcaster.stats()["subscribers"] == 0
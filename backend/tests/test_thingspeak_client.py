@@ -0,0 +1,127 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services import thingspeak
+from app.services.thingspeak import ThingSpeakClient, close_thingspeak_client, get_thingspeak_client
+
+
+def recording_transport(requests):
+    def handle(request):
+        requests.append(request)
+        return httpx.Response(200, json={"feeds": []})
+    return httpx.MockTransport(handle)
+
+
+def test_explicit_zero_limits_are_kept():
+    client = ThingSpeakClient(keepalive_expiry=0, max_keepalive_connections=0)
+    assert client.keepalive_expiry == 0 and client.max_keepalive_connections == 0
+    assert client.max_connections == settings.THINGSPEAK_MAX_CONNECTIONS
+
+
+def test_requests_share_one_pool():
+    requests = []
+    client = ThingSpeakClient(transport=recording_transport(requests), hedge=False)
+
+    async def run():
+        await client.get_feeds(channel_id="42", api_key="k", results=1)
+        pool = client.client
+        await client.get_feeds(channel_id="42", api_key="", results=1)
+        assert client.client is pool
+        await client.aclose()
+    asyncio.run(run())
+
+    assert [r.url.path for r in requests] == ["/channels/42/feeds.json"] * 2
+    assert requests[0].url.params["api_key"] == "k" and "api_key" not in requests[1].url.params
+
+
+def test_pool_is_rebuilt_for_a_new_event_loop():
+    client = ThingSpeakClient(transport=recording_transport([]), hedge=False)
+
+    async def pool():
+        await client.get_feeds(channel_id="42", api_key="")
+        return client.client
+    first = asyncio.run(pool())
+    assert asyncio.run(pool()) is not first
+    asyncio.run(client.aclose())
+
+
+def test_shared_client_is_created_once(monkeypatch):
+    monkeypatch.setattr(thingspeak, "_thingspeak_client", None)
+    assert get_thingspeak_client() is get_thingspeak_client()
+    asyncio.run(close_thingspeak_client())
+    assert thingspeak._thingspeak_client is None
+
+
+@pytest.fixture
+def hedging(monkeypatch):
+    monkeypatch.setattr(settings, "THINGSPEAK_HEDGE_DELAY_MS", 20.0)
+    monkeypatch.setattr(settings, "THINGSPEAK_HEDGE_MIN_DELAY_MS", 0.0)
+    monkeypatch.setattr(settings, "THINGSPEAK_HEDGE_MIN_SAMPLES", 20)
+
+
+def delayed_transport(delays, log):
+    """Attempt n waits delays[n] seconds (None: connection error)"""
+    async def handle(request):
+        n = len(log)
+        log.append("started")
+        try:
+            if delays[n] is None:
+                raise httpx.ConnectError("refused", request=request)
+            await asyncio.sleep(delays[n])
+        except asyncio.CancelledError:
+            log[n] = "cancelled"
+            raise
+        log[n] = "answered"
+        return httpx.Response(200, json={"attempt": n})
+    return httpx.MockTransport(handle)
+
+
+def hedged_get(client):
+    async def run():
+        try:
+            return await client.get_feeds(channel_id="42", api_key="")
+        finally:
+            await asyncio.sleep(0.01)
+            await client.aclose()
+    return asyncio.run(run())
+
+
+def test_slow_request_is_hedged_and_the_loser_cancelled(hedging):
+    log = []
+    client = ThingSpeakClient(transport=delayed_transport([1.0, 0.0], log), hedge=True)
+    assert hedged_get(client).json() == {"attempt": 1}
+    assert log == ["cancelled", "answered"]
+    assert client.stats()["hedges"] == 1 and client.stats()["hedge_wins"] == 1
+
+
+def test_fast_request_is_not_hedged(hedging):
+    log = []
+    client = ThingSpeakClient(transport=delayed_transport([0.0], log), hedge=True)
+    assert hedged_get(client).json() == {"attempt": 0}
+    assert log == ["answered"] and client.stats()["hedges"] == 0
+
+
+def test_first_attempt_can_still_win_after_hedging(hedging):
+    log = []
+    client = ThingSpeakClient(transport=delayed_transport([0.05, 0.5], log), hedge=True)
+    assert hedged_get(client).json() == {"attempt": 0}
+    assert log == ["answered", "cancelled"]
+    assert client.stats()["hedges"] == 1 and client.stats()["hedge_wins"] == 0
+
+
+def test_both_attempts_failing_raises(hedging):
+    client = ThingSpeakClient(transport=delayed_transport([None, None], []), hedge=True)
+    client.hedge_delay = lambda: 0.0
+    with pytest.raises(httpx.ConnectError):
+        hedged_get(client)
+
+
+def test_hedge_delay_follows_the_latency_percentile(hedging):
+    client = ThingSpeakClient(hedge=True)
+    assert client.hedge_delay() == pytest.approx(0.02)
+    for millis in range(1, 101):
+        client.attempt_latency.record(millis)
+    assert client.hedge_delay() == pytest.approx(client.attempt_latency.percentile(95) / 1000)